@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from model.agents.agent import Agent
+
+
+class AgentSchedule:
+    """
+    Splits the population into decision-making agents and passive entities.
+
+    Decision-making agents are bucketed by (decision interval, phase), so the agents due at a
+    step are found by visiting one bucket per distinct interval. Agents sharing an interval
+    are spread over its phases, which keeps the per-step cost of slow units proportional to
+    their cadence. Passive entities (bridges, headquarters, Franklin) never act or learn.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty schedule."""
+        self.__buckets: dict[tuple[int, int], list[Agent]] = defaultdict(list)
+        self.__next_phase: dict[int, int] = defaultdict(int)
+        self.__actors: list[Agent] = []
+        self.__entities: list[Agent] = []
+
+    def add(self, agent: Agent) -> None:
+        """
+        Adds an agent to the schedule.
+
+        Args:
+            agent (Agent): The agent to add.
+        """
+        if agent.passive:
+            self.__entities.append(agent)
+            return
+
+        interval = max(1, agent.decision_interval)
+        phase = self.__next_phase[interval]
+        self.__next_phase[interval] = (phase + 1) % interval
+
+        self.__buckets[(interval, phase)].append(agent)
+        self.__actors.append(agent)
+
+    def clear(self) -> None:
+        """Removes every agent from the schedule."""
+        self.__buckets.clear()
+        self.__next_phase.clear()
+        self.__actors.clear()
+        self.__entities.clear()
+
+    def due(self, step: int) -> list[Agent]:
+        """
+        Returns the decision-making agents that act at a step.
+
+        Args:
+            step (int): The step number within the episode.
+
+        Returns:
+            list[Agent]: The agents to act, in the order they were added per bucket.
+        """
+        due = []
+        for interval in self.__next_phase:
+            due.extend(self.__buckets.get((interval, step % interval), ()))
+        return due
+
+    def actors(self) -> list[Agent]:
+        """
+        Returns all decision-making agents.
+
+        Returns:
+            list[Agent]: The agents that pick actions and learn.
+        """
+        return list(self.__actors)
+
+    def entities(self) -> list[Agent]:
+        """
+        Returns all passive entities.
+
+        Returns:
+            list[Agent]: The agents that never act.
+        """
+        return list(self.__entities)
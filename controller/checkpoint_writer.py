@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+
+from typing import Mapping, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from model.agents.q_table_storage import QTableStorage
+
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointWriter:
+    """
+    Writes Q-table checkpoints on a background thread.
+
+    The training loop hands over a copy of the entries changed since the last checkpoint and
+    carries on, while the thread writes them to a Q-table storage, so neither waits on the
+    other and a checkpoint costs in proportion to what changed. Checkpoints are written in the
+    order they were submitted.
+    """
+
+    def __init__(self, storage: QTableStorage) -> None:
+        """
+        Start the writer thread.
+
+        Args:
+            storage (QTableStorage): The storage the checkpoints are written to.
+        """
+        self.__storage = storage
+        self.__jobs: queue.Queue[Optional[tuple[str, Mapping[tuple, float], bool]]] = queue.Queue()
+        self.__error: Optional[BaseException] = None
+        self.__thread = threading.Thread(target=self.__run, name="checkpoint-writer", daemon=True)
+        self.__thread.start()
+
+    def submit(self, name: str, changes: Mapping[tuple, float], full: bool = False) -> None:
+        """
+        Queues a checkpoint of a Q-table without waiting for it to be written.
+
+        Args:
+            name (str): The table name.
+            changes (Mapping[tuple, float]): The entries changed since the last checkpoint of the table,
+                NaN for deleted ones. The writer keeps the mapping, so it must not be changed afterwards.
+            full (bool): Whether the changes are the whole table, which is then rewritten.
+        """
+        self.__raise_error()
+        self.__jobs.put((name, changes, full))
+
+    def flush(self) -> None:
+        """
+        Waits until every queued checkpoint has been written.
+
+        Raises:
+            Exception: The first error met by the writer thread.
+        """
+        self.__jobs.join()
+        self.__raise_error()
+
+    def close(self) -> None:
+        """
+        Writes the queued checkpoints and stops the thread.
+
+        Raises:
+            Exception: The first error met by the writer thread.
+        """
+        if self.__thread.is_alive():
+            self.__jobs.put(None)
+            self.__thread.join()
+        self.__raise_error()
+
+    def __run(self) -> None:
+        """Write queued checkpoints until close() queues None."""
+        while True:
+            job = self.__jobs.get()
+            try:
+                if job is None:
+                    return
+                if self.__error is None:
+                    self.__storage.checkpoint(*job)
+            except Exception as error:
+                logger.exception("Writing the checkpoint of %s failed", job[0])
+                self.__error = error
+            finally:
+                self.__jobs.task_done()
+
+    def __raise_error(self) -> None:
+        """Raise the error of the writer thread, if any."""
+        if self.__error is not None:
+            raise self.__error
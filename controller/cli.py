@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import argparse
+import cProfile
+import glob
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+
+from typing import Optional
+
+import numpy as np
+
+from controller.config.config import Config
+from controller.config.galactus_config import GalactusConfig
+from controller.config.learning_config import LearningConfig
+from controller.progress import ProgressReporter, EpisodeTracer, StateHashLog
+from controller.simulation_listener import SimulationListener
+from model.agents.q_table_storage import STORAGES
+
+
+logger = logging.getLogger(__name__)
+
+# the initial population is laid out on a 20x20 area
+MIN_WORLD_SIZE = 20
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Returns the parser of the training command line.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(description=f"Train the agents of the {Config.simulation_name}.")
+
+    training = parser.add_argument_group("training")
+    training.add_argument("-n", "--episodes", type=int, default=100, help="episodes per worker (default: %(default)s)")
+    training.add_argument("-w", "--workers", type=int, default=1,
+                          help="learners run in parallel processes, each with its own Q-tables unless they share an SQLite storage (default: %(default)s)")
+    training.add_argument("--seed", type=int, default=None, help="random seed, offset by the worker index")
+    training.add_argument("--world-size", type=int, default=Config.world_size, help="side of the grid (default: %(default)s)")
+    training.add_argument("--checkpoint-every", type=int, default=1, metavar="N",
+                          help="save the Q-tables every N episodes and at the end (default: %(default)s)")
+    training.add_argument("--q-table-dir", default=Config.q_table_dir, help="directory of the Q-tables (default: %(default)s)")
+    training.add_argument("--storage", choices=STORAGES, default=Config.q_table_storage,
+                          help="keep the Q-tables as files, in one SQLite database shared by all workers, or in memory only (default: %(default)s)")
+    training.add_argument("--on-convergence", choices=["stop", "exploit"], default=None,
+                          help="stop training, or stop exploring, once the Q-values and the win rate are stable")
+    training.add_argument("--patience", type=int, default=LearningConfig.convergence_patience, metavar="N",
+                          help="stable episodes in a row needed to converge (default: %(default)s)")
+    training.add_argument("--value-function", choices=["table", "linear"], default=LearningConfig.value_function,
+                          help="learn Q-tables, or linear Q-functions for the heroes and Silver Surfer (default: %(default)s)")
+    training.add_argument("--q-table-capacity", type=int, default=LearningConfig.q_table_capacity, metavar="N",
+                          help="evict the least visited entries of a Q-table beyond N at each checkpoint, 0 for no limit (default: %(default)s)")
+    training.add_argument("--max-steps", type=int, default=Config.max_episode_steps, metavar="N",
+                          help="truncate an episode after N steps, 0 for no limit (default: %(default)s)")
+    training.add_argument("--stall-window", type=int, default=Config.stall_window, metavar="N",
+                          help="truncate an episode back in an earlier state after N steps without a bridge health change, "
+                               "0 to never detect stalls (default: %(default)s)")
+    training.add_argument("--galactus-mcts-ms", type=float, default=GalactusConfig.mcts_budget_ms, metavar="MS",
+                          help="let Galactus plan each move by tree search within MS milliseconds, 0 to follow the flow field (default: %(default)s)")
+    training.add_argument("--share-hero-q", action="store_true",
+                          help="let the four heroes learn one shared value function, saved as Hero.qtable.npy or Hero.npy")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--gui", action="store_true", help="render the grid in a window (single worker only)")
+    output.add_argument("--log-dir", default="simulation_logs", help="directory of the metric logs (default: %(default)s)")
+    output.add_argument("--plot-dir", default="simulation_plots", help="directory of the metric plots (default: %(default)s)")
+    output.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="logging verbosity, DEBUG shows every episode (default: %(default)s)")
+    output.add_argument("--no-progress", dest="progress", action="store_false", help="do not show the progress line")
+
+    evaluation = parser.add_argument_group("evaluation")
+    evaluation.add_argument("--evaluate", action="store_true",
+                            help="measure the win rate of the greedy policies in the Q-table directory, without learning or writing anything")
+    evaluation.add_argument("--ci-width", type=float, default=0.05,
+                            help="stop once the confidence interval of the win rate is this narrow (default: %(default)s)")
+    evaluation.add_argument("--confidence", type=float, default=0.95, help="confidence level of the interval (default: %(default)s)")
+    evaluation.add_argument("--max-episodes", type=int, default=10000, help="most episodes played (default: %(default)s)")
+
+    diagnostics = parser.add_argument_group("diagnostics")
+    diagnostics.add_argument("--profile", metavar="PATH", default=None, help="write cProfile statistics to PATH")
+    diagnostics.add_argument("--trace", metavar="PATH", default=None,
+                             help="write one span per episode to PATH in the Chrome trace event format")
+    diagnostics.add_argument("--hash-log", metavar="PATH", default=None,
+                             help="write the state hash of the Earth after every step to PATH, to compare runs step by step")
+
+    return parser
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """
+    Parses and validates the training command line.
+
+    Args:
+        argv (Optional[list[str]]): The arguments, sys.argv by default.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.episodes < 1:
+        parser.error("--episodes must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.q_table_capacity < 0:
+        parser.error("--q-table-capacity must not be negative")
+    if args.patience < 1:
+        parser.error("--patience must be at least 1")
+    if args.checkpoint_every < 1:
+        parser.error("--checkpoint-every must be at least 1")
+    if args.world_size < MIN_WORLD_SIZE:
+        parser.error(f"--world-size must be at least {MIN_WORLD_SIZE}")
+    if args.gui and args.workers > 1:
+        parser.error("--gui can only be used with a single worker")
+    if args.evaluate and args.gui:
+        parser.error("--gui can not be used with --evaluate")
+    if not 0 < args.ci_width < 1 or not 0 < args.confidence < 1:
+        parser.error("--ci-width and --confidence must be between 0 and 1")
+
+    return args
+
+
+def worker_path(path: Optional[str], index: int, workers: int) -> Optional[str]:
+    """
+    Returns the path a worker writes to, suffixed with its index when there are several workers.
+
+    Args:
+        path (Optional[str]): The path given on the command line.
+        index (int): The worker index.
+        workers (int): The number of workers.
+
+    Returns:
+        Optional[str]: The worker path, or None if no path was given.
+    """
+    if path is None or workers == 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{index}{ext}"
+
+
+class _SummaryForwarder(SimulationListener):
+    """Sends episode summaries of a worker process to the parent."""
+
+    def __init__(self, summaries: multiprocessing.Queue) -> None:
+        self.__summaries = summaries
+
+    def on_episode(self, summary: dict) -> None:
+        self.__summaries.put(("episode", summary))
+
+
+def run_training(args: argparse.Namespace, index: int = 0, listeners: tuple = ()) -> dict:
+    """
+    Runs one learner with the settings of the command line.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+        index (int): The worker index.
+        listeners (tuple): Extra listeners registered with the simulator.
+
+    Returns:
+        dict: The number of episodes played and won.
+    """
+    from controller.simulator import Simulator
+
+    Config.world_size = args.world_size
+    Config.q_table_dir = args.q_table_dir
+    Config.q_table_storage = args.storage
+    LearningConfig.convergence_patience = args.patience
+    LearningConfig.value_function = args.value_function
+    LearningConfig.share_hero_q = args.share_hero_q
+    LearningConfig.q_table_capacity = args.q_table_capacity
+    Config.max_episode_steps = args.max_steps
+    Config.stall_window = args.stall_window
+    GalactusConfig.mcts_budget_ms = args.galactus_mcts_ms
+    if args.workers > 1 and args.storage == "directory":
+        Config.q_table_dir = os.path.join(args.q_table_dir, f"worker-{index}")
+        os.makedirs(Config.q_table_dir, exist_ok=True)
+        # every learner starts from the shared tables but keeps its own copy
+        for path in glob.glob(os.path.join(args.q_table_dir, "*.pkl")) + glob.glob(os.path.join(args.q_table_dir, "*.npy")) \
+                + glob.glob(os.path.join(args.q_table_dir, "*.json")):
+            target = os.path.join(Config.q_table_dir, os.path.basename(path))
+            if not os.path.exists(target):
+                shutil.copyfile(path, target)
+
+    if args.seed is not None:
+        random.seed(args.seed + index)
+        np.random.seed(args.seed + index)
+
+    simulator = Simulator(num_episodes=args.episodes,
+                          log_dir=worker_path(args.log_dir, index, args.workers),
+                          plot_dir=worker_path(args.plot_dir, index, args.workers),
+                          gui_flag=args.gui,
+                          checkpoint_every=args.checkpoint_every,
+                          on_convergence=args.on_convergence)
+    for listener in listeners:
+        simulator.add_listener(listener)
+
+    tracer = None
+    if args.trace:
+        tracer = EpisodeTracer(worker_path(args.trace, index, args.workers))
+        simulator.add_listener(tracer)
+
+    hash_log = None
+    if args.hash_log:
+        hash_log = StateHashLog(worker_path(args.hash_log, index, args.workers))
+        simulator.add_listener(hash_log)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        simulator.run()
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(worker_path(args.profile, index, args.workers))
+        if tracer:
+            tracer.close()
+        if hash_log:
+            hash_log.close()
+
+    wins = simulator.metrics['win_status']
+    return {"episodes": len(wins), "wins": int(sum(wins))}
+
+
+def _worker_main(args: argparse.Namespace, index: int, summaries: multiprocessing.Queue) -> None:
+    """Entry point of a worker process."""
+    logging.basicConfig(level=args.log_level, format="%(levelname)s %(processName)s %(name)s: %(message)s")
+    try:
+        result = run_training(args, index, listeners=(_SummaryForwarder(summaries),))
+    except BaseException:
+        logger.exception("Worker %d failed", index)
+        summaries.put(("done", index, None))
+        raise
+    summaries.put(("done", index, result))
+
+
+def _run_workers(args: argparse.Namespace, progress: Optional[ProgressReporter]) -> list[dict]:
+    """Runs the learners in parallel processes and relays their progress."""
+    summaries = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_worker_main, args=(args, index, summaries), name=f"worker-{index}")
+                 for index in range(args.workers)]
+    for process in processes:
+        process.start()
+
+    results = []
+    running = len(processes)
+    while running:
+        try:
+            message = summaries.get(timeout=1.0)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+            continue
+
+        if message[0] == "episode":
+            if progress:
+                progress.on_episode(message[1])
+        else:
+            running -= 1
+            if message[2] is not None:
+                results.append(message[2])
+
+    for process in processes:
+        process.join()
+    return results
+
+
+def run_evaluation(args: argparse.Namespace) -> int:
+    """
+    Evaluates the greedy policies of the Q-table directory.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        int: The exit status.
+    """
+    from controller.evaluation import evaluate, load_policies
+
+    Config.world_size = args.world_size
+    Config.q_table_storage = args.storage
+    Config.max_episode_steps = args.max_steps
+    Config.stall_window = args.stall_window
+    LearningConfig.share_hero_q = args.share_hero_q
+    LearningConfig.value_function = args.value_function
+    policies = load_policies(args.q_table_dir)
+
+    try:
+        result = evaluate(policies, ci_width=args.ci_width, confidence=args.confidence,
+                          max_episodes=args.max_episodes, workers=args.workers, seed=args.seed)
+    except KeyboardInterrupt:
+        logger.warning("Evaluation interrupted")
+        return 130
+
+    logger.info("Greedy win rate %.2f%% (%.0f%% interval %.2f%% - %.2f%%) over %d episodes%s",
+                100 * result["win_rate"], 100 * result["confidence"], 100 * result["low"], 100 * result["high"],
+                result["episodes"], "" if result["converged"] else ", interval wider than requested")
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Runs a training session from the command line.
+
+    Args:
+        argv (Optional[list[str]]): The arguments, sys.argv by default.
+
+    Returns:
+        int: The exit status.
+    """
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(levelname)s %(name)s: %(message)s")
+
+    if args.evaluate:
+        return run_evaluation(args)
+
+    progress = ProgressReporter(args.episodes * args.workers) if args.progress else None
+
+    try:
+        if args.workers == 1:
+            results = [run_training(args, listeners=(progress,) if progress else ())]
+        else:
+            results = _run_workers(args, progress)
+    except KeyboardInterrupt:
+        logger.warning("Training interrupted")
+        return 130
+    finally:
+        if progress:
+            progress.close()
+
+    if len(results) < args.workers:
+        logger.error("%d of %d workers failed", args.workers - len(results), args.workers)
+        return 1
+
+    episodes = sum(result["episodes"] for result in results)
+    wins = sum(result["wins"] for result in results)
+    if args.workers > 1 and episodes:
+        logger.info("%d episodes over %d workers, win rate %.2f%%", episodes, args.workers, 100 * wins / episodes)
+    return 0
@@ -6,6 +6,13 @@ class Config:
     max_simulation_speed = 100
     initial_simulation_speed = (max_simulation_speed - min_simulation_speed) // 2
     world_size = 30
+    q_table_dir = "./model/agents/q_tables"
+    # where Q-tables are kept: "directory" (files in q_table_dir), "sqlite" (one database in q_table_dir) or "memory"
+    q_table_storage = "directory"
+    # most steps of an episode before it is truncated, 0 for no limit
+    max_episode_steps = 2000
+    # steps without a change of bridge health after which an episode back in an earlier state is truncated, 0 to never detect stalls
+    stall_window = 200
 
 
 
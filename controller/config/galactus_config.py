@@ -10,4 +10,22 @@ class GalactusConfig:
     gal_attack_rate = 1.0
 
     # damage receiving rate
-    gal_damage_rate = 0.0
\ No newline at end of file
+    gal_damage_rate = 0.0
+
+    # step after which galactus enters the episode
+    gal_intro_step = 10
+
+    # number of steps between two decisions
+    decision_interval = 1
+
+    # milliseconds Galactus may spend planning each move by Monte Carlo tree search, 0 to follow the flow field
+    mcts_budget_ms = 0.0
+
+    # steps simulated by each search iteration
+    mcts_depth = 4
+
+    # weight of the exploration term of UCT, in units of villain reward
+    mcts_exploration = 10.0
+
+    # discount of the simulated rewards
+    mcts_gamma = 0.95
@@ -31,6 +31,9 @@ class HeroConfig:
     # protective barrier range
     barrier_range = 1 # every hero can protect a cell
 
+    # number of steps between two decisions
+    decision_interval = 1
+
 
 class ReedRichardConfig(HeroConfig):
     """Class representing configuration parameters for Reed Richards agent."""
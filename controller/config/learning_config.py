@@ -0,0 +1,65 @@
+class LearningConfig:
+    """Class representing the Q-learning parameters shared by every learning agent."""
+
+    # learning rate
+    alpha = 0.1
+
+    # discount factor
+    gamma = 0.9
+
+    # exploration rate
+    epsilon = 0.2
+
+    # number of episodes the win rate is averaged over to detect convergence
+    convergence_window = 20
+
+    # number of stable episodes in a row after which learning has converged
+    convergence_patience = 10
+
+    # largest Q-value change of a stable episode
+    q_tolerance = 1e-3
+
+    # largest drift of the windowed win rate over stable episodes
+    win_rate_tolerance = 0.05
+
+    # exploration rate once learning has converged, when exploiting on convergence
+    exploit_epsilon = 0.0
+
+    # number of transitions kept per agent class for experience replay, 0 disables replay
+    replay_capacity = 10000
+
+    # number of new transitions of a class between two replayed batches
+    replay_interval = 8
+
+    # number of replayed transitions per new transition
+    replay_ratio = 4
+
+    # most prioritised-sweeping updates per agent class and step, 0 disables planning
+    planning_updates = 0
+
+    # most microseconds spent planning per agent class and step, 0 for no time limit
+    planning_budget_us = 0.0
+
+    # smallest model error queued for planning
+    planning_threshold = 1e-4
+
+    # "table" for Q-tables, "linear" for a linear Q-function over state features in classes supporting it
+    value_function = "table"
+
+    # number of transitions per batched update of a linear Q-function
+    linear_batch_size = 32
+
+    # whether the four heroes learn one shared value function instead of one each
+    share_hero_q = False
+
+    # most entries kept in a Q-table at each checkpoint, 0 for no limit
+    q_table_capacity = 0
+
+    # entries evicted first from a full Q-table: "lfu" for the least visited, "age" for the least recently visited
+    eviction_policy = "lfu"
+
+    # share of the capacity freed by an eviction
+    eviction_slack = 0.1
+
+    # number of delta checkpoints of a Q-table before they are folded into a rewritten table file
+    checkpoint_compact_every = 10
@@ -26,3 +26,8 @@ class SilverSurferConfig:
     # respawn time
     ss_respawn_time = 1
 
+    # step after which the silver surfer enters the episode
+    ss_intro_step = 5
+
+    # number of steps between two decisions
+    decision_interval = 1
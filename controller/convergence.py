@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Optional
+
+
+class ConvergenceMonitor:
+    """
+    Tracks whether learning has settled.
+
+    Every Q update reports the size of its change. At the end of an episode, the mean and max
+    |ΔQ| of each agent class are computed, together with the win rate over the last `window`
+    episodes. An episode is stable when no class changed its Q-values by more than
+    q_tolerance and the windowed win rate is within win_rate_tolerance of its value when the
+    current run of stable episodes began. Learning has converged after `patience` stable
+    episodes in a row.
+    """
+
+    def __init__(self, window: int = 20, patience: int = 10, q_tolerance: float = 1e-3,
+                 win_rate_tolerance: float = 0.05) -> None:
+        """
+        Initialise the monitor.
+
+        Args:
+            window (int): The number of episodes the win rate is averaged over.
+            patience (int): The number of stable episodes in a row needed to converge.
+            q_tolerance (float): The largest |ΔQ| of a stable episode.
+            win_rate_tolerance (float): The largest drift of the windowed win rate over stable episodes.
+        """
+        self.__window = window
+        self.__patience = patience
+        self.__q_tolerance = q_tolerance
+        self.__win_rate_tolerance = win_rate_tolerance
+
+        self.__updates: dict[str, list[float]] = {}
+        self.__results: deque[int] = deque(maxlen=window)
+        self.__anchor: Optional[float] = None
+        self.__stable = 0
+        self.__episodes = 0
+        self.__converged_at: Optional[int] = None
+
+    def record(self, agent_class: str, delta: float) -> None:
+        """
+        Records the size of one Q update.
+
+        Args:
+            agent_class (str): The name of the updated agent's class.
+            delta (float): The absolute change of the Q-value.
+        """
+        stats = self.__updates.get(agent_class)
+        if stats is None:
+            stats = self.__updates[agent_class] = [0.0, 0, 0.0]
+        stats[0] += delta
+        stats[1] += 1
+        if delta > stats[2]:
+            stats[2] = delta
+
+    def end_episode(self, win_status: int) -> dict:
+        """
+        Closes an episode and returns its convergence signals.
+
+        Args:
+            win_status (int): 1 if the episode was won, 0 otherwise.
+
+        Returns:
+            dict: The mean and max |ΔQ| overall and per class, the windowed win rate, the number
+                of stable episodes in a row and whether learning has converged.
+        """
+        self.__episodes += 1
+        self.__results.append(win_status)
+        win_rate = sum(self.__results) / len(self.__results)
+
+        per_class = {name: {"mean_dq": total / count if count else 0.0, "max_dq": largest}
+                     for name, (total, count, largest) in sorted(self.__updates.items())}
+        total = sum(stats[0] for stats in self.__updates.values())
+        count = sum(stats[1] for stats in self.__updates.values())
+        max_dq = max((stats[2] for stats in self.__updates.values()), default=0.0)
+        self.__updates.clear()
+
+        if self.__anchor is None or max_dq > self.__q_tolerance or abs(win_rate - self.__anchor) > self.__win_rate_tolerance:
+            self.__anchor = win_rate
+            self.__stable = 1 if max_dq <= self.__q_tolerance else 0
+        else:
+            self.__stable += 1
+
+        if not self.converged() and self.__stable >= self.__patience and self.__episodes >= self.__window:
+            self.__converged_at = self.__episodes
+
+        return {
+            "mean_dq": total / count if count else 0.0,
+            "max_dq": max_dq,
+            "per_class": per_class,
+            "win_rate": win_rate,
+            "stable_episodes": self.__stable,
+            "converged": self.converged(),
+        }
+
+    def converged(self) -> bool:
+        """Return true once learning has converged."""
+        return self.__converged_at is not None
+
+    def converged_at(self) -> Optional[int]:
+        """Return the episode at which learning converged, if it has."""
+        return self.__converged_at
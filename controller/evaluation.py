@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import random
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from statistics import NormalDist
+from typing import Optional
+
+import numpy as np
+
+from controller.config.config import Config
+from controller.config.learning_config import LearningConfig
+from model.agents.greedy_policy import GreedyPolicy, LinearGreedyPolicy
+from model.agents.linear_q import LinearQ, feature_count
+from model.agents.q_table_storage import get_storage
+
+
+logger = logging.getLogger(__name__)
+
+# policies of the current worker process, set once by the pool initializer
+_policies: dict[str, GreedyPolicy] = {}
+
+
+def wilson_interval(wins: int, episodes: int, confidence: float = 0.95) -> tuple[float, float]:
+    """
+    Returns the Wilson score interval of a win rate.
+
+    Args:
+        wins (int): The number of episodes won.
+        episodes (int): The number of episodes played.
+        confidence (float): The confidence level of the interval.
+
+    Returns:
+        tuple[float, float]: The lower and upper bounds, (0, 1) if no episode was played.
+    """
+    if episodes == 0:
+        return 0.0, 1.0
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = wins / episodes
+    denominator = 1 + z * z / episodes
+    centre = (p + z * z / (2 * episodes)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / episodes + z * z / (4 * episodes * episodes)) / denominator
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def load_policies(q_table_dir: Optional[str] = None) -> dict[str, GreedyPolicy]:
+    """
+    Loads and compiles the Q-table of every decision-making agent class from the Q-table storage.
+
+    Classes learning a linear Q-function when LearningConfig.value_function is "linear" get a
+    greedy policy over its weights instead, read from the Q-table directory.
+
+    Args:
+        q_table_dir (Optional[str]): The directory of the Q-tables, Config.q_table_dir by default.
+
+    Returns:
+        dict[str, GreedyPolicy]: The policies by class name, empty for classes without a Q-table.
+    """
+    from controller.simulator import AGENT_COLOURS
+
+    directory = q_table_dir or Config.q_table_dir
+    storage = get_storage(directory=directory)
+    compiled: dict[str, GreedyPolicy] = {}
+    policies = {}
+    for agent_class in AGENT_COLOURS:
+        if agent_class is None or agent_class.passive:
+            continue
+        # classes sharing a Q-table share its compiled policy
+        name = agent_class.table_name()
+        if name not in compiled and agent_class.linear_q and LearningConfig.value_function == "linear":
+            compiled[name] = _load_linear_policy(name, directory)
+        elif name not in compiled:
+            compiled[name] = GreedyPolicy(storage.view(name))
+        policies[agent_class.__name__] = compiled[name]
+    return policies
+
+
+def _load_linear_policy(name: str, directory: str) -> LinearGreedyPolicy:
+    """Return the greedy policy over the linear Q-function saved for a table name, zero weights if there is none."""
+    q_function = LinearQ.load(os.path.join(directory, f"{name}.npy"), feature_count())
+    if q_function is None:
+        logger.warning("No linear Q-function for %s in %s, its agents act on zero weights", name, directory)
+        q_function = LinearQ(feature_count())
+    return LinearGreedyPolicy(q_function)
+
+
+def _init_worker(policies: dict[str, GreedyPolicy], world_size: int, max_episode_steps: int, stall_window: int) -> None:
+    """Keep the policies shipped to a worker process for all of its rollouts, and the settings of the parent."""
+    global _policies
+    _policies = policies
+    Config.world_size = world_size
+    Config.max_episode_steps = max_episode_steps
+    Config.stall_window = stall_window
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def _rollout(episodes: int, seed: int) -> list[int]:
+    """Play greedy episodes in a worker process and return their win statuses."""
+    from controller.simulator import Simulator
+
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+
+    simulator = Simulator(num_episodes=episodes, policies=_policies)
+    simulator.run()
+    return simulator.metrics['win_status']
+
+
+def evaluate(policies: dict[str, GreedyPolicy], ci_width: float = 0.05, confidence: float = 0.95,
+             min_episodes: int = 50, max_episodes: int = 10000, batch_size: int = 20,
+             workers: Optional[int] = None, seed: Optional[int] = None) -> dict:
+    """
+    Measures the win rate of frozen greedy policies, playing only as many episodes as needed.
+
+    Batches of episodes are played across a process pool, and no more batches are started once
+    the Wilson interval of the win rate is narrower than ci_width or max_episodes are played.
+
+    Args:
+        policies (dict[str, GreedyPolicy]): The policies by agent class name.
+        ci_width (float): The target width of the confidence interval.
+        confidence (float): The confidence level of the interval.
+        min_episodes (int): The number of episodes played before stopping is considered.
+        max_episodes (int): The most episodes played.
+        batch_size (int): The number of episodes per task sent to a worker.
+        workers (Optional[int]): The number of processes, all cores by default.
+        seed (Optional[int]): The random seed, batches get consecutive seeds from it.
+
+    Returns:
+        dict: The episodes played and won, the win rate and its interval, and whether the target width was reached.
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = random.Random(seed)
+
+    wins = episodes = submitted = 0
+    low, high = 0.0, 1.0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(policies, Config.world_size, Config.max_episode_steps,
+                                       Config.stall_window)) as executor:
+        in_flight = set()
+        while True:
+            while len(in_flight) < workers and submitted < max_episodes:
+                size = min(batch_size, max_episodes - submitted)
+                in_flight.add(executor.submit(_rollout, size, seeds.getrandbits(63)))
+                submitted += size
+
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                statuses = future.result()
+                wins += sum(statuses)
+                episodes += len(statuses)
+
+            low, high = wilson_interval(wins, episodes, confidence)
+            logger.debug("%d episodes, win rate in [%.3f, %.3f]", episodes, low, high)
+
+            if episodes >= min_episodes and high - low <= ci_width:
+                for future in in_flight:
+                    future.cancel()
+                break
+
+    return {
+        "episodes": episodes,
+        "wins": wins,
+        "win_rate": wins / episodes if episodes else 0.0,
+        "low": low,
+        "high": high,
+        "confidence": confidence,
+        "converged": high - low <= ci_width,
+    }
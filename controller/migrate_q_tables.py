@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import logging
+import os
+
+from typing import Optional
+
+from controller.config.config import Config
+from model.agents.q_table_file import load_q_table_file, save_q_table, table_path
+from model.agents.q_table_legacy import load_q_table
+
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_q_table(path: str, remove: bool = False) -> str:
+    """
+    Converts a pickled Q-table into a Q-table file beside it.
+
+    Args:
+        path (str): The path of the .pkl file.
+        remove (bool): Delete the pickle once the new file has been written and read back.
+
+    Returns:
+        str: The path of the new Q-table file.
+    """
+    with open(path, "rb") as f:
+        q_table = load_q_table(f)
+
+    directory, filename = os.path.split(path)
+    target = table_path(directory, os.path.splitext(filename)[0])
+    save_q_table(target, q_table)
+
+    if len(load_q_table_file(target)) != len(q_table):
+        raise RuntimeError(f"{target} does not hold the {len(q_table)} entries of {path}")
+    if remove:
+        os.remove(path)
+    return target
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Converts the pickled Q-tables of a directory from the command line.
+
+    Args:
+        argv (Optional[list[str]]): The arguments, sys.argv by default.
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(description="Convert pickled Q-tables to memory-mappable Q-table files.")
+    parser.add_argument("directory", nargs="?", default=Config.q_table_dir,
+                        help="directory holding the .pkl files (default: %(default)s)")
+    parser.add_argument("--remove", action="store_true", help="delete each .pkl file once it has been converted")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format="%(levelname)s %(name)s: %(message)s")
+
+    paths = sorted(glob.glob(os.path.join(args.directory, "*.pkl")))
+    if not paths:
+        logger.warning("No .pkl Q-tables in %s", args.directory)
+
+    for path in paths:
+        target = migrate_q_table(path, args.remove)
+        logger.info("Converted %s to %s", path, target)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
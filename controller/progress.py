@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+
+from typing import Optional, TextIO, TYPE_CHECKING
+
+from controller.simulation_listener import SimulationListener
+
+if TYPE_CHECKING:
+    from model.environment import Environment
+
+
+class ProgressReporter(SimulationListener):
+    """
+    Shows the progress of a training run as a single status line.
+
+    The line is rewritten in place on a terminal, and printed as a new line otherwise, at most
+    once per interval, so reporting costs nothing noticeable even for very short episodes. The
+    line is ended once the last episode is counted, so messages logged afterwards start afresh.
+    """
+
+    def __init__(self, total: int, stream: Optional[TextIO] = None, interval: float = 0.5) -> None:
+        """
+        Initialise the reporter.
+
+        Args:
+            total (int): The number of episodes expected.
+            stream (Optional[TextIO]): Where to write, stderr by default.
+            interval (float): Minimum number of seconds between two updates.
+        """
+        self.__total = total
+        self.__stream = stream if stream is not None else sys.stderr
+        self.__interval = interval
+        self.__in_place = self.__stream.isatty()
+
+        self.__episodes = 0
+        self.__wins = 0
+        self.__steps = 0
+        self.__start = time.monotonic()
+        self.__last_write = 0.0
+        self.__width = 0
+        self.__closed = False
+
+    def on_episode(self, summary: dict) -> None:
+        """Count the episode and refresh the line if the interval has passed."""
+        self.__episodes += 1
+        self.__wins += summary["win_status"]
+        self.__steps += summary["length"]
+
+        if self.__episodes == self.__total:
+            self.close()
+            return
+
+        now = time.monotonic()
+        if now - self.__last_write >= self.__interval:
+            self.__write(now)
+
+    def close(self) -> None:
+        """Write the final state of the line and end it."""
+        if self.__closed:
+            return
+        self.__closed = True
+
+        self.__write(time.monotonic())
+        if self.__in_place:
+            self.__stream.write("\n")
+            self.__stream.flush()
+
+    def __write(self, now: float) -> None:
+        """Write the status line."""
+        self.__last_write = now
+        elapsed = max(now - self.__start, 1e-9)
+        episodes = max(self.__episodes, 1)
+
+        line = (f"episode {self.__episodes}/{self.__total}"
+                f" | won {self.__wins / episodes:.1%}"
+                f" | avg length {self.__steps / episodes:.1f}"
+                f" | {self.__episodes / elapsed:.1f} ep/s"
+                f" | {self.__steps / elapsed:.0f} steps/s")
+
+        if self.__in_place:
+            self.__stream.write("\r" + line.ljust(self.__width))
+            self.__width = len(line)
+        else:
+            self.__stream.write(line + "\n")
+        self.__stream.flush()
+
+
+class EpisodeTracer(SimulationListener):
+    """
+    Records one span per episode in the Chrome trace event format.
+
+    The file can be opened in chrome://tracing or Perfetto to see how episode durations evolve
+    over a run. Only the first step of each episode is timed, so tracing stays cheap.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialise the tracer.
+
+        Args:
+            path (str): The JSON file the trace is written to on close.
+        """
+        self.__path = path
+        self.__events: list[dict] = []
+        self.__episode_start: Optional[float] = None
+
+    def on_step(self, environment: Environment, episode: int, step: int) -> None:
+        """Remember when the episode started."""
+        if step == 1:
+            self.__episode_start = time.perf_counter()
+
+    def on_episode(self, summary: dict) -> None:
+        """Record the span of the episode that just ended."""
+        if self.__episode_start is None:
+            return
+
+        end = time.perf_counter()
+        self.__events.append({
+            "name": f"episode {summary['episode']}",
+            "ph": "X",
+            "ts": self.__episode_start * 1e6,
+            "dur": (end - self.__episode_start) * 1e6,
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": summary,
+        })
+        self.__episode_start = None
+
+    def close(self) -> None:
+        """Write the recorded spans."""
+        with open(self.__path, "w") as f:
+            json.dump({"traceEvents": self.__events}, f)
+
+
+class StateHashLog(SimulationListener):
+    """
+    Writes the state hash of the environment after every step, as `episode,step,hash` lines.
+
+    The hash only depends on the occupants of the grid and their health, so two runs with the
+    same seed and settings write the same log as long as they play the same games. Diffing the
+    logs of two versions of the engine shows the first step where they diverge.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the log.
+
+        Args:
+            path (str): The text file the hashes are written to.
+        """
+        self.__file = open(path, "w")
+
+    def on_step(self, environment: Environment, episode: int, step: int) -> None:
+        """Write the hash of the state reached by the step."""
+        self.__file.write(f"{episode},{step},{environment.state_hash():016x}\n")
+
+    def close(self) -> None:
+        """Close the log."""
+        self.__file.close()
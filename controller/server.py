@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from collections import deque
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+
+from controller.simulation_listener import SimulationListener
+
+if TYPE_CHECKING:
+    from controller.simulator import Simulator
+    from model.environment import Environment
+
+
+logger = logging.getLogger(__name__)
+
+EMPTY = -1
+
+
+class FrameEncoder:
+    """
+    Encodes the grid of an environment as an array of class codes.
+
+    A code is the index of the agent class in the list given at construction, and EMPTY marks
+    a cell without a known agent. Consecutive frames are compared to send only changed cells.
+    """
+
+    def __init__(self, classes: list[type]) -> None:
+        """
+        Initialise the encoder.
+
+        Args:
+            classes (list[type]): The agent classes, in code order.
+        """
+        self.__codes = {agent_class: code for code, agent_class in enumerate(classes)}
+
+    def encode(self, environment: Environment) -> np.ndarray:
+        """
+        Returns the class code of every cell.
+
+        Args:
+            environment (Environment): The environment to encode.
+
+        Returns:
+            np.ndarray: A (height, width) array of codes.
+        """
+        codes = self.__codes
+        return np.array([[codes.get(type(agent), EMPTY) for agent in row] for row in environment.get_grid()],
+                        dtype=np.int8)
+
+    @staticmethod
+    def diff(old: np.ndarray, new: np.ndarray) -> list[list[int]]:
+        """
+        Returns the cells that differ between two frames.
+
+        Args:
+            old (np.ndarray): The frame the receiver holds.
+            new (np.ndarray): The frame to bring the receiver to.
+
+        Returns:
+            list[list[int]]: One [x, y, code] triple per changed cell, with the code from new.
+        """
+        ys, xs = np.nonzero(old != new)
+        return np.stack([xs, ys, new[ys, xs]], axis=1).tolist()
+
+
+class _Client:
+    """Connection state of one viewer."""
+
+    def __init__(self, writer: asyncio.StreamWriter, frame: np.ndarray, backlog: int) -> None:
+        self.writer = writer
+        self.frame = frame
+        self.version = 0
+        self.dropped = 0
+        self.messages: deque[dict] = deque(maxlen=backlog)
+        self.wake = asyncio.Event()
+
+
+class SimulationServer(SimulationListener):
+    """
+    Runs a simulator on a worker thread and streams its state to viewers over a local socket.
+
+    Viewers connect over TCP or a Unix socket and receive JSON lines: a hello message with the
+    grid size and the class colours, grid diffs while episodes are played, a summary after each
+    episode, and a bye message when the simulation ends. The simulation never waits for a viewer.
+    Each viewer is sent the difference between the last frame it received and the newest one, so
+    frames published while a viewer is still draining earlier output are merged and dropped.
+    """
+
+    def __init__(self, simulator: Simulator, colours: dict, width: int, height: int,
+                 host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None,
+                 max_fps: Optional[float] = 30.0, backlog: int = 64) -> None:
+        """
+        Initialise the server and register it with the simulator.
+
+        Args:
+            simulator (Simulator): The simulator to run.
+            colours (dict): Agent class to colour, with None for empty cells, as used by the Gui.
+            width (int): The grid width.
+            height (int): The grid height.
+            host (str): The TCP host to listen on.
+            port (int): The TCP port to listen on.
+            unix_path (Optional[str]): Listen on this Unix socket instead of TCP.
+            max_fps (Optional[float]): Most frames published per second, or None for every step.
+            backlog (int): Episode summaries kept for a slow viewer before the oldest are dropped.
+        """
+        self.__simulator = simulator
+        self.__classes = [agent_class for agent_class in colours if agent_class is not None]
+        self.__encoder = FrameEncoder(self.__classes)
+        self.__hello = {
+            "type": "hello",
+            "width": width,
+            "height": height,
+            "classes": [agent_class.__name__ for agent_class in self.__classes],
+            "colours": {agent_class.__name__: colours[agent_class] for agent_class in self.__classes},
+            "empty": colours.get(None, "white"),
+        }
+
+        self.__host = host
+        self.__port = port
+        self.__unix_path = unix_path
+        self.__min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.__backlog = backlog
+
+        self.__empty = np.full((height, width), EMPTY, dtype=np.int8)
+        self.__latest = self.__empty
+        self.__latest_step = (0, 0)
+        self.__version = 0
+        self.__last_publish = 0.0
+
+        self.__clients: set[_Client] = set()
+        self.__tasks: set[asyncio.Task] = set()
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__server: Optional[asyncio.AbstractServer] = None
+
+        simulator.add_listener(self)
+
+    def get_address(self):
+        """
+        Returns the address the server listens on, once started.
+
+        Returns:
+            The (host, port) pair for TCP, or the socket path for a Unix socket.
+        """
+        if self.__unix_path:
+            return self.__unix_path
+        return self.__server.sockets[0].getsockname()[:2]
+
+    def on_step(self, environment: Environment, episode: int, step: int) -> None:
+        """Encode the grid for the viewers, at most max_fps times per second and only if someone watches."""
+        if not self.__clients or self.__loop is None:
+            return
+
+        now = time.monotonic()
+        if now - self.__last_publish < self.__min_interval:
+            return
+        self.__last_publish = now
+
+        frame = self.__encoder.encode(environment)
+        self.__loop.call_soon_threadsafe(self.__publish_frame, frame, episode, step)
+
+    def on_episode(self, summary: dict) -> None:
+        """Forward the episode summary to the viewers."""
+        if self.__loop is not None:
+            self.__loop.call_soon_threadsafe(self.__publish_message, {"type": "episode", **summary})
+
+    async def start(self) -> None:
+        """Start listening for viewers."""
+        self.__loop = asyncio.get_running_loop()
+        if self.__unix_path:
+            self.__server = await asyncio.start_unix_server(self.__handle_client, path=self.__unix_path)
+        else:
+            self.__server = await asyncio.start_server(self.__handle_client, self.__host, self.__port)
+        logger.info("Serving simulation on %s", self.get_address())
+
+    async def close(self) -> None:
+        """Say goodbye to the viewers once their pending output is written, then stop listening."""
+        self.__publish_message({"type": "bye"})
+        if self.__tasks:
+            await asyncio.wait(self.__tasks, timeout=5.0)
+
+        self.__server.close()
+        await self.__server.wait_closed()
+
+    async def serve(self) -> None:
+        """Start the server, run the simulation on a worker thread and close once it is over."""
+        await self.start()
+        try:
+            await asyncio.to_thread(self.__simulator.run)
+        finally:
+            self.__simulator.stop()
+            await self.close()
+
+    def run(self) -> None:
+        """Serve the simulation until it ends or the process is interrupted."""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            self.__simulator.stop()
+
+    def __publish_frame(self, frame: np.ndarray, episode: int, step: int) -> None:
+        """Make a frame the newest one and wake the viewers."""
+        self.__latest = frame
+        self.__latest_step = (episode, step)
+        self.__version += 1
+        for client in self.__clients:
+            client.wake.set()
+
+    def __publish_message(self, message: dict) -> None:
+        """Queue a message for every viewer."""
+        for client in self.__clients:
+            client.messages.append(message)
+            client.wake.set()
+
+    async def __handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Register a viewer and write to it until it disconnects or the server closes."""
+        client = _Client(writer, self.__empty, self.__backlog)
+        writer.transport.set_write_buffer_limits(high=1 << 16)
+        writer.write(json.dumps(self.__hello).encode() + b"\n")
+        client.wake.set()
+
+        self.__clients.add(client)
+        task = asyncio.current_task()
+        self.__tasks.add(task)
+        logger.info("Viewer connected (%d watching)", len(self.__clients))
+
+        try:
+            await self.__write_client(client)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.__clients.discard(client)
+            self.__tasks.discard(task)
+            writer.close()
+            logger.info("Viewer disconnected after %d dropped frames", client.dropped)
+
+    async def __write_client(self, client: _Client) -> None:
+        """Send queued messages and the newest frame each time the viewer is woken."""
+        while True:
+            await client.wake.wait()
+            client.wake.clear()
+
+            lines = []
+            if client.version < self.__version:
+                client.dropped += self.__version - client.version - 1
+                episode, step = self.__latest_step
+                lines.append({"type": "frame", "episode": episode, "step": step,
+                              "cells": FrameEncoder.diff(client.frame, self.__latest)})
+                client.frame = self.__latest
+                client.version = self.__version
+
+            done = False
+            while client.messages:
+                message = client.messages.popleft()
+                lines.append(message)
+                done = done or message["type"] == "bye"
+
+            client.writer.write(b"".join(json.dumps(line).encode() + b"\n" for line in lines))
+            await client.writer.drain()
+
+            if done:
+                return
+
+
+def main() -> None:
+    """Run a headless simulation and stream it to viewers."""
+    from controller.config.config import Config
+    from controller.simulator import Simulator, AGENT_COLOURS
+
+    parser = argparse.ArgumentParser(description="Serve a simulation to remote viewers.")
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", dest="unix_path", default=None, help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--fps", type=float, default=30.0, help="most frames sent per second")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    simulator = Simulator(num_episodes=args.episodes, log_dir="simulation_logs", plot_dir="simulation_plots")
+    SimulationServer(simulator, AGENT_COLOURS, Config.world_size, Config.world_size,
+                     host=args.host, port=args.port, unix_path=args.unix_path, max_fps=args.fps).run()
+
+
+if __name__ == "__main__":
+    main()
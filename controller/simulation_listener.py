@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from model.environment import Environment
+
+
+class SimulationListener:
+    """
+    Receives progress updates from a running Simulator.
+
+    Subclasses override the hooks they are interested in. Hooks are called on the thread
+    running the simulation, so they should return quickly and hand any slow work elsewhere.
+    """
+
+    def on_step(self, environment: Environment, episode: int, step: int) -> None:
+        """
+        Called after every step of an episode.
+
+        Args:
+            environment (Environment): The environment after the step.
+            episode (int): The episode number, starting at 1.
+            step (int): The number of steps played in the episode.
+        """
+        pass
+
+    def on_episode(self, summary: dict) -> None:
+        """
+        Called once an episode is over.
+
+        Args:
+            summary (dict): The metrics recorded for the episode.
+        """
+        pass
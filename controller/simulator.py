@@ -1,9 +1,11 @@
 import time
 import json
 import csv
+import logging
 import os
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 import matplotlib.pyplot as plt
 import numpy as np
 
@@ -19,66 +21,107 @@ from model.agents.the_thing import TheThing
 from model.agents.human_torch import HumanTorch
 from model.agents.headquarter import Headquarter
 from model.agents.franklin import Franklin
+from model.agents.greedy_policy import GreedyPolicy
+from model.agents.q_table_storage import get_storage
 
 from model.location import Location
 
 from controller.config.bridge_config import BridgeConfig
 from controller.config.galactus_config import GalactusConfig
+from controller.config.silver_surfer_config import SilverSurferConfig
 from controller.config.config import Config
+from controller.config.learning_config import LearningConfig
+from controller.agent_schedule import AgentSchedule
+from controller.checkpoint_writer import CheckpointWriter
+from controller.convergence import ConvergenceMonitor
+from controller.stall_detector import StallDetector
+from controller.simulation_listener import SimulationListener
 
 from view.gui import Gui
 
+AGENT_COLOURS = {Galactus: "red", ReedRichards: "blue", SueStorm: "green",
+                 TheThing: "black", None: "white", SilverSurfer: "cyan",
+                 HumanTorch: "yellow", Bridge: "magenta", Headquarter: "orange",
+                 Franklin: "pink"}
+
+logger = logging.getLogger(__name__)
+
 
 class Simulator:
     """Class representing a simulator with enhanced metrics tracking."""
 
-    def __init__(self, num_episodes=100, log_dir="logs", plot_dir="plots", gui_flag: bool = False) -> None:
+    def __init__(self, num_episodes=100, log_dir="logs", plot_dir="plots", gui_flag: bool = False,
+                 checkpoint_every: int = 1, policies: Optional[dict[str, GreedyPolicy]] = None,
+                 on_convergence: Optional[str] = None) -> None:
         """
         Initialise the Simulator object.
 
         Initialises the simulation step, the Mars environment, and generates the initial population of agents.
+
+        Args:
+            num_episodes (int): Number of episodes to run.
+            log_dir (str): Directory for the metric logs.
+            plot_dir (str): Directory for the metric plots.
+            gui_flag (bool): Whether to render the grid in a window.
+            checkpoint_every (int): Number of episodes between two saves of the Q-tables.
+            policies (Optional[dict[str, GreedyPolicy]]): Frozen policies by agent class name. When
+                given, the agents act greedily with them, nothing is learned and nothing is written to disk.
+            on_convergence (Optional[str]): What to do once learning has converged: "stop" ends the run,
+                "exploit" lowers exploration to LearningConfig.exploit_epsilon, None only records it.
         """
         self.__simulation_step = 0
+        # decisions still under way by agent name: the agent and [discounted reward, discount, steps]
+        self.__returns: dict[str, tuple[Agent, list]] = {}
+        self.__epsilon: Optional[float] = None
         self.__earth = Earth()
         self.__agents = []
+        self.__schedule = AgentSchedule()
         self.__generate_initial_population()
+        self.__schedule_introductions()
+        # the population every episode starts from, restored at each reset instead of being rebuilt
+        self.__initial_population = (self.__earth.snapshot(), tuple(self.__agents))
         self.__is_running = False
+        self.__listeners: list[SimulationListener] = []
+        self.__policies = policies
+        self.__learning = policies is None
+        self.__on_convergence = on_convergence
+        self.__checkpoints: Optional[CheckpointWriter] = None
+        self.__convergence = ConvergenceMonitor(LearningConfig.convergence_window, LearningConfig.convergence_patience,
+                                                LearningConfig.q_tolerance, LearningConfig.win_rate_tolerance)
+        self.__stall = StallDetector(Config.stall_window) if Config.stall_window > 0 else None
 
-        agent_colours = {Galactus: "red", ReedRichards: "blue", SueStorm: "green", 
-                         TheThing: "black", None: "white", SilverSurfer: "cyan", 
-                         HumanTorch: "yellow", Bridge: "magenta", Headquarter: "orange", 
-                         Franklin: "pink"}
-        
         self.__gui_flag = gui_flag
 
-        self.__gui = Gui(self.__earth, agent_colours) if self.__gui_flag else None
+        self.__gui = Gui(self.__earth, AGENT_COLOURS) if self.__gui_flag else None
 
-        self.__ss_intro_step = 5
-        self.__gal_intro_step = 10
-        
         # Metrics tracking
         self.num_episodes = num_episodes
+        self.checkpoint_every = max(1, checkpoint_every)
         self.current_episode = 0
         self.metrics = {
             'episode_rewards': [],
             'episode_lengths': [],
-            'win_status': [],  # 1 for win, 0 for loss
+            'win_status': [],  # 1 for win, 0 for loss or truncation
+            'outcomes': [],  # WON, LOST or TRUNCATED
             'hero_rewards': [],
             'villain_rewards': [],
-            'timestep_rewards': []  # For detailed per-timestep tracking
+            'timestep_rewards': [],  # For detailed per-timestep tracking
+            'convergence': []  # |ΔQ| and windowed win rate after each episode
         }
         
         # Setup directories
         self.log_dir = Path(log_dir)
         self.plot_dir = Path(plot_dir)
-        self.log_dir.mkdir(exist_ok=True)
-        self.plot_dir.mkdir(exist_ok=True)
-        
+
         # Create unique run identifier
         self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Initialize logging
-        self._init_logging()
+
+        if self.__learning:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self.plot_dir.mkdir(parents=True, exist_ok=True)
+
+            # Initialize logging
+            self._init_logging()
 
     def _init_logging(self):
         """Initialize logging files."""
@@ -87,8 +130,16 @@ class Simulator:
         with open(self.csv_log_path, 'w', newline='') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(['episode', 'reward', 'length', 'win_status', 
-                            'avg_hero_reward', 'avg_villain_reward'])
+                            'avg_hero_reward', 'avg_villain_reward',
+                            'mean_dq', 'max_dq', 'windowed_win_rate', 'stable_episodes', 'outcome'])
         
+        # Q-table statistics at every checkpoint
+        self.q_table_log_path = self.log_dir / f"q_tables_{self.run_id}.csv"
+        with open(self.q_table_log_path, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['episode', 'table', 'entries', 'states', 'actions', 'bytes', 'mean_visits',
+                             'evicted'])
+
         # JSON log file for detailed metrics
         self.json_log_path = self.log_dir / f"detailed_metrics_{self.run_id}.json"
         
@@ -99,6 +150,19 @@ class Simulator:
             f.write(f"Start Time: {datetime.now()}\n")
             f.write("=" * 50 + "\n\n")
 
+    def add_listener(self, listener: SimulationListener) -> None:
+        """
+        Registers a listener notified after every step and every episode.
+
+        Args:
+            listener (SimulationListener): The listener to notify.
+        """
+        self.__listeners.append(listener)
+
+    def stop(self) -> None:
+        """Asks a running simulation to stop after the current step."""
+        self.__is_running = False
+
     def __generate_initial_population(self) -> None:
         """Generate the initial population of agents in the simulation.
         This method creates a set of agents and places them randomly on the Earth Grid.
@@ -110,61 +174,94 @@ class Simulator:
         ]
 
         for loc in bridge_locations:
-            bridge = Bridge(loc,health = BridgeConfig.initial_bridge_health)
-            self.__agents.append(bridge)
-            self.__earth.set_agent(bridge, loc)
+            self.__add_agent(Bridge(loc,health = BridgeConfig.initial_bridge_health))
         
 
-        self.__agents.append(ReedRichards(Location(0, 0)))
-        self.__earth.set_agent(ReedRichards(Location(0,0)), Location(0,0))
-
-        self.__agents.append(SueStorm(Location(1,1)))
-        self.__earth.set_agent(SueStorm(Location(1,1)),Location(1,1))
-        
-        self.__agents.append(TheThing(Location(4,4)))
-        self.__earth.set_agent(TheThing(Location(4,4)),Location(4,4))
-        
-        self.__agents.append(HumanTorch(Location(13,13)))
-        self.__earth.set_agent(HumanTorch(Location(13,13)),Location(13,13))
-
-        self.__agents.append(Franklin(Location(6,6)))
-        self.__earth.set_agent(Franklin(Location(6,6)), Location(6,6))
-
-        self.__agents.append(Headquarter(Location(0,19)))
-        self.__earth.set_agent(Headquarter(Location(0,19)),Location(0,19))
-
+        agents = [
+            ReedRichards(Location(0, 0)),
+            SueStorm(Location(1, 1)),
+            TheThing(Location(4, 4)),
+            HumanTorch(Location(13, 13)),
+            Franklin(Location(6, 6)),
+            Headquarter(Location(0, 19)),
+        ]
 
-    def __find_empty_locations(self, r: int = 0) -> Location:
-    
-        grid = self.__earth.get_grid()
-        n = len(grid) 
-
-        region_size = 2 * r + 1
-
-        for y in range(n):
-            for x in range(n):
-                ok = True
-                for dy in range(region_size):
-                    for dx in range(region_size):
-                        ny = (y + dy) % n
-                        nx = (x + dx) % n
-                        if grid[ny][nx] is not None:
-                            ok = False
-                            break
-                    if not ok:
-                        break
-                if ok:
-                    cx = (x + r) % n
-                    cy = (y + r) % n
-                    return Location(cx, cy, r)
-
-        return None
+        for agent in agents:
+            self.__add_agent(agent)
+
+
+    def __reset_population(self) -> None:
+        """Put the initial population and the villain introductions back for a new episode."""
+        snapshot, agents = self.__initial_population
+        self.__earth.restore(snapshot)
+        self.__agents = list(agents)
+        self.__schedule.clear()
+        for agent in agents:
+            if self.__epsilon is not None:
+                agent.epsilon = self.__epsilon
+            self.__schedule.add(agent)
+        if self.__stall is not None:
+            self.__stall.reset()
+        # decisions a truncated episode cut short are dropped rather than learned from a partial interval
+        self.__returns.clear()
+
+    def __should_truncate(self, step: int) -> bool:
+        """Whether a running episode has played Config.max_episode_steps steps or stalled."""
+        if 0 < Config.max_episode_steps <= step:
+            logger.debug("Episode %d reached the cap of %d steps", self.current_episode, Config.max_episode_steps)
+            return True
+        if self.__stall is not None and self.__stall.record(self.__earth.get_bridge_health(), self.__earth.state_hash()):
+            logger.debug("Episode %d stalled: no bridge health change in %d steps", self.current_episode,
+                         self.__stall.steps_without_progress())
+            return True
+        return False
+
+    def __add_agent(self, agent: Agent) -> None:
+        """Place an agent on the grid and add it to the population and its schedule."""
+        if self.__epsilon is not None:
+            agent.epsilon = self.__epsilon
+        self.__agents.append(agent)
+        self.__schedule.add(agent)
+        self.__earth.set_agent(agent, agent.get_location())
+
+    def __save_q_tables(self) -> None:
+        """Evict, checkpoint and report the Q-table of every decision-making agent class once."""
+        saved = set()
+        rows = []
+        for agent in self.__schedule.actors():
+            if agent.table_name() not in saved:
+                agent.compact_q()
+                agent.checkpoint_q(self.__checkpoints)
+                saved.add(agent.table_name())
+
+                stats = agent.q_table_stats()
+                if stats is not None:
+                    rows.append([self.current_episode, agent.table_name(), stats['entries'], stats['states'],
+                                 stats['actions'], stats['bytes'], f"{stats['mean_visits']:.2f}", stats['evicted']])
+                    logger.debug("%s Q-table: %d entries over %d states, %d bytes, %.2f visits per entry, %d evicted",
+                                 agent.table_name(), stats['entries'], stats['states'], stats['bytes'],
+                                 stats['mean_visits'], stats['evicted'])
+
+        with open(self.q_table_log_path, 'a', newline='') as csvfile:
+            csv.writer(csvfile).writerows(rows)
+
+    def __schedule_introductions(self) -> None:
+        """Schedule the villains to enter the episode once their introduction step has been played."""
+        scheduler = self.__earth.get_scheduler()
+        scheduler.schedule(SilverSurferConfig.ss_intro_step, self.__add_silver_surfer)
+        scheduler.schedule(GalactusConfig.gal_intro_step, self.__add_galactus)
+
+    def __find_empty_locations(self, r: int = 0) -> Optional[Location]:
+        """Return the centre of the first empty (2r+1)x(2r+1) region of the grid, or None if there is no space."""
+        return self.__earth.find_empty_region(r)
 
 
     def __add_silver_surfer(self):
         empty_loc = self.__find_empty_locations(r = 1)
-        self.__agents.append(SilverSurfer(empty_loc))
-        self.__earth.set_agent(SilverSurfer(empty_loc),empty_loc)
+        if empty_loc is None:
+            return
+
+        self.__add_agent(SilverSurfer(empty_loc))
     
 
     def __add_galactus(self):
@@ -176,24 +273,28 @@ class Simulator:
             rand_y = random.randint(0, Config.world_size - 1)
             empty_loc = Location(rand_x, rand_y, GalactusConfig.gal_dest_zone)
 
-        self.__agents.append(Galactus(empty_loc))
-        self.__earth.set_agent(Galactus(empty_loc),empty_loc)
+        self.__add_agent(Galactus(empty_loc))
 
     def _log_episode_summary(self, episode, episode_reward, episode_length, win_status, 
-                            hero_reward, villain_reward):
+                            hero_reward, villain_reward, outcome=None):
         """Log summary of an episode."""
+        outcome = outcome or ("WON" if win_status == 1 else "LOST")
+        convergence = self.metrics['convergence'][-1]
+
         # CSV logging
         with open(self.csv_log_path, 'a', newline='') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow([episode, episode_reward, episode_length, win_status, 
-                            hero_reward, villain_reward])
+                            hero_reward, villain_reward,
+                            convergence['mean_dq'], convergence['max_dq'],
+                            convergence['win_rate'], convergence['stable_episodes'], outcome])
         
         # Text logging
         with open(self.episode_log_path, 'a') as f:
-            status = "WON" if win_status == 1 else "LOST"
-            f.write(f"Episode {episode}: {status} | Length: {episode_length} | "
+            f.write(f"Episode {episode}: {outcome} | Length: {episode_length} | "
                    f"Reward: {episode_reward:.2f} | "
-                   f"Hero R: {hero_reward:.2f} | Villain R: {villain_reward:.2f}\n")
+                   f"Hero R: {hero_reward:.2f} | Villain R: {villain_reward:.2f} | "
+                   f"Max |dQ|: {convergence['max_dq']:.5f} | Win rate: {convergence['win_rate']:.2f}\n")
         
         # JSON logging (update after each episode)
         self._update_json_log()
@@ -206,16 +307,20 @@ class Simulator:
             'avg_reward': np.mean(self.metrics['episode_rewards']) if self.metrics['episode_rewards'] else 0,
             'avg_episode_length': np.mean(self.metrics['episode_lengths']) if self.metrics['episode_lengths'] else 0,
             'win_rate': np.mean(self.metrics['win_status']) if self.metrics['win_status'] else 0,
+            'truncated_episodes': self.metrics['outcomes'].count(FightStatus.TRUNCATED.name),
             'avg_hero_reward': np.mean(self.metrics['hero_rewards']) if self.metrics['hero_rewards'] else 0,
             'avg_villain_reward': np.mean(self.metrics['villain_rewards']) if self.metrics['villain_rewards'] else 0,
+            'converged_at': self.__convergence.converged_at(),
             'episode_details': [
                 {
                     'episode': i+1,
                     'reward': self.metrics['episode_rewards'][i],
                     'length': self.metrics['episode_lengths'][i],
                     'win_status': self.metrics['win_status'][i],
+                    'outcome': self.metrics['outcomes'][i],
                     'hero_reward': self.metrics['hero_rewards'][i],
-                    'villain_reward': self.metrics['villain_rewards'][i]
+                    'villain_reward': self.metrics['villain_rewards'][i],
+                    'convergence': self.metrics['convergence'][i]
                 }
                 for i in range(len(self.metrics['episode_rewards']))
             ]
@@ -285,15 +390,30 @@ class Simulator:
     def run(self) -> None:
         """Run the simulation for multiple episodes with metrics tracking."""
         self.__is_running = True
-
+        if self.__learning:
+            # Q-tables are written on a background thread while the next episodes are played
+            self.__checkpoints = CheckpointWriter(get_storage())
+
+        try:
+            self.__run_episodes()
+        finally:
+            if self.__checkpoints is not None:
+                self.__checkpoints.close()
+
+        if self.__learning:
+            self._plot_metrics()
+            self._print_final_summary()
+
+    def __run_episodes(self) -> None:
+        """Play the episodes, learning and checkpointing the Q-tables unless policies were given."""
         # Initial setup
-        state_dict = {agent.name(): agent.get_state(self.__earth) for agent in self.__agents}
-        action_dict = {agent.name(): None for agent in self.__agents}
+        state_dict = self.__observations(self.__schedule.actors())
+        action_dict = {agent.name(): None for agent in self.__schedule.actors()}
 
         # Episode loop
         for episode in range(self.num_episodes):
             self.current_episode = episode + 1
-            print(f"\nStarting Episode {self.current_episode}/{self.num_episodes}")
+            logger.debug("Starting Episode %d/%d", self.current_episode, self.num_episodes)
             
             # Reset episode metrics
             episode_reward = 0
@@ -303,57 +423,70 @@ class Simulator:
             
             # Episode simulation loop
             while self.__is_running:
-                h_rw, v_rw = self.__update(state_dict, action_dict)
+                h_rw, v_rw = self.__update(state_dict, action_dict, step)
                 episode_hero_reward += h_rw
                 episode_villain_reward += v_rw
                 episode_reward = episode_hero_reward - episode_villain_reward
                 
                 step += 1
 
+                for listener in self.__listeners:
+                    listener.on_step(self.__earth, self.current_episode, step)
+
                 if self.__gui_flag:
                     self.__render()
                     # time.sleep(0.5)
                 
-                # Add Silver Surfer and Galactus at specified steps
-                if step == self.__ss_intro_step:
-                    self.__add_silver_surfer()
-                
-                if step == self.__gal_intro_step:
-                    self.__add_galactus()
-
                 # Check for episode termination
                 status = self.__earth.get_status()
-                if status in [FightStatus.WON, FightStatus.LOST]:
+                if status is FightStatus.RUNNING and self.__should_truncate(step):
+                    # the last step was learned as a non-terminal one, so a truncated episode still bootstraps
+                    self.__earth.truncate()
+                    status = FightStatus.TRUNCATED
+
+                if status in [FightStatus.WON, FightStatus.LOST, FightStatus.TRUNCATED]:
                     # Save Q-tables and record metrics
-                    for agent in self.__agents:
-                        agent.save_q()
+                    if self.__learning and self.current_episode % self.checkpoint_every == 0:
+                        self.__save_q_tables()
                     
                     # Record episode metrics
                     win_status = 1 if status == FightStatus.WON else 0
                     self.metrics['episode_rewards'].append(episode_reward)
                     self.metrics['episode_lengths'].append(step)
                     self.metrics['win_status'].append(win_status)
+                    self.metrics['outcomes'].append(status.name)
                     self.metrics['hero_rewards'].append(episode_hero_reward)
                     self.metrics['villain_rewards'].append(episode_villain_reward)
+                    if self.__learning:
+                        self.metrics['convergence'].append(self.__convergence.end_episode(win_status))
                     
                     # Log episode summary
-                    self._log_episode_summary(
-                        self.current_episode, episode_reward, step, win_status,
-                        episode_hero_reward, episode_villain_reward
-                    )
+                    if self.__learning:
+                        self._log_episode_summary(
+                            self.current_episode, episode_reward, step, win_status,
+                            episode_hero_reward, episode_villain_reward, status.name
+                        )
+
+                    summary = {'episode': self.current_episode, 'win_status': win_status, 'outcome': status.name,
+                               'length': step, 'reward': episode_reward,
+                               'hero_reward': episode_hero_reward,
+                               'villain_reward': episode_villain_reward}
+                    for listener in self.__listeners:
+                        listener.on_episode(summary)
                     
                     # Plot metrics periodically
-                    if self.current_episode % 10 == 0:
+                    if self.__learning and self.current_episode % 10 == 0:
                         self._plot_metrics()
+
+                    if self.__convergence.converged_at() == self.current_episode:
+                        self.__handle_convergence()
                     
                     # Reset for next episode
-                    self.__earth.clear()
-                    self.__agents.clear()
-                    self.__generate_initial_population()
-                    state_dict = {agent.name(): agent.get_state(self.__earth) for agent in self.__agents}
+                    self.__reset_population()
+                    state_dict = self.__observations(self.__schedule.actors())
                     
-                    print(f"Episode {self.current_episode}: {'WON' if win_status else 'LOST'} "
-                          f"in {step} steps, Reward: {episode_reward:.2f}")
+                    logger.debug("Episode %d: %s in %d steps, Reward: %.2f", self.current_episode,
+                                 status.name, step, episode_reward)
                     break
                 
                 # Check for GUI close
@@ -364,14 +497,14 @@ class Simulator:
             if not self.__is_running:
                 break
         
-        # Final plots and summary
-        self._plot_metrics()
-        self._print_final_summary()
+        # Final checkpoint
+        if self.__learning and self.current_episode % self.checkpoint_every != 0:
+            self.__save_q_tables()
 
     def _print_final_summary(self):
         """Print a final summary of the simulation run."""
         if not self.metrics['episode_rewards']:
-            print("No episodes completed.")
+            logger.warning("No episodes completed.")
             return
             
         avg_reward = np.mean(self.metrics['episode_rewards'])
@@ -380,50 +513,97 @@ class Simulator:
         avg_hero_reward = np.mean(self.metrics['hero_rewards'])
         avg_villain_reward = np.mean(self.metrics['villain_rewards'])
         
-        print("\n" + "="*60)
-        print("SIMULATION SUMMARY")
-        print("="*60)
-        print(f"Total Episodes: {len(self.metrics['episode_rewards'])}")
-        print(f"Average Reward: {avg_reward:.2f}")
-        print(f"Average Episode Length: {avg_length:.2f} steps")
-        print(f"Win Rate: {win_rate:.2%}")
-        print(f"Average Hero Reward: {avg_hero_reward:.2f}")
-        print(f"Average Villain Reward: {avg_villain_reward:.2f}")
-        print(f"Metrics saved to: {self.log_dir}")
-        print(f"Plots saved to: {self.plot_dir}")
-        print("="*60)
+        lines = [
+            "=" * 60,
+            "SIMULATION SUMMARY",
+            "=" * 60,
+            f"Total Episodes: {len(self.metrics['episode_rewards'])}",
+            f"Average Reward: {avg_reward:.2f}",
+            f"Average Episode Length: {avg_length:.2f} steps",
+            f"Win Rate: {win_rate:.2%}",
+            f"Truncated Episodes: {self.metrics['outcomes'].count(FightStatus.TRUNCATED.name)}",
+            f"Average Hero Reward: {avg_hero_reward:.2f}",
+            f"Average Villain Reward: {avg_villain_reward:.2f}",
+            f"Metrics saved to: {self.log_dir}",
+            f"Plots saved to: {self.plot_dir}",
+            "=" * 60,
+        ]
+        logger.info("\n".join(lines))
 
     def __render(self) -> None:
         """Render the current state of the simulation."""
         self.__gui.render()
 
-    def __update(self, state_dict, action_dict) -> int:
+    def __update(self, state_dict, action_dict, step: int) -> int:
         """Update the simulation state."""
-        for agent in self.__agents:
-            if agent.get_location() is None:
-                continue
-
-            action = agent.pick_action(self.__earth)
+        due = [agent for agent in self.__schedule.due(step) if agent.get_location() is not None]
+
+        observations = self.__observe(due) if self.__learning else [None] * len(due)
+
+        for agent, observation in zip(due, observations):
+            if self.__learning:
+                action = agent.pick_action(self.__earth, observation)
+                # the decision is learned from once it ends, decision_interval steps later
+                state_dict[agent.name()] = observation
+                self.__returns[agent.name()] = (agent, [0.0, 1.0, 0])
+            else:
+                action = self.__policies[agent.__class__.__name__].choose(agent, self.__earth)
             action_dict[agent.name()] = action
             self.__earth.register_action(action)
 
         h_reward, v_reward = self.__earth.execute_actions()
 
-        for agent in self.__agents:
-            if agent.get_location() is None:
-                continue
+        if self.__learning:
+            self.__learn(due, state_dict, action_dict, h_reward, v_reward)
 
-            a_reward = h_reward if agent.get_agent_role() is AgentRole.HERO else v_reward
-            new_state = agent.get_state(self.__earth)
+        self.__simulation_step += 1
 
-            if agent.name() not in state_dict:
-                state_dict[agent.name()] = new_state
-                continue
+        return h_reward, v_reward
 
-            agent.update_q(state_dict[agent.name()], action_dict[agent.name()],
-                        a_reward, new_state, self.__earth)
-            state_dict[agent.name()] = new_state
+    def __handle_convergence(self) -> None:
+        """Stop the run or lower exploration once learning has converged, as configured."""
+        logger.info("Learning converged after %d episodes", self.current_episode)
 
-        self.__simulation_step += 1
+        if self.__on_convergence == "stop":
+            self.__is_running = False
+        elif self.__on_convergence == "exploit":
+            self.__epsilon = LearningConfig.exploit_epsilon
 
-        return h_reward, v_reward
+    def __observe(self, agents: list[Agent]) -> list:
+        """Return the observation of every agent, encoding the discrete states of all of them in one pass."""
+        encoded = [agent for agent in agents if agent.state_target_role is not None and not agent.uses_linear_q]
+        states = dict(zip(map(id, encoded), self.__earth.get_states(encoded))) if encoded else {}
+        return [states[id(agent)] if id(agent) in states else agent.observation(self.__earth) for agent in agents]
+
+    def __observations(self, agents: list[Agent]) -> dict:
+        """Return the observations of agents keyed by agent name."""
+        return {agent.name(): observation for agent, observation in zip(agents, self.__observe(agents))}
+
+    def __learn(self, due, state_dict, action_dict, h_reward, v_reward) -> None:
+        """
+        Add the step's rewards to the decisions under way, and update the Q-tables of the agents whose decision ended.
+
+        A decision ends after decision_interval steps, when the agent decides again, or with the
+        episode. Its reward is the sum of the rewards of its steps, discounted to the decision.
+        """
+        done = self.__earth.get_status() in (FightStatus.WON, FightStatus.LOST)
+        ended = []
+        for name, (agent, returns) in list(self.__returns.items()):
+            returns[0] += returns[1] * (h_reward if agent.get_agent_role() is AgentRole.HERO else v_reward)
+            returns[1] *= agent.gamma
+            returns[2] += 1
+            if done or returns[2] >= max(1, agent.decision_interval):
+                del self.__returns[name]
+                if agent.get_location() is not None:
+                    ended.append((agent, returns[0]))
+
+        for (agent, reward), new_state in zip(ended, self.__observe([agent for agent, _ in ended])):
+            delta = agent.update_q(state_dict[agent.name()], action_dict[agent.name()],
+                                   reward, new_state, self.__earth, done)
+            self.__convergence.record(agent.__class__.__name__, delta)
+
+        planned = set()
+        for agent in due:
+            if agent.table_name() not in planned:
+                agent.plan()
+                planned.add(agent.table_name())
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Hashable
+
+
+class StallDetector:
+    """
+    Tells when an episode has stopped going anywhere.
+
+    Every step reports the progress of the fight, the health of the bridges, together with a
+    hash of the state of the Earth. An episode has stalled once the progress has not changed
+    for `window` steps and the Earth is back in a state it was already in during those steps,
+    as when heroes oscillate between the same cells without repairing anything.
+    """
+
+    def __init__(self, window: int = 200) -> None:
+        """
+        Initialise the detector.
+
+        Args:
+            window (int): The number of steps without progress after which a repeated state means a stall.
+        """
+        self.__window = max(1, window)
+        self.__progress: Hashable = None
+        self.__hashes: deque[int] = deque(maxlen=self.__window)
+        self.__seen: dict[int, int] = {}
+        self.__unchanged = 0
+
+    def reset(self) -> None:
+        """Forgets the steps recorded so far, at the start of an episode."""
+        self.__progress = None
+        self.__hashes.clear()
+        self.__seen.clear()
+        self.__unchanged = 0
+
+    def record(self, progress: Hashable, state_hash: int) -> bool:
+        """
+        Records one step.
+
+        Args:
+            progress (Hashable): What changes when the fight moves on, the health of the bridges.
+            state_hash (int): The hash of the state of the Earth after the step.
+
+        Returns:
+            bool: True if the episode has stalled.
+        """
+        if progress != self.__progress:
+            self.reset()
+            self.__progress = progress
+        else:
+            self.__unchanged += 1
+
+        repeated = state_hash in self.__seen
+
+        # the hashes of the last `window` steps, with how often each occurs among them
+        if len(self.__hashes) == self.__window:
+            oldest = self.__hashes[0]
+            self.__seen[oldest] -= 1
+            if not self.__seen[oldest]:
+                del self.__seen[oldest]
+        self.__hashes.append(state_hash)
+        self.__seen[state_hash] = self.__seen.get(state_hash, 0) + 1
+
+        return self.__unchanged >= self.__window and repeated
+
+    def steps_without_progress(self) -> int:
+        """
+        Get the number of steps since the progress last changed.
+
+        Returns:
+            int: The number of steps.
+        """
+        return self.__unchanged
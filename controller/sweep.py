@@ -0,0 +1,460 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import importlib
+import inspect
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Union
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# modules whose configuration classes can be swept
+CONFIG_MODULES = (
+    "controller.config.config",
+    "controller.config.bridge_config",
+    "controller.config.galactus_config",
+    "controller.config.hero_config",
+    "controller.config.silver_surfer_config",
+    "controller.config.learning_config",
+)
+
+RESULT_FILE = "result.json"
+SWEEP_FILE = "sweep.json"
+
+SUMMARY_COLUMNS = ("episodes", "win_rate", "mean_length", "mean_hero_reward", "mean_villain_reward",
+                   "convergence_episode", "steps_per_sec", "wall_time")
+
+Value = Union[int, float]
+
+
+def config_classes() -> dict[str, type]:
+    """
+    Returns the configuration classes that can be swept.
+
+    Returns:
+        dict[str, type]: The classes by name.
+    """
+    classes = {}
+    for module_name in CONFIG_MODULES:
+        module = importlib.import_module(module_name)
+        for name, value in inspect.getmembers(module, inspect.isclass):
+            if value.__module__ == module_name:
+                classes[name] = value
+    return classes
+
+
+def resolve_parameter(key: str) -> tuple[type, str]:
+    """
+    Returns the configuration class and attribute named by a parameter key.
+
+    Args:
+        key (str): The key, "ClassName.attribute".
+
+    Returns:
+        tuple[type, str]: The configuration class and the attribute name.
+
+    Raises:
+        ValueError: If the key does not name a numeric (or unset) configuration value.
+    """
+    class_name, _, attribute = key.partition(".")
+    config = config_classes().get(class_name)
+    if config is None or not hasattr(config, attribute):
+        raise ValueError(f"Unknown configuration value: {key}")
+
+    current = getattr(config, attribute)
+    if isinstance(current, bool) or not isinstance(current, (int, float, type(None))):
+        raise ValueError(f"Configuration value {key} is not numeric")
+    return config, attribute
+
+
+def apply_overrides(overrides: dict[str, Value]) -> None:
+    """
+    Sets configuration values, keeping integer settings integral.
+
+    Agent classes read their configuration when they are defined, so overrides must be applied
+    before the agents are imported, which is why every configuration runs in a fresh process.
+
+    Args:
+        overrides (dict[str, Value]): Values keyed by "ClassName.attribute".
+
+    Raises:
+        ValueError: If a key does not name a numeric configuration value.
+    """
+    for key, value in overrides.items():
+        config, attribute = resolve_parameter(key)
+        setattr(config, attribute, int(value) if isinstance(getattr(config, attribute), int) else value)
+
+
+def parse_parameter(spec: str) -> tuple[str, Union[list[Value], tuple[float, float]]]:
+    """
+    Parses a parameter given on the command line.
+
+    Args:
+        spec (str): Either "Class.attr=v1,v2,..." for a list of values or "Class.attr=low:high" for a range.
+
+    Returns:
+        tuple: The key, and the list of values or the (low, high) range.
+
+    Raises:
+        ValueError: If the specification is malformed.
+    """
+    key, sep, values = spec.partition("=")
+    if not sep or "." not in key or not values:
+        raise ValueError(f"Expected Class.attribute=values, got {spec!r}")
+
+    def number(text: str) -> Value:
+        value = float(text)
+        return int(value) if value.is_integer() and "." not in text else value
+
+    if ":" in values:
+        low, high = values.split(":", 1)
+        return key, (float(low), float(high))
+    return key, [number(value) for value in values.split(",")]
+
+
+def grid_configurations(parameters: dict[str, list[Value]]) -> list[dict[str, Value]]:
+    """
+    Returns every combination of the parameter values.
+
+    Args:
+        parameters (dict[str, list[Value]]): The values of each parameter.
+
+    Returns:
+        list[dict[str, Value]]: One configuration per combination.
+    """
+    keys = sorted(parameters)
+    return [dict(zip(keys, values)) for values in itertools.product(*(parameters[key] for key in keys))]
+
+
+def random_configurations(parameters: dict, samples: int, seed: Optional[int] = None) -> list[dict[str, Value]]:
+    """
+    Returns configurations drawn at random, uniformly from ranges and from lists of values.
+
+    Args:
+        parameters (dict): A list of values or a (low, high) range for each parameter.
+        samples (int): The number of configurations to draw.
+        seed (Optional[int]): The random seed.
+
+    Returns:
+        list[dict[str, Value]]: The configurations.
+    """
+    rng = np.random.default_rng(seed)
+    configurations = []
+    for _ in range(samples):
+        configuration = {}
+        for key in sorted(parameters):
+            values = parameters[key]
+            if isinstance(values, tuple):
+                configuration[key] = float(rng.uniform(*values))
+            else:
+                configuration[key] = values[int(rng.integers(len(values)))]
+        configurations.append(configuration)
+    return configurations
+
+
+def config_id(configuration: dict[str, Value]) -> str:
+    """
+    Returns a stable identifier of a configuration.
+
+    Args:
+        configuration (dict[str, Value]): The configuration.
+
+    Returns:
+        str: A short hexadecimal digest.
+    """
+    return hashlib.sha1(json.dumps(configuration, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def episodes_to_convergence(win_status: list[int], window: int, tolerance: float = 0.05) -> int:
+    """
+    Returns the episode from which the windowed win rate stays close to its final value.
+
+    Args:
+        win_status (list[int]): 1 for a won episode, 0 for a lost one.
+        window (int): The number of episodes the win rate is averaged over.
+        tolerance (float): The largest accepted distance from the final win rate.
+
+    Returns:
+        int: The 1-based episode number, or 0 if no episode was played.
+    """
+    if not win_status:
+        return 0
+
+    wins = np.concatenate([[0.0], np.cumsum(win_status)])
+    end = np.arange(1, len(win_status) + 1)
+    start = np.maximum(end - window, 0)
+    rates = (wins[end] - wins[start]) / (end - start)
+
+    outside = np.flatnonzero(np.abs(rates - rates[-1]) > tolerance)
+    return int(outside[-1]) + 2 if outside.size else 1
+
+
+def run_configuration(configuration: dict[str, Value], episodes: int, run_dir: str, seed: Optional[int] = None) -> dict:
+    """
+    Trains from scratch with one configuration and stores the result in the run directory.
+
+    Args:
+        configuration (dict[str, Value]): The configuration values to override.
+        episodes (int): The number of training episodes.
+        run_dir (str): The directory holding the Q-tables, logs and result of the run.
+        seed (Optional[int]): The random seed.
+
+    Returns:
+        dict: The result of the run.
+    """
+    logging.basicConfig(level=logging.WARNING)
+    apply_overrides(configuration)
+
+    from controller.config.config import Config
+    from controller.simulator import Simulator
+
+    Config.q_table_dir = os.path.join(run_dir, "q_tables")
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    simulator = Simulator(num_episodes=episodes,
+                          log_dir=os.path.join(run_dir, "logs"),
+                          plot_dir=os.path.join(run_dir, "plots"))
+
+    start = time.perf_counter()
+    simulator.run()
+    wall_time = time.perf_counter() - start
+
+    metrics = simulator.metrics
+    played = len(metrics['win_status'])
+    result = {
+        "config_id": config_id(configuration),
+        "configuration": configuration,
+        "episodes": played,
+        "win_rate": float(np.mean(metrics['win_status'])) if played else 0.0,
+        "mean_length": float(np.mean(metrics['episode_lengths'])) if played else 0.0,
+        "mean_hero_reward": float(np.mean(metrics['hero_rewards'])) if played else 0.0,
+        "mean_villain_reward": float(np.mean(metrics['villain_rewards'])) if played else 0.0,
+        "convergence_episode": episodes_to_convergence(metrics['win_status'], max(10, played // 10)),
+        "steps_per_sec": float(np.sum(metrics['episode_lengths']) / wall_time) if wall_time > 0 else 0.0,
+        "wall_time": wall_time,
+    }
+
+    # written last and atomically, so an interrupted run is simply run again
+    path = os.path.join(run_dir, RESULT_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return result
+
+
+class Sweep:
+    """
+    Runs training configurations in parallel processes and collects their results.
+
+    Every configuration trains from empty Q-tables in its own run directory, in a fresh process
+    so configuration overrides and Q-table caches never leak between runs. A configuration whose
+    result file exists is not run again, so an interrupted sweep resumes where it stopped.
+    """
+
+    def __init__(self, configurations: list[dict[str, Value]], out_dir: str, episodes: int,
+                 workers: Optional[int] = None, seed: Optional[int] = None) -> None:
+        """
+        Initialise the sweep.
+
+        Args:
+            configurations (list[dict[str, Value]]): The configurations to run.
+            out_dir (str): The directory holding the runs and the summary.
+            episodes (int): The number of training episodes per configuration.
+            workers (Optional[int]): The number of parallel processes, all cores by default.
+            seed (Optional[int]): The random seed of every run.
+        """
+        self.__configurations = {config_id(configuration): configuration for configuration in configurations}
+        self.__out_dir = out_dir
+        self.__episodes = episodes
+        self.__workers = workers or os.cpu_count() or 1
+        self.__seed = seed
+
+    def get_run_dir(self, identifier: str) -> str:
+        """
+        Returns the directory of a configuration's run.
+
+        Args:
+            identifier (str): The configuration id.
+
+        Returns:
+            str: The run directory.
+        """
+        return os.path.join(self.__out_dir, "runs", identifier)
+
+    def pending(self) -> list[str]:
+        """
+        Returns the configurations without a stored result.
+
+        Returns:
+            list[str]: The configuration ids.
+        """
+        return [identifier for identifier in self.__configurations
+                if not os.path.exists(os.path.join(self.get_run_dir(identifier), RESULT_FILE))]
+
+    def results(self) -> list[dict]:
+        """
+        Returns the stored results of the sweep's configurations.
+
+        Returns:
+            list[dict]: The results, in configuration order.
+        """
+        results = []
+        for identifier in self.__configurations:
+            path = os.path.join(self.get_run_dir(identifier), RESULT_FILE)
+            if os.path.exists(path):
+                with open(path) as f:
+                    results.append(json.load(f))
+        return results
+
+    def save(self) -> None:
+        """Store the configurations, so the sweep can be resumed from its directory alone."""
+        os.makedirs(self.__out_dir, exist_ok=True)
+        with open(os.path.join(self.__out_dir, SWEEP_FILE), "w") as f:
+            json.dump({"episodes": self.__episodes, "seed": self.__seed,
+                       "configurations": list(self.__configurations.values())}, f, indent=2)
+
+    @classmethod
+    def load(cls, out_dir: str, workers: Optional[int] = None) -> Sweep:
+        """
+        Reopens a sweep stored by save().
+
+        Args:
+            out_dir (str): The directory of the sweep.
+            workers (Optional[int]): The number of parallel processes, all cores by default.
+
+        Returns:
+            Sweep: The sweep.
+        """
+        with open(os.path.join(out_dir, SWEEP_FILE)) as f:
+            stored = json.load(f)
+        return cls(stored["configurations"], out_dir, stored["episodes"], workers, stored["seed"])
+
+    def run(self) -> list[dict]:
+        """
+        Runs every pending configuration and writes the summary after each one.
+
+        Returns:
+            list[dict]: The results of all configurations.
+        """
+        self.save()
+        pending = self.pending()
+        done = len(self.__configurations) - len(pending)
+        if done:
+            logger.info("Resuming sweep: %d of %d configurations already done", done, len(self.__configurations))
+
+        # a fresh interpreter per configuration, see apply_overrides
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.__workers, mp_context=context, max_tasks_per_child=1) as executor:
+            futures = {executor.submit(run_configuration, self.__configurations[identifier], self.__episodes,
+                                       self.get_run_dir(identifier), self.__seed): identifier
+                       for identifier in pending}
+            try:
+                for future in as_completed(futures):
+                    done += 1
+                    identifier = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception:
+                        logger.exception("Configuration %s failed", identifier)
+                        continue
+
+                    logger.info("[%d/%d] %s: win rate %.2f%%, %.0f steps/s", done, len(self.__configurations),
+                                identifier, 100 * result["win_rate"], result["steps_per_sec"])
+                    self.write_summary()
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        self.write_summary()
+        return self.results()
+
+    def write_summary(self) -> None:
+        """Write the results as one row per configuration to summary.csv and as columns to summary.npz."""
+        results = self.results()
+        keys = sorted({key for configuration in self.__configurations.values() for key in configuration})
+
+        columns = {"config_id": [result["config_id"] for result in results]}
+        for key in keys:
+            columns[key] = [result["configuration"].get(key, np.nan) for result in results]
+        for column in SUMMARY_COLUMNS:
+            columns[column] = [result[column] for result in results]
+
+        with open(os.path.join(self.__out_dir, "summary.csv"), "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(zip(*columns.values()))
+
+        np.savez(os.path.join(self.__out_dir, "summary.npz"),
+                 **{name: np.asarray(values) for name, values in columns.items()})
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Runs a hyperparameter sweep from the command line.
+
+    Args:
+        argv (Optional[list[str]]): The arguments, sys.argv by default.
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Sweep learning and configuration parameters.",
+        epilog="example: python -m controller.sweep --out sweeps/lr -p LearningConfig.alpha=0.05,0.1,0.2 -p LearningConfig.epsilon=0.1,0.2")
+    parser.add_argument("--out", required=True, help="directory of the sweep; rerun with only --out to resume it")
+    parser.add_argument("-p", "--param", action="append", default=[], metavar="Class.attr=VALUES",
+                        help="comma separated values, or low:high for random search; repeat for several parameters")
+    parser.add_argument("--random", type=int, default=0, metavar="N", help="draw N random configurations instead of the full grid")
+    parser.add_argument("-n", "--episodes", type=int, default=100, help="training episodes per configuration (default: %(default)s)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="parallel processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed of the search and of every run")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format="%(levelname)s %(name)s: %(message)s")
+
+    if not args.param:
+        if not os.path.exists(os.path.join(args.out, SWEEP_FILE)):
+            parser.error("--param is required to start a new sweep")
+        sweep = Sweep.load(args.out, args.workers)
+    else:
+        try:
+            parameters = dict(parse_parameter(spec) for spec in args.param)
+            for key in parameters:
+                resolve_parameter(key)
+        except ValueError as error:
+            parser.error(str(error))
+
+        if args.random:
+            configurations = random_configurations(parameters, args.random, args.seed)
+        elif any(isinstance(values, tuple) for values in parameters.values()):
+            parser.error("ranges can only be used with --random")
+        else:
+            configurations = grid_configurations(parameters)
+        sweep = Sweep(configurations, args.out, args.episodes, args.workers, args.seed)
+
+    try:
+        sweep.run()
+    except KeyboardInterrupt:
+        logger.warning("Sweep interrupted, rerun with --out %s to resume", args.out)
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
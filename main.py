@@ -1,9 +1,7 @@
-from controller.simulator import Simulator
+import sys
 
-# Run simulation with metrics tracking
-simulator = Simulator(
-    num_episodes=100,      # Run 100 episodes
-    log_dir="simulation_logs",  # Directory for log files
-    plot_dir="simulation_plots" # Directory for plot images
-)
-simulator.run()
\ No newline at end of file
+from controller.cli import main
+
+# Run a training session, see `python main.py --help` for the options
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING
 
+from controller.config.config import Config
 
 if TYPE_CHECKING:
     from model.environment import Environment
@@ -23,6 +24,8 @@ class Action(ABC):
         """
         self._location = location
         self._agent = agent
+        self._origin = agent.get_location()
+        self._key = None
 
 
     def __str__(self):
@@ -36,6 +39,42 @@ class Action(ABC):
         """
         return self._location
 
+    def get_agent(self) -> Agent:
+        """
+        Returns the agent performing the action.
+
+        :return: The agent of the action.
+        """
+        return self._agent
+
+    def key(self) -> tuple:
+        """
+        Returns a hashable identity of the action relative to the agent, used to index Q-tables.
+
+        The key holds the action name and the wrapped offset from the agent's location at the
+        time the action was created to the location of the action.
+
+        :return: The tuple (name, dx, dy).
+        """
+        if self._key is None:
+            dx = dy = 0
+            if self._origin is not None and self._location is not None:
+                n = Config.world_size
+                dx = (self._location.get_x() - self._origin.get_x()) % n
+                dy = (self._location.get_y() - self._origin.get_y()) % n
+                dx = dx - n if dx > n // 2 else dx
+                dy = dy - n if dy > n // 2 else dy
+            self._key = (self._key_name(), dx, dy)
+        return self._key
+
+    def _key_name(self) -> str:
+        """
+        Returns the name used in the key of the action.
+
+        :return: The name of the action class.
+        """
+        return self.__class__.__name__
+
     @abstractmethod
     def execute(self, environment: Environment) -> int:
         """
@@ -23,42 +23,37 @@ class Attack(Action):
         super().__init__(attack_location, agent)
 
 
+    def is_ranged(self) -> bool:
+        """
+        Returns whether the attack targets a cell beyond the attacker's neighbourhood.
+
+        :return: True if the target is more than one cell away.
+        """
+        import math
+
+        return math.ceil(self._location.dist(self._agent.get_location())) > 1
+
     def execute(self, environment: Environment) -> None:
         """
         Execute the attack action in the given environment at the specified location.
 
+        Earth resolves attacks in batches; this applies a single attack on its own.
+
         :param environment: The environment in which the action is executed.
         :param agent: The agent performing the attack.
         """
-        import math
-
         target_agent = environment.get_agent(self._location)
-        reward = 0
 
         is_target_villain = 0 if target_agent is None else 1 if target_agent.get_agent_role() is AgentRole.VILLAIN else -1
 
-        attack_rate = self._agent.attack_rate
-
-        if hasattr(self._agent, "close_attack_rate") and self._agent.close_attack_rate is not None:
-            attack_rate = self._agent.close_attack_rate
-        
-        if hasattr(self._agent, "ranged_attack_effect") and self._agent.ranged_attack_effect is not None:
-            distance = math.ceil(self._location.dist(self._agent.get_location()))
-            if(distance > 1):
-                attack_rate -= self._agent.ranged_attack_effect * distance
-                self._agent.reduce_health(self._agent.ranged_attack_health_reduce)
-                reward = 3 * is_target_villain
-
-        if hasattr(self._agent, "attack_health_reduce") and self._agent.attack_health_reduce is not None:
-            self._agent.reduce_health(self._agent.attack_health_reduce)
-            reward = 3 * is_target_villain
-
+        self_cost = self._agent.attack_health_reduce or 0.0
+        if self._agent.ranged_attack_effect is not None and self.is_ranged():
+            self_cost += self._agent.ranged_attack_health_reduce
+        if self_cost:
+            self._agent.reduce_health(self_cost)
 
         if target_agent is not None:
             damage_rate = target_agent.damage_rate if target_agent.damage_rate is not None else 1.0
             target_agent.reduce_health(self._agent.attack_rate * damage_rate)
-            reward = 3 * is_target_villain
-
-        return reward
 
-        
+        return 3 * is_target_villain
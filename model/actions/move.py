@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from enum import Enum
 
 from model.agents.agent import Agent
@@ -8,7 +8,7 @@ from model.actions.action import Action
 
 from controller.config.config import Config
 
-from model.location import Location
+from model.location import Location, NEIGHBOUR_DELTAS
 
 if TYPE_CHECKING:
     from model.environment import Environment
@@ -20,13 +20,39 @@ class Move(Action):
     Represents a move action in the environment.
     """
 
-    def __init__(self, location: Location, agent: Agent, move_franklin: bool = False) -> None:
+    def __init__(self, location: Location, agent: Agent, move_franklin: bool = False, franklin: Optional[Agent] = None) -> None:
         """
         Initialise the Move object with the specified move type.
 
+        :param location: The location the agent moves to.
+        :param agent: The agent performing the move.
+        :param move_franklin: Whether Franklin is escorted along by the same step.
+        :param franklin: The escorted Franklin, so execution does not have to look for him.
         """
         super().__init__(location, agent)
         self.__move_franklin = move_franklin
+        self.__franklin = franklin if move_franklin else None
+
+    @staticmethod
+    def escort_moves(agent: Agent, franklin: Agent, environment: Environment) -> list[Move]:
+        """
+        Returns the moves taking Franklin along by the same step as the agent.
+
+        A step is offered when both the cell the agent moves to and the cell Franklin moves
+        to are free. Neither location is modified while the moves are generated.
+
+        :param agent: The escorting agent.
+        :param franklin: The escorted Franklin.
+        :param environment: The environment in which the moves are made.
+        :return: One escorting move per open neighbour delta.
+        """
+        size = Config.world_size
+        x, y = agent.get_location().get_x(), agent.get_location().get_y()
+        fx, fy = franklin.get_location().get_x(), franklin.get_location().get_y()
+
+        return [Move(Location((x + dx) % size, (y + dy) % size), agent, move_franklin=True, franklin=franklin)
+                for dx, dy in NEIGHBOUR_DELTAS
+                if environment.is_free_cell(x + dx, y + dy) and environment.is_free_cell(fx + dx, fy + dy)]
 
     def get_location(self) -> Location:
         """
@@ -58,27 +84,39 @@ class Move(Action):
         """
         return hash((self._location.get_x(), self._location.get_y()))
 
+    def _key_name(self) -> str:
+        """
+        Returns the name used in the key of the move, telling escorting moves apart.
+
+        Returns:
+            str: EscortMove if Franklin moves along, Move otherwise.
+        """
+        return "EscortMove" if self.__move_franklin else "Move"
+
     def execute(self, environment: Environment) -> None:
         """
         Execute the move action in the given environment at the specified location.
 
+        Franklin moves along by the same step when the move escorts him, unless another agent
+        took his target cell earlier in the step.
+
         :param environment: The environment in which the action is executed.
-        :param agent: The agent performing the move.
         """
-
-        if  self.__move_franklin:
-            franklin_agent  = [agent for row in environment.get_grid() for agent in row if agent is not None and agent.__class__.__name__ == "Franklin"][0]
+        franklin = self.__franklin
 
         environment.set_agent(None, self._agent.get_location())
-        if self.__move_franklin: environment.set_agent(None, franklin_agent.get_location())
-
-        move_dir = (( Config.world_size + self._location.get_x() - self._agent.get_location().get_x()) % Config.world_size, (Config.world_size + self._location.get_y() - self._agent.get_location().get_y()) % Config.world_size)
-        if self.__move_franklin: franklin_loc = Location(franklin_agent.get_location().get_x() + move_dir[0], franklin_agent.get_location().get_y() + move_dir[1])
-
         environment.set_agent(self._agent, self._location)
-        if self.__move_franklin: environment.set_agent(franklin_agent, franklin_loc)
-
         self._agent.set_location(self._location)
-        if self.__move_franklin: franklin_agent.set_location(franklin_loc)
+
+        if franklin is not None:
+            _, dx, dy = self.key()
+            size = Config.world_size
+            old = franklin.get_location()
+            new = Location((old.get_x() + dx) % size, (old.get_y() + dy) % size)
+
+            if environment.is_free_cell(new.get_x(), new.get_y()):
+                environment.set_agent(None, old)
+                environment.set_agent(franklin, new)
+                franklin.set_location(new)
 
         return 0
@@ -4,6 +4,8 @@ from typing import Optional, TYPE_CHECKING
 
 from model.actions.action import Action
 
+from controller.config.silver_surfer_config import SilverSurferConfig as CONFIG
+
 if TYPE_CHECKING:
     from model.environment import Environment
     from model.location import Location
@@ -25,13 +27,13 @@ class Retreat(Action):
     def execute(self, environment: Environment) -> int:
         """
         Execute the retreat action in the given environment at the specified location.
-        Only for SilverSurfer. This action removes SilverSurfer from the environment for exactly 5 time steps.
+        Only for SilverSurfer. This action removes SilverSurfer from the environment for the configured respawn time.
 
         :param environment: The environment in which the action is executed.
         :param agent: The agent performing the retreation.
         """
         
-        environment.set_ss_flag(False, self._location)  # Set the flag indicating Silver Surfer is not in the environment
+        environment.schedule_respawn(self._agent, CONFIG.ss_respawn_time)
         self._agent.set_location(None)
         environment.set_agent(None,self._location)
 
@@ -1,18 +1,27 @@
 from __future__ import annotations
 
 import os
-import pickle
+import weakref
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Mapping, Optional
 from enum import Enum  
-from collections import defaultdict
+
+from model.agents.agent_table import AgentTable
+from model.agents.linear_q import LinearQ, feature_count, state_features
+from controller.config.config import Config
+from controller.config.learning_config import LearningConfig
+from model.agents.prioritised_sweeping import PrioritisedSweeping
+from model.agents.q_table import QTable
+from model.agents.q_table_storage import get_storage
+from model.agents.replay_buffer import ReplayBuffer
 
 if TYPE_CHECKING:
     from model.environment import Environment
     from model.location import Location
     from types import List
     from model.actions.action import Action
+    from controller.checkpoint_writer import CheckpointWriter
 
 
 
@@ -24,53 +33,332 @@ class AgentRole(Enum):
     HEADQUARTERS = 4
 
 class Agent(ABC):
-    """Represents an agent with a location."""
+    """
+    Represents an agent with a location.
+
+    Agents are thin views over a row of an AgentTable: health, position, role and class id
+    live in the table columns, and the parameters a class declares in `parameters` are stored
+    once per class. The Q-table, the replay buffer and the planning model are shared by all
+    agents of the same class, or by all heroes when LearningConfig.share_hero_q is set.
+    """
+
+    __slots__ = ("_table", "_row", "_class_id", "_location", "_role", "alpha", "gamma", "epsilon", "__weakref__")
+
+    # per-class parameters, see agent_table.PARAMETERS
+    parameters: dict[str, Optional[float]] = {}
+
+    # passive entities never pick actions, learn or persist a Q-table
+    passive = False
+
+    # number of steps between two decisions of the agent
+    decision_interval = 1
+
+    # whether the class learns a linear Q-function when LearningConfig.value_function is "linear"
+    linear_q = False
+
+    # whether the class learns the hero value function when LearningConfig.share_hero_q is set
+    shares_hero_q = False
+
+    # role whose nearest agent is part of the state encoded by the environment, see Earth.get_states
+    state_target_role: Optional[AgentRole] = None
+
+    __q_tables: dict[str, QTable] = {}
+    __replay_buffers: dict[str, ReplayBuffer] = {}
+    __planners: dict[str, PrioritisedSweeping] = {}
+    __linear_qs: dict[str, LinearQ] = {}
 
-    def __init__(self, location: Location, role: AgentRole, health: Optional[float] = None) -> None:
+    def __init__(self, location: Location, role: AgentRole, health: Optional[float] = None, table: Optional[AgentTable] = None) -> None:
         """
         Initialise the Agent object with the given location.
 
         Parameters:
             location (Location): The location of the agent.
+            role (AgentRole): The role of the agent.
+            health (Optional[float]): The initial health, full health by default.
+            table (Optional[AgentTable]): The table holding the agent's state, the shared table by default.
         """
-        self._location = location
+        self._table = table if table is not None else AgentTable.shared()
+        self._class_id = self._table.class_id_of(self.__class__)
+        self._row = self._table.allocate(self._class_id, role, health if health is not None else 1.0)
+        weakref.finalize(self, self._table.release, self._row)
+
         self._role = role
-        self._health = health if health is not None else 1.0
-        self.q_table = defaultdict(float)
-        self.alpha = self.alpha = 0.1   # learning rate
-        self.gamma = 0.9   # discount
-        self.epsilon = 0.2 # exploration
+        self.set_location(location)
+        self.alpha = LearningConfig.alpha     # learning rate
+        self.gamma = LearningConfig.gamma     # discount
+        self.epsilon = LearningConfig.epsilon # exploration
+
+    @property
+    def _health(self) -> float:
+        return float(self._table.health[self._row])
+
+    @_health.setter
+    def _health(self, health: float) -> None:
+        self._table.health[self._row] = health
+        self._table.health_changed((self._row,))
+
+    @classmethod
+    def table_name(cls) -> str:
+        """
+        Get the name of the value function the class learns, shared by the heroes when
+        LearningConfig.share_hero_q is set.
 
-        self.filepath = f"./model/agents/q_tables/{self.__class__.__name__}.pkl"
+        Returns:
+            str: The name, also the base name of the saved files.
+        """
+        return "Hero" if cls.shares_hero_q and LearningConfig.share_hero_q else cls.__name__
+
+    @property
+    def weights_path(self) -> str:
+        return os.path.join(Config.q_table_dir, f"{self.table_name()}.npy")
+
+    @property
+    def uses_linear_q(self) -> bool:
+        """Whether the agent learns a linear Q-function instead of a Q-table."""
+        return self.linear_q and LearningConfig.value_function == "linear"
+
+    @property
+    def linear_q_function(self) -> LinearQ:
+        """The linear Q-function of the agent's class, loaded from disk on first use."""
+        name = self.table_name()
+        if name not in Agent.__linear_qs:
+            q = LinearQ.load(self.weights_path, feature_count(), LearningConfig.linear_batch_size)
+            Agent.__linear_qs[name] = q if q is not None else LinearQ(feature_count(), LearningConfig.linear_batch_size)
+        return Agent.__linear_qs[name]
+
+    @property
+    def q_table(self) -> QTable:
+        """The Q-table of the agent's class, loaded from the Q-table storage on first use."""
+        name = self.table_name()
+        if name not in Agent.__q_tables:
+            Agent.__q_tables[name] = QTable()
+            if get_storage().exists(name):
+                self.load_q()
+        return Agent.__q_tables[name]
+
+    @q_table.setter
+    def q_table(self, q_table: Mapping[tuple, float]) -> None:
+        name = self.table_name()
+        Agent.__q_tables[name] = q_table if isinstance(q_table, QTable) else QTable(q_table)
+        # the buffered transitions and the model refer to ids of the replaced table
+        Agent.__replay_buffers.pop(name, None)
+        Agent.__planners.pop(name, None)
+
+    @property
+    def replay_buffer(self) -> Optional[ReplayBuffer]:
+        """The replay buffer of the agent's class, None if replay is disabled."""
+        if LearningConfig.replay_capacity <= 0:
+            return None
+        name = self.table_name()
+        if name not in Agent.__replay_buffers:
+            Agent.__replay_buffers[name] = ReplayBuffer(LearningConfig.replay_capacity)
+        return Agent.__replay_buffers[name]
+
+    @property
+    def planner(self) -> Optional[PrioritisedSweeping]:
+        """The planning model of the agent's class, None if planning is disabled."""
+        if LearningConfig.planning_updates <= 0:
+            return None
+        name = self.table_name()
+        if name not in Agent.__planners:
+            Agent.__planners[name] = PrioritisedSweeping(self.q_table, LearningConfig.planning_threshold)
+        return Agent.__planners[name]
 
-        if os.path.exists(self.filepath):
-            self.load_q()
+    def get_row(self) -> int:
+        """
+        Get the row of the agent in its table.
 
+        Returns:
+            int: The row index.
+        """
+        return self._row
+
+    def get_table(self) -> AgentTable:
+        """
+        Get the table holding the agent's state.
+
+        Returns:
+            AgentTable: The agent table.
+        """
+        return self._table
+
+    def __param(self, name: str) -> Optional[float]:
+        return self._table.class_param(self._class_id, name)
+
+    attack_rate = property(lambda self: self.__param("attack_rate"))
+    damage_rate = property(lambda self: self.__param("damage_rate"))
+    repair_rate = property(lambda self: self.__param("repair_rate"))
+    close_attack_rate = property(lambda self: self.__param("close_attack_rate"))
+    ranged_attack_effect = property(lambda self: self.__param("ranged_attack_effect"))
+    ranged_attack_health_reduce = property(lambda self: self.__param("ranged_attack_health_reduce"))
+    attack_health_reduce = property(lambda self: self.__param("attack_health_reduce"))
+
+    @property
+    def scan_range(self) -> Optional[int]:
+        value = self.__param("scan_range")
+        return int(value) if value is not None else None
+
+    @property
+    def move_range(self) -> Optional[int]:
+        value = self.__param("move_range")
+        return int(value) if value is not None else None
+
+    @property
+    def barrier_range(self) -> Optional[int]:
+        value = self.__param("barrier_range")
+        return int(value) if value is not None else None
 
-    
-    @abstractmethod
     def get_state(self, environment: Environment) -> tuple:
-        pass
+        """
+        Get the discrete state of the agent, encoded by the environment from the class's state_target_role.
+        Classes without a target role describe their state themselves.
+
+        Returns:
+            tuple: The state.
+        """
+        return environment.get_states([self])[0]
+
+    def observation(self, environment: Environment):
+        """
+        Returns what the agent learns from: its feature vector when it uses a linear Q-function,
+        its discrete state otherwise.
+        """
+        if self.uses_linear_q:
+            return state_features(self._table, self._row)
+        return self.get_state(environment)
     
 
-    def update_q(self, old_state, action, reward, new_state, env):
-        if self.actions(env) is None:
-            return
+    def update_q(self, old_state, action, reward, new_state, env, done: bool = False) -> float:
+        """
+        Applies one Q-learning update, and records the transition for replay and planning.
+
+        Every LearningConfig.replay_interval transitions of the class, a batch of
+        replay_ratio * replay_interval stored transitions is replayed in one vectorised update.
+
+        A Q-table shared by several classes records which actions each class can take, so
+        replayed and planned updates bootstrap only from the acting class's actions.
+
+        A decision lasts decision_interval steps, so the reward is the discounted sum of the
+        rewards of those steps and the next state's value is discounted by gamma to that power.
+
+        :param done: Whether the transition ended the episode, in which case nothing is bootstrapped.
+        :return: The absolute change of the updated Q-value.
+        """
+        next_actions = self.actions(env)
+        if action is None or next_actions is None:
+            return 0.0
+
+        gamma = self.gamma ** max(1, self.decision_interval)
+        if self.uses_linear_q:
+            q = self.linear_q_function
+            return q.add(old_state, action.key(), reward, new_state, [a.key() for a in next_actions], done,
+                         self.alpha, gamma)
         
-        best_next = max([self.q_table[(new_state, a)] for a in self.actions(env)], default=0)
-        self.q_table[(old_state, action)] += self.alpha * (
-            reward + self.gamma * best_next - self.q_table[(old_state, action)]
+        q_table = self.q_table
+        sid, aid = q_table.state_id(old_state), q_table.action_id(action.key())
+        best_next = 0 if done else max([q_table[(new_state, a.key())] for a in next_actions], default=0)
+        delta = self.alpha * (
+            reward + gamma * best_next - q_table.get_value(sid, aid)
         )
+        q_table.add_value(sid, aid, delta)
+        q_table.visit(sid, aid)
+
+        buffer = self.replay_buffer
+        planner = self.planner
+        if buffer is None and planner is None:
+            return abs(delta)
+
+        next_sid = q_table.state_id(new_state)
+
+        shared = self.table_name() != self.__class__.__name__
+        head = None
+        if shared:
+            head = q_table.head_id(self.__class__.__name__)
+            q_table.allow(head, aid)
+            for a in next_actions:
+                q_table.allow(head, q_table.action_id(a.key()))
+
+        if planner is not None:
+            planner.observe(sid, aid, reward, next_sid, done, gamma, head)
+        if buffer is not None:
+            buffer.add(sid, aid, reward, next_sid, done, head or 0)
+            batch_size = int(LearningConfig.replay_ratio * LearningConfig.replay_interval)
+            if batch_size > 0 and buffer.get_added() % LearningConfig.replay_interval == 0:
+                states, actions, rewards, next_states, dones, heads = buffer.sample(batch_size)
+                q_table.batch_update(states, actions, rewards, next_states, dones, self.alpha, gamma,
+                                     heads if shared else None)
+
+        return abs(delta)
+
+    def plan(self) -> int:
+        """
+        Spends the per-step planning budget of the agent's class on its learned model.
+
+        :return: The number of planning updates applied.
+        """
+        planner = self.planner
+        if planner is None:
+            return 0
+        return planner.plan(self.alpha, self.gamma ** max(1, self.decision_interval), LearningConfig.planning_updates,
+                            LearningConfig.planning_budget_us)
     
 
+    def compact_q(self) -> int:
+        """
+        Evicts entries of the agent's Q-table beyond LearningConfig.q_table_capacity.
+
+        The replay buffer and the planning model refer to state ids that an eviction renumbers,
+        so they are dropped and start again empty.
+
+        :return: The number of entries evicted.
+        """
+        if self.uses_linear_q or LearningConfig.q_table_capacity <= 0:
+            return 0
+
+        evicted = self.q_table.evict(LearningConfig.q_table_capacity, LearningConfig.eviction_policy,
+                                     LearningConfig.eviction_slack)
+        if evicted:
+            Agent.__replay_buffers.pop(self.table_name(), None)
+            Agent.__planners.pop(self.table_name(), None)
+        return evicted
+
+    def q_table_stats(self) -> Optional[dict]:
+        """
+        Get the size and usage statistics of the agent's Q-table.
+
+        :return: The statistics of QTable.stats(), or None for agents learning a linear Q-function.
+        """
+        if self.uses_linear_q:
+            return None
+        return self.q_table.stats()
+
     def save_q(self) -> None:
-        with open(self.filepath, "wb") as f:
-            pickle.dump(self.q_table, f)
-        
+        if self.uses_linear_q:
+            self.linear_q_function.save(self.weights_path)
+            return
+
+        # only the entries changed since the last checkpoint, so tables shared by processes keep each other's entries
+        get_storage().checkpoint(self.table_name(), self.q_table.take_changes())
+
+    def checkpoint_q(self, writer: CheckpointWriter) -> None:
+        """
+        Hands the entries of the agent's Q-table changed since the last checkpoint to a background writer.
+
+        Linear Q-functions are small and saved directly instead, each file through a temporary file.
+
+        :param writer: The writer of the checkpoints.
+        """
+        if self.uses_linear_q:
+            self.save_q()
+            return
+
+        writer.submit(self.table_name(), self.q_table.take_changes())
     
     def load_q(self) -> None:
-        with open(self.filepath, "rb") as f:
-            self.q_table = pickle.load(f)
+        """Load the Q-table of the agent's class from the Q-table storage chosen in Config.q_table_storage."""
+        self.q_table = get_storage().load(self.table_name())
+        # the loaded entries are stored already, later checkpoints only write what changes
+        self.q_table.take_changes()
 
     def __eq__(self, other: 'Agent') -> bool:
         """
@@ -121,6 +409,10 @@ class Agent(ABC):
             location (Location or None): The new location of the agent.
         """
         self._location = location
+        if location is None:
+            self._table.set_position(self._row, None, None)
+        else:
+            self._table.set_position(self._row, location.get_x(), location.get_y(), location.get_range())
     
     def get_agent_role(self) -> AgentRole:
         """
@@ -147,9 +439,11 @@ class Agent(ABC):
         Parameters:
             attack_power (float): The amount of health to reduce.
         """
-        self._health -= attack_power if self._health > 0 else 0
-        if self._health < 0.0:
-            self._health = 0.0
+        health = self._table.health
+        health[self._row] -= attack_power if health[self._row] > 0 else 0
+        if health[self._row] < 0.0:
+            health[self._row] = 0.0
+        self._table.health_changed((self._row,))
     
     def increase_health(self, repair_power: float) -> None:
         """
@@ -158,15 +452,30 @@ class Agent(ABC):
         Parameters:
             repair_power (float): The amount of health to increase.
         """
-        self._health += repair_power if self._health < 1.0 else 0.0
-        if self._health > 1.0:
-            self._health = 1.0
+        health = self._table.health
+        health[self._row] += repair_power if health[self._row] < 1.0 else 0.0
+        if health[self._row] > 1.0:
+            health[self._row] = 1.0
+        self._table.health_changed((self._row,))
     
-    def pick_action(self, environment: Environment) -> Action:
+    def pick_action(self, environment: Environment, observation=None) -> Action:
         """
         Pick an action for Sue Storm to perform.
+        :param observation: The agent's current observation, computed from the environment if not given.
         :return: The action to be performed.
         """
+        return self.__choose(environment, observation, simulated=False)
+
+    def rollout_action(self, environment: Environment, observation=None) -> Action:
+        """
+        Pick an action as pick_action does, for a step a planner simulates on a snapshot.
+        Q-table entries the agent has never met read as 0.0 without being added to the table.
+        :param observation: The agent's current observation, computed from the environment if not given.
+        :return: The action to be performed.
+        """
+        return self.__choose(environment, observation, simulated=True)
+
+    def __choose(self, environment: Environment, observation, simulated: bool) -> Action:
         import random
 
         available_actions = self.actions(environment)
@@ -174,9 +483,15 @@ class Agent(ABC):
         if available_actions is None:
             return None
 
-        state = self.get_state(environment)
-
         if random.random() < self.epsilon:
             return random.choice(available_actions)
-        else:
-            return max(available_actions, key=lambda a: self.q_table[(state, a)])
+
+        state = observation if observation is not None else self.observation(environment)
+
+        if self.uses_linear_q:
+            values = self.linear_q_function.values(state, [a.key() for a in available_actions])
+            return available_actions[int(values.argmax())]
+
+        q_table = self.q_table
+        value = q_table.peek if simulated else q_table.__getitem__
+        return max(available_actions, key=lambda a: value((state, a.key())))
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import weakref
+
+from typing import Callable, Optional, Sequence, TYPE_CHECKING
+
+import numpy as np
+
+from controller.config.config import Config
+
+if TYPE_CHECKING:
+    from model.agents.agent import AgentRole
+
+
+# per-class parameters an agent class may declare, stored once per class
+PARAMETERS = (
+    "attack_rate",
+    "damage_rate",
+    "repair_rate",
+    "scan_range",
+    "move_range",
+    "barrier_range",
+    "close_attack_rate",
+    "ranged_attack_effect",
+    "ranged_attack_health_reduce",
+    "attack_health_reduce",
+)
+
+PARAMETER_INDEX = {name: index for index, name in enumerate(PARAMETERS)}
+
+
+class AgentTable:
+    """
+    Struct-of-arrays store holding the state of every agent.
+
+    Each agent owns one row of the per-agent columns (position, footprint radius, health,
+    role and class id). Parameters shared by all agents of a class are kept once in a
+    per-class matrix, with NaN standing for a parameter the class does not have. Health
+    updates, role filtering and distance queries over many agents run as column operations.
+
+    Health changed through the agents or apply_health() is reported to the methods registered
+    with watch_health(), such as the state hash of an Earth.
+    """
+
+    __shared: Optional[AgentTable] = None
+
+    def __init__(self, capacity: int = 64) -> None:
+        """
+        Initialise an empty table.
+
+        Args:
+            capacity (int): Number of rows to preallocate, grown on demand.
+        """
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.radius = np.zeros(capacity, dtype=np.int32)
+        self.health = np.zeros(capacity, dtype=np.float64)
+        self.role = np.full(capacity, -1, dtype=np.int8)
+        self.class_id = np.full(capacity, -1, dtype=np.int16)
+        self.placed = np.zeros(capacity, dtype=bool)
+        self.in_use = np.zeros(capacity, dtype=bool)
+
+        self.class_params = np.empty((0, len(PARAMETERS)), dtype=np.float64)
+
+        # per-class attack profiles derived from the parameters at registration
+        self.attack_power = np.empty(0, dtype=np.float64)
+        self.attack_cost = np.empty(0, dtype=np.float64)
+        self.ranged_cost = np.empty(0, dtype=np.float64)
+        self.damage_taken = np.empty(0, dtype=np.float64)
+
+        self.__class_ids: dict[type, int] = {}
+        self.__free_rows = list(range(capacity - 1, -1, -1))
+        self.__health_watchers: list[weakref.WeakMethod] = []
+
+    @classmethod
+    def shared(cls) -> AgentTable:
+        """
+        Returns the process-wide table used by agents created without an explicit table.
+
+        Returns:
+            AgentTable: The shared table.
+        """
+        if cls.__shared is None:
+            cls.__shared = AgentTable()
+        return cls.__shared
+
+    def __len__(self) -> int:
+        """Return the number of rows in use."""
+        return int(self.in_use.sum())
+
+    def class_id_of(self, agent_class: type) -> int:
+        """
+        Returns the id of an agent class, registering its parameters on first use.
+
+        Args:
+            agent_class (type): The agent class, declaring its parameters in `parameters`.
+
+        Returns:
+            int: The class id.
+        """
+        class_id = self.__class_ids.get(agent_class)
+        if class_id is not None:
+            return class_id
+
+        row = np.full((1, len(PARAMETERS)), np.nan)
+        for name, value in getattr(agent_class, "parameters", {}).items():
+            if value is not None:
+                row[0, PARAMETER_INDEX[name]] = value
+
+        class_id = len(self.__class_ids)
+        self.class_params = np.vstack([self.class_params, row])
+        self.__class_ids[agent_class] = class_id
+        self.__add_attack_profile(row[0])
+        return class_id
+
+    def class_param(self, class_id: int, name: str) -> Optional[float]:
+        """
+        Returns a parameter of a class.
+
+        Args:
+            class_id (int): The class id.
+            name (str): The parameter name, one of PARAMETERS.
+
+        Returns:
+            Optional[float]: The value, or None if the class does not declare it.
+        """
+        value = self.class_params[class_id, PARAMETER_INDEX[name]]
+        return None if np.isnan(value) else float(value)
+
+    def allocate(self, class_id: int, role: AgentRole, health: float) -> int:
+        """
+        Reserves a row for a new agent.
+
+        Args:
+            class_id (int): The class id of the agent.
+            role (AgentRole): The role of the agent.
+            health (float): The initial health.
+
+        Returns:
+            int: The row index.
+        """
+        if not self.__free_rows:
+            self.__grow()
+
+        row = self.__free_rows.pop()
+        self.in_use[row] = True
+        self.class_id[row] = class_id
+        self.role[row] = role.value
+        self.health[row] = health
+        self.placed[row] = False
+        return row
+
+    def release(self, row: int) -> None:
+        """
+        Returns the row of a discarded agent to the free list.
+
+        Args:
+            row (int): The row index.
+        """
+        self.in_use[row] = False
+        self.placed[row] = False
+        self.class_id[row] = -1
+        self.role[row] = -1
+        self.__free_rows.append(row)
+
+    def set_position(self, row: int, x: Optional[int], y: Optional[int], radius: int = 0) -> None:
+        """
+        Stores the position of an agent, or marks it as off the grid when x is None.
+
+        Args:
+            row (int): The row index.
+            x (Optional[int]): The x-coordinate.
+            y (Optional[int]): The y-coordinate.
+            radius (int): The footprint radius.
+        """
+        if x is None:
+            self.placed[row] = False
+            return
+
+        self.x[row] = x % Config.world_size
+        self.y[row] = y % Config.world_size
+        self.radius[row] = radius
+        self.placed[row] = True
+
+    def rows(self, role: Optional[AgentRole] = None, class_id: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the rows of agents on the grid, optionally filtered by role or class.
+
+        Args:
+            role (Optional[AgentRole]): Keep only agents with this role.
+            class_id (Optional[int]): Keep only agents of this class.
+
+        Returns:
+            np.ndarray: The matching row indices.
+        """
+        mask = self.in_use & self.placed
+        if role is not None:
+            mask &= self.role == role.value
+        if class_id is not None:
+            mask &= self.class_id == class_id
+        return np.flatnonzero(mask)
+
+    def param_column(self, name: str, rows: Sequence[int]) -> np.ndarray:
+        """
+        Returns a class parameter for each of the given agents.
+
+        Args:
+            name (str): The parameter name, one of PARAMETERS.
+            rows (Sequence[int]): The row indices.
+
+        Returns:
+            np.ndarray: The values, NaN where the class does not declare the parameter.
+        """
+        return self.class_params[self.class_id[rows], PARAMETER_INDEX[name]]
+
+    def apply_health(self, rows: Sequence[int], deltas: Sequence[float]) -> None:
+        """
+        Adds health changes to agents and clips the result to [0, 1].
+
+        Repeated rows accumulate before clipping, which gives the same result as clipping after
+        every change as long as a row only gains or only loses health. Rows that do both are
+        changed one by one in the given order, each change clipped, as separate actions would.
+
+        Args:
+            rows (Sequence[int]): The row indices.
+            deltas (Sequence[float]): The health change for each row, in the order the changes happen.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        deltas = np.asarray(deltas, dtype=float)
+        sequential = np.isin(rows, np.intersect1d(rows[deltas > 0], rows[deltas < 0]))
+
+        batched = rows[~sequential]
+        np.add.at(self.health, batched, deltas[~sequential])
+        self.health[batched] = np.clip(self.health[batched], 0.0, 1.0)
+        for row, delta in zip(rows[sequential], deltas[sequential]):
+            self.health[row] = min(1.0, max(0.0, self.health[row] + delta))
+        self.health_changed(rows)
+
+    def watch_health(self, method: Callable[[AgentTable, Sequence[int]], None]) -> None:
+        """
+        Registers a method called with the table and the rows whose health changed. The method
+        is held weakly, so watching does not keep its object alive.
+
+        Args:
+            method (Callable): A bound method taking the table and the rows.
+        """
+        self.__health_watchers.append(weakref.WeakMethod(method))
+
+    def health_changed(self, rows: Sequence[int]) -> None:
+        """
+        Reports a health change to the watchers.
+
+        Args:
+            rows (Sequence[int]): The rows whose health changed.
+        """
+        for watcher in tuple(self.__health_watchers):
+            method = watcher()
+            if method is None:
+                self.__health_watchers.remove(watcher)
+            else:
+                method(self, rows)
+
+    def distances(self, x: int, y: int, rows: Sequence[int]) -> np.ndarray:
+        """
+        Returns the toroidal Chebyshev distance from a cell to each of the given agents.
+
+        Args:
+            x (int): The x-coordinate of the cell.
+            y (int): The y-coordinate of the cell.
+            rows (Sequence[int]): The row indices.
+
+        Returns:
+            np.ndarray: The distances.
+        """
+        n = Config.world_size
+        dx = np.abs(self.x[rows] - x) % n
+        dy = np.abs(self.y[rows] - y) % n
+        return np.maximum(np.minimum(dx, n - dx), np.minimum(dy, n - dy))
+
+    def pairwise_distances(self, rows_a: Sequence[int], rows_b: Sequence[int]) -> np.ndarray:
+        """
+        Returns the toroidal Chebyshev distance between every pair of agents from two sets.
+
+        Args:
+            rows_a (Sequence[int]): Row indices of the first set.
+            rows_b (Sequence[int]): Row indices of the second set.
+
+        Returns:
+            np.ndarray: A (len(rows_a), len(rows_b)) distance matrix.
+        """
+        n = Config.world_size
+        dx = np.abs(self.x[rows_a][:, None] - self.x[rows_b][None, :]) % n
+        dy = np.abs(self.y[rows_a][:, None] - self.y[rows_b][None, :]) % n
+        return np.maximum(np.minimum(dx, n - dx), np.minimum(dy, n - dy))
+
+    def __add_attack_profile(self, params: np.ndarray) -> None:
+        """
+        Derives the attack profile of a new class: the damage it deals, the health it spends on
+        every attack and on ranged attacks, and the share of incoming damage it takes.
+        """
+        def value(name: str, default: float) -> float:
+            value = params[PARAMETER_INDEX[name]]
+            return default if np.isnan(value) else float(value)
+
+        ranged = not np.isnan(params[PARAMETER_INDEX["ranged_attack_effect"]])
+
+        self.attack_power = np.append(self.attack_power, value("attack_rate", 0.0))
+        self.attack_cost = np.append(self.attack_cost, value("attack_health_reduce", 0.0))
+        self.ranged_cost = np.append(self.ranged_cost, value("ranged_attack_health_reduce", 0.0) if ranged else 0.0)
+        self.damage_taken = np.append(self.damage_taken, value("damage_rate", 1.0))
+
+    def __grow(self) -> None:
+        """Doubles the capacity of every per-agent column."""
+        old = len(self.in_use)
+        new = max(1, old * 2)
+
+        for name, fill in (("x", 0), ("y", 0), ("radius", 0), ("health", 0.0), ("role", -1),
+                           ("class_id", -1), ("placed", False), ("in_use", False)):
+            column = getattr(self, name)
+            grown = np.full(new, fill, dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+
+        self.__free_rows.extend(range(new - 1, old - 1, -1))
@@ -11,10 +11,16 @@ if TYPE_CHECKING:
 
 
 class Bridge(Agent):
+    __slots__ = ()
+
+    passive = True
+
+    parameters = {
+        "damage_rate": CONFIG.damage_rate,
+    }
+
     def __init__(self, location: Location, health: float) -> None:
         super().__init__(location, role = AgentRole.BRIDGE, health = health)
-
-        self.damage_rate = CONFIG.damage_rate
     
     def get_state(self, environment):
         return (self._location.get_x(), self._location.get_y())
@@ -11,10 +11,16 @@ if TYPE_CHECKING:
 
 
 class Franklin(Agent):
+    __slots__ = ()
+
+    passive = True
+
+    parameters = {
+        "damage_rate": CONFIG.damage_rate,
+    }
+
     def __init__(self, location: Location) -> None:
         super().__init__(location, role = AgentRole.FRANKLIN)
-
-        self.damage_rate = CONFIG.damage_rate
     
     def get_state(self, environment):
         return None
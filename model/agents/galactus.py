@@ -8,6 +8,7 @@ from controller.config.galactus_config import GalactusConfig as CONFIG
 from controller.config.config import Config as WorldConfig
 
 from model.actions.move import Move
+from model.agents.mcts import MonteCarloTreeSearch
 from model.location import Location
 
 if TYPE_CHECKING:
@@ -17,13 +18,40 @@ if TYPE_CHECKING:
 
 
 class Galactus(Agent):
+    __slots__ = ("__search",)
+
+    parameters = {
+        "attack_rate": CONFIG.gal_attack_rate,
+        "damage_rate": CONFIG.gal_damage_rate,
+    }
+
+    decision_interval = CONFIG.decision_interval
+
     def __init__(self, location: Location) -> None:
         super().__init__(location, role = AgentRole.VILLAIN)
-        self.attack_rate = CONFIG.gal_attack_rate
-        self.damage_rate = CONFIG.gal_damage_rate
+        # tree search planning the moves when GalactusConfig.mcts_budget_ms is set, kept between steps
+        self.__search: Optional[MonteCarloTreeSearch] = None
 
     def get_state(self, environment: Environment) -> tuple:
         return None
+
+    def pick_action(self, environment: Environment, observation=None) -> Action:
+        """
+        Pick the move of Galactus, planned by Monte Carlo tree search within GalactusConfig.mcts_budget_ms
+        milliseconds when set, the step along the flow field otherwise or when the search ran out of time.
+        :param observation: The agent's current observation, computed from the environment if not given.
+        :return: The action to be performed.
+        """
+        from model.earth import Earth
+
+        if CONFIG.mcts_budget_ms > 0 and isinstance(environment, Earth):
+            if self.__search is None:
+                self.__search = MonteCarloTreeSearch(CONFIG.mcts_budget_ms, CONFIG.mcts_depth,
+                                                     CONFIG.mcts_exploration, CONFIG.mcts_gamma)
+            action = self.__search.search(self, environment)
+            if action is not None:
+                return action
+        return super().pick_action(environment, observation)
     
     def __next_location(self, bridges, franklin):
         """
@@ -90,12 +118,25 @@ class Galactus(Agent):
     def actions(self, environment: Environment) -> list[Optional[Action]]:
         import random
 
-        bridges = [agent.get_location() for row in environment.get_grid() for agent in row if agent is not None and agent.get_agent_role() == AgentRole.BRIDGE] 
-        franklin = [agent.get_location() for row in environment.get_grid() for agent in row if agent is not None and agent.get_agent_role() == AgentRole.FRANKLIN]
-        if len(franklin) == 0:
-            move_loc = random.choice(environment.get_adjacent_locations(self._location))
+        # the largest cluster of bridges is all of them, so the cluster rule of __next_location heads
+        # for the nearest bridge unless Franklin is strictly closer; the flow fields only find the path
+        navigation = environment.get_navigation()
+        radius = self._location.get_range()
+        bridge_distance = navigation.distance(self._location, (AgentRole.BRIDGE,), radius)
+        franklin_distance = navigation.distance(self._location, (AgentRole.FRANKLIN,), radius)
+        if franklin_distance >= 0 and (bridge_distance < 0 or franklin_distance < bridge_distance):
+            target = AgentRole.FRANKLIN
         else:
-            move_loc = self.__next_location(bridges, franklin[0])
+            target = AgentRole.BRIDGE
+        move_loc = navigation.next_step(self._location, (target,), radius)
+
+        if move_loc is None:
+            bridges = [agent.get_location() for row in environment.get_grid() for agent in row if agent is not None and agent.get_agent_role() == AgentRole.BRIDGE] 
+            franklin = [agent.get_location() for row in environment.get_grid() for agent in row if agent is not None and agent.get_agent_role() == AgentRole.FRANKLIN]
+            if len(franklin) == 0 or len(bridges) == 0:
+                move_loc = random.choice(environment.get_adjacent_locations(self._location))
+            else:
+                move_loc = self.__next_location(bridges, franklin[0])
         
         move_loc.set_range(self._location.get_range())
-        return [Move(move_loc, self)]
\ No newline at end of file
+        return [Move(move_loc, self)]
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import os
+
+from typing import Hashable, Mapping, Optional, TYPE_CHECKING
+
+from model.agents.linear_q import state_features
+from model.agents.q_table_file import load_q_table_file
+from model.agents.q_table_legacy import load_q_table
+
+if TYPE_CHECKING:
+    from model.agents.agent import Agent
+    from model.agents.linear_q import LinearQ
+    from model.environment import Environment
+    from model.actions.action import Action
+
+
+class GreedyPolicy:
+    """
+    Frozen greedy policy compiled from a Q-table.
+
+    The Q-values are regrouped by state, so an action is chosen with one lookup per state rather
+    than one per (state, action) pair, and the best action of every state is precomputed. The
+    policy matches Agent.pick_action with no exploration: unseen actions are worth 0 and ties go
+    to the first available action. It never changes the Q-table it was built from. Compiling
+    reads every entry, so each process holds its own copy of the values.
+    """
+
+    def __init__(self, q_table: Mapping[tuple, float]) -> None:
+        """
+        Compile a Q-table.
+
+        Args:
+            q_table (Mapping[tuple, float]): Q-values keyed by (state, action key).
+        """
+        self.__values: dict[Hashable, dict[tuple, float]] = {}
+        for (state, key), value in q_table.items():
+            self.__values.setdefault(state, {})[key] = value
+
+        # the best action of a state, when it beats every other action including unseen ones
+        self.__best: dict[Hashable, tuple] = {}
+        for state, values in self.__values.items():
+            ranked = sorted(values.values(), reverse=True)
+            key = max(values, key=values.get)
+            if ranked[0] > 0.0 and (len(ranked) == 1 or ranked[0] > ranked[1]):
+                self.__best[state] = key
+
+    @classmethod
+    def load(cls, path: str) -> GreedyPolicy:
+        """
+        Compiles the Q-table stored in a file, or an empty one if the file does not exist.
+
+        Q-table files are read with their pending delta files applied; .pkl files of older
+        versions are unpickled.
+
+        Args:
+            path (str): The path of the Q-table file or pickle.
+
+        Returns:
+            GreedyPolicy: The compiled policy.
+        """
+        if not os.path.exists(path):
+            return cls({})
+        if not path.endswith(".pkl"):
+            return cls(load_q_table_file(path))
+        with open(path, "rb") as f:
+            return cls(load_q_table(f))
+
+    def __len__(self) -> int:
+        """Return the number of states the policy knows."""
+        return len(self.__values)
+
+    def best_key(self, state: Hashable) -> Optional[tuple]:
+        """
+        Returns the precomputed best action key of a state.
+
+        Args:
+            state (Hashable): The state.
+
+        Returns:
+            Optional[tuple]: The key, or None if the state has no strictly best positive action.
+        """
+        return self.__best.get(state)
+
+    def choose(self, agent: Agent, environment: Environment) -> Optional[Action]:
+        """
+        Returns the greedy action of an agent.
+
+        Args:
+            agent (Agent): The acting agent.
+            environment (Environment): The environment the agent acts in.
+
+        Returns:
+            Optional[Action]: The chosen action, or None if the agent has no actions.
+        """
+        actions = agent.actions(environment)
+        if not actions:
+            return None
+
+        state = agent.get_state(environment)
+        best = self.__best.get(state)
+        if best is not None:
+            for action in actions:
+                if action.key() == best:
+                    return action
+
+        values = self.__values.get(state)
+        if values is None:
+            return actions[0]
+        return max(actions, key=lambda action: values.get(action.key(), 0.0))
+
+
+class LinearGreedyPolicy(GreedyPolicy):
+    """
+    Frozen greedy policy over a linear Q-function.
+
+    The policy matches Agent.pick_action with no exploration for agents learning a linear
+    Q-function: the action of highest value on the agent's state features, the first one on a
+    tie. The weights are never changed.
+    """
+
+    def __init__(self, q_function: LinearQ) -> None:
+        """
+        Wrap a linear Q-function.
+
+        Args:
+            q_function (LinearQ): The trained function.
+        """
+        super().__init__({})
+        self.__q_function = q_function
+
+    def choose(self, agent: Agent, environment: Environment) -> Optional[Action]:
+        actions = agent.actions(environment)
+        if not actions:
+            return None
+
+        values = self.__q_function.values(state_features(agent.get_table(), agent.get_row()),
+                                          [action.key() for action in actions])
+        return actions[int(values.argmax())]
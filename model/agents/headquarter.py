@@ -9,6 +9,10 @@ if TYPE_CHECKING:
 
 
 class Headquarter(Agent):
+    __slots__ = ()
+
+    passive = True
+
     def __init__(self, location: Location) -> None:
         super().__init__(location, role = AgentRole.HEADQUARTERS)
     
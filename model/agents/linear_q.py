@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import json
+import os
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from controller.config.config import Config
+from model.agents.agent_table import AgentTable
+from model.agents.q_table_file import _write_atomically
+
+
+REGION_SIZE = 5
+
+# names of the features before the region one-hot block
+FEATURE_NAMES = (
+    "bias",
+    "health",
+    "bridge_distance",
+    "bridge_health",
+    "mean_bridge_health",
+    "villain_distance",
+    "hero_distance",
+)
+
+
+def feature_count() -> int:
+    """
+    Returns the length of the feature vector for the current world size.
+
+    Returns:
+        int: The number of features.
+    """
+    regions = -(-Config.world_size // REGION_SIZE)
+    return len(FEATURE_NAMES) + regions * regions
+
+
+def state_features(table: AgentTable, row: int) -> np.ndarray:
+    """
+    Computes the feature vector of an agent from the columns of its table.
+
+    The distances from the agent to every agent on the grid are computed in one pass and reduced
+    per role. Distances are scaled to [0, 1] by the largest toroidal distance, and a missing
+    bridge, villain or hero counts as being as far away as possible.
+
+    Args:
+        table (AgentTable): The table holding the agents.
+        row (int): The row of the agent.
+
+    Returns:
+        np.ndarray: The features, FEATURE_NAMES followed by a one-hot of the agent's region.
+    """
+    from model.agents.agent import AgentRole
+
+    n = Config.world_size
+    far = n // 2
+    x, y = int(table.x[row]), int(table.y[row])
+
+    rows = table.rows()
+    rows = rows[rows != row]
+    roles = table.role[rows]
+    distances = table.distances(x, y, rows)
+
+    def nearest(role: AgentRole) -> tuple[float, int]:
+        mask = roles == role.value
+        if not mask.any():
+            return far, -1
+        i = int(np.argmin(np.where(mask, distances, far + 1)))
+        return int(distances[i]), int(rows[i])
+
+    features = np.zeros(feature_count())
+    features[0] = 1.0
+    features[1] = table.health[row]
+
+    bridge_distance, bridge = nearest(AgentRole.BRIDGE)
+    features[2] = bridge_distance / far
+    if bridge >= 0:
+        features[3] = table.health[bridge]
+        features[4] = table.health[rows[roles == AgentRole.BRIDGE.value]].mean()
+
+    features[5] = nearest(AgentRole.VILLAIN)[0] / far
+    features[6] = nearest(AgentRole.HERO)[0] / far
+
+    regions = -(-n // REGION_SIZE)
+    features[len(FEATURE_NAMES) + (y // REGION_SIZE) * regions + x // REGION_SIZE] = 1.0
+    return features
+
+
+class LinearQ:
+    """
+    Linear action-value function, Q(s, a) = w_a . phi(s).
+
+    Each action key gets its own weight row. Transitions are collected into preallocated arrays
+    and learned from in one batched semi-gradient update once the batch is full; the value of a
+    next state is the best value, at update time, among the actions available in it. The
+    weights are saved as a .npy file, with the action keys of its rows in a JSON file beside it.
+    """
+
+    def __init__(self, features: int, batch_size: int = 32) -> None:
+        """
+        Create a function with all weights at zero.
+
+        Args:
+            features (int): The length of the feature vector.
+            batch_size (int): The number of transitions per update.
+        """
+        self.__weights = np.zeros((16, features))
+        self.__action_ids: dict[tuple, int] = {}
+
+        self.__phi = np.zeros((batch_size, features))
+        self.__next_phi = np.zeros((batch_size, features))
+        self.__actions = np.zeros(batch_size, dtype=np.intp)
+        self.__rewards = np.zeros(batch_size)
+        self.__dones = np.zeros(batch_size, dtype=bool)
+        # the weight rows of the actions available in each next state
+        self.__next_actions = np.zeros((batch_size, 16), dtype=bool)
+        self.__pending = 0
+
+    def action_id(self, key: tuple) -> int:
+        """
+        Returns the weight row of an action key, adding a zero row if the key is new.
+
+        Args:
+            key (tuple): The action key.
+
+        Returns:
+            int: The row index.
+        """
+        aid = self.__action_ids.get(key)
+        if aid is None:
+            aid = self.__action_ids[key] = len(self.__action_ids)
+            if aid == self.__weights.shape[0]:
+                grown = np.zeros((2 * aid, self.__weights.shape[1]))
+                grown[:aid] = self.__weights
+                self.__weights = grown
+                mask = np.zeros((len(self.__next_actions), 2 * aid), dtype=bool)
+                mask[:, :aid] = self.__next_actions
+                self.__next_actions = mask
+        return aid
+
+    def values(self, phi: np.ndarray, keys: Sequence[tuple]) -> np.ndarray:
+        """
+        Returns the values of several actions in one state.
+
+        Args:
+            phi (np.ndarray): The features of the state.
+            keys (Sequence[tuple]): The action keys.
+
+        Returns:
+            np.ndarray: The value of each action.
+        """
+        aids = np.fromiter((self.action_id(key) for key in keys), dtype=np.intp, count=len(keys))
+        return self.__weights[aids] @ phi
+
+    def add(self, phi: np.ndarray, key: tuple, reward: float, next_phi: np.ndarray, next_keys: Sequence[tuple],
+            done: bool, alpha: float, gamma: float) -> float:
+        """
+        Queues a transition, and learns from the queued batch once it is full.
+
+        Args:
+            phi (np.ndarray): The features of the state the action was taken in.
+            key (tuple): The action key.
+            reward (float): The reward received.
+            next_phi (np.ndarray): The features of the state reached.
+            next_keys (Sequence[tuple]): The keys of the actions available in the state reached.
+            done (bool): Whether the transition ended the episode.
+            alpha (float): The learning rate.
+            gamma (float): The discount factor.
+
+        Returns:
+            float: The absolute TD error of the transition under the current weights.
+        """
+        aid = self.action_id(key)
+        next_aids = np.fromiter((self.action_id(k) for k in next_keys), dtype=np.intp, count=len(next_keys))
+        next_value = 0.0 if done or not len(next_aids) else float((self.__weights[next_aids] @ next_phi).max())
+
+        i = self.__pending
+        self.__phi[i] = phi
+        self.__next_phi[i] = next_phi
+        self.__actions[i] = aid
+        self.__rewards[i] = reward
+        self.__dones[i] = done
+        self.__next_actions[i] = False
+        self.__next_actions[i, next_aids] = True
+        self.__pending += 1
+
+        if self.__pending == len(self.__actions):
+            self.update(alpha, gamma)
+
+        target = reward + (0.0 if done else gamma * next_value)
+        return abs(target - float(self.__weights[aid] @ phi))
+
+    def update(self, alpha: float, gamma: float) -> None:
+        """
+        Applies one semi-gradient step for the queued transitions and clears the queue.
+
+        Args:
+            alpha (float): The learning rate.
+            gamma (float): The discount factor.
+        """
+        k = self.__pending
+        if k == 0:
+            return
+
+        known = len(self.__action_ids)
+        phi, actions = self.__phi[:k], self.__actions[:k]
+        available = self.__next_actions[:k, :known]
+        next_values = np.where(available, self.__next_phi[:k] @ self.__weights[:known].T, -np.inf).max(axis=1)
+        next_values[self.__dones[:k] | ~available.any(axis=1)] = 0.0
+
+        errors = self.__rewards[:k] + gamma * next_values - np.einsum("ij,ij->i", self.__weights[actions], phi)
+        np.add.at(self.__weights, actions, (alpha / k) * errors[:, None] * phi)
+        self.__pending = 0
+
+    def save(self, path: str) -> None:
+        """
+        Writes the weights to a .npy file and the action keys to a JSON file beside it.
+
+        Each file is written to a temporary file renamed over it, so a crash leaves the previous
+        version whole. The keys go first: they only grow, so a crash in between leaves rows for
+        every saved weight.
+
+        Args:
+            path (str): The path of the .npy file.
+        """
+        keys = sorted(self.__action_ids, key=self.__action_ids.get)
+        weights = self.__weights[:len(keys)]
+        _write_atomically(os.path.splitext(path)[0] + ".actions.json",
+                          lambda f: f.write(json.dumps([list(key) for key in keys]).encode()))
+        _write_atomically(path, lambda f: np.save(f, weights))
+
+    @classmethod
+    def load(cls, path: str, features: int, batch_size: int = 32) -> Optional[LinearQ]:
+        """
+        Reads the weights saved by save().
+
+        Args:
+            path (str): The path of the .npy file.
+            features (int): The expected length of the feature vector.
+            batch_size (int): The number of transitions per update.
+
+        Returns:
+            Optional[LinearQ]: The function, or None if there is no file or its features do not match.
+        """
+        keys_path = os.path.splitext(path)[0] + ".actions.json"
+        if not os.path.exists(path) or not os.path.exists(keys_path):
+            return None
+
+        weights = np.load(path)
+        if weights.ndim != 2 or weights.shape[1] != features:
+            return None
+
+        q = cls(features, batch_size)
+        with open(keys_path) as f:
+            for key in json.load(f):
+                q.action_id(tuple(key))
+        q.__weights[:len(weights)] = weights
+        return q
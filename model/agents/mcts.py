@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import math
+import random
+import time
+
+from typing import TYPE_CHECKING, Optional
+
+from controller.config.config import Config
+from model.actions.move import Move
+from model.agents.agent import AgentRole
+from model.earth import FightStatus
+from model.location import Location, NEIGHBOUR_DELTAS
+
+if TYPE_CHECKING:
+    from model.actions.action import Action
+    from model.agents.agent import Agent
+    from model.earth import Earth, EarthSnapshot
+
+
+class SearchNode:
+    """Statistics of the steps following a sequence of moves of the planning agent."""
+
+    __slots__ = ("visits", "value", "children")
+
+    def __init__(self) -> None:
+        self.visits = 0
+        self.value = 0.0
+        self.children: dict[tuple[int, int], SearchNode] = {}
+
+    def mean(self) -> float:
+        """Return the mean discounted return of the simulations through the node."""
+        return self.value / self.visits if self.visits else 0.0
+
+
+class MonteCarloTreeSearch:
+    """
+    Open-loop Monte Carlo tree search over the one-cell moves of an agent, within a time budget.
+
+    Every iteration restores a snapshot of the Earth and simulates up to `depth` steps. A node
+    stands for a sequence of one-cell moves of the planning agent. While the path stays in the
+    tree, the agent's move is picked by UCT, and a node tries the move of rollout_action before
+    the others. Below the tree, the agent follows rollout_action.
+
+    The other agents act as their own rollout_action picks. In the first step they play the
+    actions registered before the search instead. The discounted rewards of the agent's role
+    are backed up along the path. Nodes are keyed by the agent's moves alone, so their values
+    average over what the others did. The subtree of the move played becomes the root of the
+    next search.
+
+    A simulated step is only started when its average duration still fits before the deadline,
+    so a search overruns its budget by little more than the variance of a step. Simulated steps
+    do not fire timed events, and every agent acts in each of them.
+    """
+
+    # running mean of the seconds a simulated step takes at each depth, learned by all the searches of the process
+    __step_times: dict[int, float] = {}
+
+    def __init__(self, budget_ms: float, depth: int = 4, exploration: float = 10.0, gamma: float = 0.95) -> None:
+        """
+        Create a search with an empty tree.
+
+        Args:
+            budget_ms (float): The time a search may take, in milliseconds.
+            depth (int): The number of steps simulated by each iteration.
+            exploration (float): The weight of the exploration term of UCT, in units of reward.
+            gamma (float): The discount of the simulated rewards.
+        """
+        self.__budget = budget_ms / 1000.0
+        self.__depth = max(1, depth)
+        self.__exploration = exploration
+        self.__gamma = gamma
+        self.__root = SearchNode()
+        self.iterations = 0
+
+    def get_root(self) -> SearchNode:
+        """
+        Get the root of the tree, the node of the next search.
+
+        Returns:
+            SearchNode: The root node.
+        """
+        return self.__root
+
+    def search(self, agent: Agent, earth: Earth) -> Optional[Action]:
+        """
+        Plans the next move of an agent until the time budget runs out.
+
+        The Earth is put back in the state it had before the search, actions registered so far
+        included.
+
+        Args:
+            agent (Agent): The planning agent, on the grid.
+            earth (Earth): The Earth the agent acts in.
+
+        Returns:
+            Optional[Action]: The most visited move, the better one on a tie, None if no simulation fitted in the budget.
+        """
+        deadline = time.perf_counter() + self.__budget
+        snapshot = earth.snapshot()
+        root = self.__root
+
+        self.iterations = 0
+        try:
+            while time.perf_counter() < deadline:
+                self.__simulate(root, agent, earth, snapshot, deadline)
+                earth.restore(snapshot)
+                self.iterations += 1
+        finally:
+            earth.restore(snapshot)
+
+        if not root.children:
+            self.__root = SearchNode()
+            return None
+
+        delta = max(root.children, key=lambda d: (root.children[d].visits, root.children[d].mean()))
+        self.__root = root.children[delta]
+        return self.__move(agent, delta)
+
+    def __simulate(self, root: SearchNode, agent: Agent, earth: Earth, snapshot: EarthSnapshot, deadline: float) -> None:
+        """Run one iteration from the snapshot, growing the tree by at most one node."""
+        node = root
+        path = [root]
+        rewards = []
+        step_times = MonteCarloTreeSearch.__step_times
+
+        for depth in range(self.__depth):
+            start = time.perf_counter()
+            if earth.get_status() is not FightStatus.RUNNING or agent.get_location() is None \
+                    or start + step_times.get(depth, 0.0) >= deadline:
+                break
+
+            if node is not None:
+                delta = self.__select(node, agent, earth)
+                expanded = delta not in node.children
+                if expanded:
+                    node.children[delta] = SearchNode()
+                path.append(node.children[delta])
+                node = None if expanded else node.children[delta]
+                action = self.__move(agent, delta)
+            else:
+                action = agent.rollout_action(earth)
+
+            if depth > 0:
+                self.__register_replies(agent, earth, snapshot.agents)
+            earth.register_action(action)
+            h_reward, v_reward = earth.execute_actions(advance_events=False)
+            rewards.append(h_reward if agent.get_agent_role() is AgentRole.HERO else v_reward)
+            elapsed = time.perf_counter() - start
+            step_times[depth] = step_times.get(depth, elapsed) + 0.1 * (elapsed - step_times.get(depth, elapsed))
+
+        if not rewards:
+            return
+
+        # the node reached by the i-th move earns the return from step i, the root that of the first step
+        returns = [0.0] * len(rewards)
+        total = 0.0
+        for i in reversed(range(len(rewards))):
+            total = rewards[i] + self.__gamma * total
+            returns[i] = total
+        for i, node in enumerate(path):
+            node.visits += 1
+            node.value += returns[max(0, i - 1)]
+
+    def __select(self, node: SearchNode, agent: Agent, earth: Earth) -> tuple[int, int]:
+        """Return an untried move of a node, the agent's own first, or the child maximising UCT once every move was tried."""
+        untried = [delta for delta in NEIGHBOUR_DELTAS if delta not in node.children]
+        if untried:
+            if not node.children:
+                default = self.__delta(agent, agent.rollout_action(earth))
+                if default in untried:
+                    return default
+            return random.choice(untried)
+
+        log_visits = math.log(node.visits)
+        return max(node.children, key=lambda delta: node.children[delta].mean()
+                   + self.__exploration * math.sqrt(log_visits / node.children[delta].visits))
+
+    @staticmethod
+    def __register_replies(agent: Agent, earth: Earth, agents: tuple[Agent, ...]) -> None:
+        """Register the rollout action of every other active agent still on the grid."""
+        movers = [other for other in agents if other is not agent and not other.passive
+                  and other.get_location() is not None and earth.get_agent(other.get_location()) is other]
+
+        encoded = [other for other in movers if other.state_target_role is not None and not other.uses_linear_q]
+        states = dict(zip(map(id, encoded), earth.get_states(encoded))) if encoded else {}
+        for other in movers:
+            earth.register_action(other.rollout_action(earth, states.get(id(other))))
+
+    @staticmethod
+    def __delta(agent: Agent, action: Optional[Action]) -> Optional[tuple[int, int]]:
+        """Return the one-cell step of a move of an agent, None for other actions."""
+        if not isinstance(action, Move):
+            return None
+        size = Config.world_size
+        dx = (action.get_location().get_x() - agent.get_location().get_x() + 1) % size - 1
+        dy = (action.get_location().get_y() - agent.get_location().get_y() + 1) % size - 1
+        return dx, dy
+
+    @staticmethod
+    def __move(agent: Agent, delta: tuple[int, int]) -> Move:
+        """Return the move of an agent by one cell, keeping its range."""
+        location = agent.get_location()
+        size = Config.world_size
+        return Move(Location((location.get_x() + delta[0]) % size, (location.get_y() + delta[1]) % size,
+                             location.get_range()), agent)
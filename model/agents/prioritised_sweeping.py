@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import heapq
+import time
+
+from typing import Optional
+
+import numpy as np
+
+from model.agents.q_table import QTable
+
+
+class PrioritisedSweeping:
+    """
+    Tabular model of the observed transitions, used to plan with prioritised sweeping.
+
+    For every (state, action) the model keeps the mean reward and how often each next state
+    followed. Entries whose Q-value disagrees with the model by more than the threshold are kept
+    on a max-heap by the size of the disagreement. Planning pops the worst entry, moves its value
+    to the model's expected target, and queues the predecessors of its state, whose targets have
+    just changed, so the effect of one real step spreads backwards without simulating anything.
+    All states and actions are ids of the QTable the planner updates.
+    """
+
+    def __init__(self, q_table: QTable, threshold: float = 1e-4) -> None:
+        """
+        Create an empty model.
+
+        Args:
+            q_table (QTable): The Q-table planned on.
+            threshold (float): The smallest error worth queueing.
+        """
+        self.__q_table = q_table
+        self.__threshold = threshold
+
+        # (state, action) -> [reward sum, count, {next state: count}, head]
+        self.__model: dict[tuple[int, int], list] = {}
+        self.__predecessors: dict[int, set[tuple[int, int]]] = {}
+
+        self.__heap: list[tuple[float, tuple[int, int]]] = []
+        self.__queued: dict[tuple[int, int], float] = {}
+
+    def observe(self, state: int, action: int, reward: float, next_state: int, done: bool, gamma: float,
+                head: Optional[int] = None) -> None:
+        """
+        Records a real transition and queues its entry if the model disagrees with its Q-value.
+
+        Args:
+            state (int): The id of the state the action was taken in.
+            action (int): The id of the action.
+            reward (float): The reward received.
+            next_state (int): The id of the state reached.
+            done (bool): Whether the transition ended the episode, in which case nothing follows it.
+            gamma (float): The discount factor.
+            head (Optional[int]): The QTable head of the acting class, for tables shared by several classes.
+        """
+        key = (state, action)
+        entry = self.__model.get(key)
+        if entry is None:
+            entry = self.__model[key] = [0.0, 0, {}, head]
+        entry[0] += reward
+        entry[1] += 1
+        if not done:
+            entry[2][next_state] = entry[2].get(next_state, 0) + 1
+            self.__predecessors.setdefault(next_state, set()).add(key)
+
+        self.__push(key, abs(self.__target(key, gamma) - self.__q_table.get_value(state, action)))
+
+    def plan(self, alpha: float, gamma: float, max_updates: int, budget_us: float = 0.0) -> int:
+        """
+        Applies planning updates to the entries with the largest errors.
+
+        Args:
+            alpha (float): The learning rate.
+            gamma (float): The discount factor.
+            max_updates (int): The most updates applied.
+            budget_us (float): The most microseconds spent, no time limit if 0.
+
+        Returns:
+            int: The number of updates applied.
+        """
+        deadline = time.perf_counter_ns() + budget_us * 1000 if budget_us > 0 else None
+        updates = 0
+
+        while updates < max_updates and self.__heap:
+            if deadline is not None and time.perf_counter_ns() >= deadline:
+                break
+
+            key = self.__pop()
+            if key is None:
+                break
+
+            state, action = key
+            self.__q_table.add_value(state, action, alpha * (self.__target(key, gamma) - self.__q_table.get_value(state, action)))
+            updates += 1
+
+            for predecessor in self.__predecessors.get(state, ()):
+                error = self.__target(predecessor, gamma) - self.__q_table.get_value(*predecessor)
+                self.__push(predecessor, abs(error))
+
+        return updates
+
+    def __len__(self) -> int:
+        """Return the number of entries waiting to be planned on."""
+        return len(self.__queued)
+
+    def __target(self, key: tuple[int, int], gamma: float) -> float:
+        """Return the expected one-step target of an entry under the model."""
+        total, count, successors, head = self.__model[key]
+        target = total / count
+        if successors:
+            states = np.fromiter(successors.keys(), dtype=np.int64, count=len(successors))
+            weights = np.fromiter(successors.values(), dtype=float, count=len(successors))
+            heads = None if head is None else np.full(len(states), head)
+            target += gamma * float(weights @ self.__q_table.best_values(states, heads)) / count
+        return target
+
+    def __push(self, key: tuple[int, int], priority: float) -> None:
+        """Queue an entry, unless its error is too small or it is already queued with a larger one."""
+        if priority <= self.__threshold or priority <= self.__queued.get(key, 0.0):
+            return
+        self.__queued[key] = priority
+        heapq.heappush(self.__heap, (-priority, key))
+
+    def __pop(self) -> Optional[tuple[int, int]]:
+        """Remove and return the queued entry with the largest error, skipping stale heap items."""
+        while self.__heap:
+            priority, key = heapq.heappop(self.__heap)
+            if self.__queued.get(key) == -priority:
+                del self.__queued[key]
+                return key
+        return None
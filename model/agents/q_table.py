@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+from collections.abc import MutableMapping
+from typing import Hashable, Iterator, Mapping, Optional
+
+import numpy as np
+
+
+class QTable(MutableMapping):
+    """
+    Dense Q-table keyed by (state, action key).
+
+    States and action keys are interned into consecutive ids, and the values are kept in a
+    2-D array indexed by those ids, so batches of transitions can be updated with a handful of
+    vectorised operations. As a mapping it behaves like the defaultdict(float) it replaces:
+    reading a missing entry returns 0.0 and adds it to the table.
+
+    A table shared by several agent classes keeps one head per class, recording the actions the
+    class can take, so that bootstrapping from a state only considers the acting class's actions.
+
+    Values are stored as float32. Every entry also counts its visits and remembers when it was
+    last visited, so a table can be kept under a size cap by evicting the least frequently or the
+    least recently visited entries.
+
+    Entries written since the last call to take_changes() are flagged dirty, so a checkpoint
+    only has to write what changed.
+    """
+
+    def __init__(self, entries: Optional[Mapping[tuple, float]] = None, states: int = 64, actions: int = 16) -> None:
+        """
+        Create a table.
+
+        Args:
+            entries (Optional[Mapping[tuple, float]]): Initial Q-values keyed by (state, action key).
+            states (int): The initial number of state rows.
+            actions (int): The initial number of action columns.
+        """
+        self.__state_ids: dict[Hashable, int] = {}
+        self.__action_ids: dict[tuple, int] = {}
+        self.__states: list[Hashable] = []
+        self.__actions: list[tuple] = []
+        self.__values = np.zeros((states, actions), dtype=np.float32)
+        self.__seen = np.zeros((states, actions), dtype=bool)
+        self.__visits = np.zeros((states, actions), dtype=np.uint32)
+        self.__last_visit = np.zeros((states, actions), dtype=np.int64)
+        self.__dirty = np.zeros((states, actions), dtype=bool)
+        # NaN for the entries evicted since the last checkpoint, whose ids the eviction gave away
+        self.__evicted_keys: dict[tuple, float] = {}
+        self.__size = 0
+        self.__clock = 0
+        self.__evicted = 0
+
+        self.__heads: dict[str, int] = {}
+        self.__allowed = np.zeros((0, actions), dtype=bool)
+
+        if entries is not None:
+            for key, value in entries.items():
+                self[key] = value
+
+    def state_id(self, state: Hashable) -> int:
+        """
+        Returns the row of a state, adding the state if it is new.
+
+        Args:
+            state (Hashable): The state.
+
+        Returns:
+            int: The row index.
+        """
+        sid = self.__state_ids.get(state)
+        if sid is None:
+            sid = self.__state_ids[state] = len(self.__states)
+            self.__states.append(state)
+            if sid == self.__values.shape[0]:
+                self.__grow(2 * sid, self.__values.shape[1])
+        return sid
+
+    def action_id(self, key: tuple) -> int:
+        """
+        Returns the column of an action key, adding the key if it is new.
+
+        Args:
+            key (tuple): The action key.
+
+        Returns:
+            int: The column index.
+        """
+        aid = self.__action_ids.get(key)
+        if aid is None:
+            aid = self.__action_ids[key] = len(self.__actions)
+            self.__actions.append(key)
+            if aid == self.__values.shape[1]:
+                self.__grow(self.__values.shape[0], 2 * aid)
+        return aid
+
+    def head_id(self, name: str) -> int:
+        """
+        Returns the head of an agent class, adding it if it is new.
+
+        Args:
+            name (str): The name of the agent class.
+
+        Returns:
+            int: The head index.
+        """
+        head = self.__heads.get(name)
+        if head is None:
+            head = self.__heads[name] = len(self.__heads)
+            self.__allowed = np.vstack([self.__allowed, np.zeros((1, self.__allowed.shape[1]), dtype=bool)])
+        return head
+
+    def allow(self, head: int, aid: int) -> None:
+        """
+        Records that the class of a head can take an action.
+
+        Args:
+            head (int): The head index.
+            aid (int): The action id.
+        """
+        self.__allowed[head, aid] = True
+
+    def get_value(self, sid: int, aid: int) -> float:
+        """
+        Get a Q-value by ids, without adding the entry.
+
+        Args:
+            sid (int): The state id.
+            aid (int): The action id.
+
+        Returns:
+            float: The Q-value, 0.0 if the entry is missing.
+        """
+        return float(self.__values[sid, aid])
+
+    def peek(self, key: tuple) -> float:
+        """
+        Get a Q-value by (state, action key), without interning the state or the action.
+
+        Args:
+            key (tuple): The (state, action key) pair.
+
+        Returns:
+            float: The Q-value, 0.0 if the entry is missing.
+        """
+        state, action = key
+        sid = self.__state_ids.get(state)
+        aid = self.__action_ids.get(action)
+        return 0.0 if sid is None or aid is None else float(self.__values[sid, aid])
+
+    def add_value(self, sid: int, aid: int, delta: float) -> None:
+        """
+        Changes a Q-value by ids, adding the entry if it is missing.
+
+        Args:
+            sid (int): The state id.
+            aid (int): The action id.
+            delta (float): The change of the value.
+        """
+        if not self.__seen[sid, aid]:
+            self.__seen[sid, aid] = True
+            self.__size += 1
+        self.__values[sid, aid] += delta
+        self.__dirty[sid, aid] = True
+
+    def visit(self, sid: int, aid: int) -> None:
+        """
+        Counts a visit of an entry by a real transition.
+
+        Args:
+            sid (int): The state id.
+            aid (int): The action id.
+        """
+        self.__clock += 1
+        self.__visits[sid, aid] += 1
+        self.__last_visit[sid, aid] = self.__clock
+
+    def get_visits(self, sid: int, aid: int) -> int:
+        """
+        Get the number of visits of an entry.
+
+        Args:
+            sid (int): The state id.
+            aid (int): The action id.
+
+        Returns:
+            int: The visit count.
+        """
+        return int(self.__visits[sid, aid])
+
+    def evict(self, capacity: int, policy: str = "lfu", slack: float = 0.1) -> int:
+        """
+        Shrinks the table below a size cap.
+
+        Once the table holds more than `capacity` entries, entries are dropped until it holds
+        (1 - slack) * capacity, so eviction does not run again on every call. The "lfu" policy drops
+        the least visited entries first, the older ones among equals; the "age" policy drops the
+        entries visited longest ago first. States left without entries are removed and the
+        remaining states get new ids, so ids taken before an eviction must not be used after it.
+
+        Args:
+            capacity (int): The most entries kept.
+            policy (str): "lfu" or "age".
+            slack (float): The share of the capacity freed by an eviction.
+
+        Returns:
+            int: The number of entries dropped.
+        """
+        if self.__size <= capacity:
+            return 0
+        if policy not in ("lfu", "age"):
+            raise ValueError(f"unknown eviction policy {policy!r}")
+
+        rows, columns = np.nonzero(self.__seen)
+        visits = self.__visits[rows, columns]
+        last_visit = self.__last_visit[rows, columns]
+        order = np.lexsort((last_visit, visits) if policy == "lfu" else (visits, last_visit))
+
+        dropped = order[:self.__size - int(capacity * (1 - slack))]
+        for sid, aid in zip(rows[dropped].tolist(), columns[dropped].tolist()):
+            self.__evicted_keys[(self.__states[sid], self.__actions[aid])] = np.nan
+        self.__dirty[rows[dropped], columns[dropped]] = False
+        self.__seen[rows[dropped], columns[dropped]] = False
+        self.__values[rows[dropped], columns[dropped]] = 0.0
+        self.__visits[rows[dropped], columns[dropped]] = 0
+        self.__last_visit[rows[dropped], columns[dropped]] = 0
+        self.__size -= len(dropped)
+        self.__evicted += len(dropped)
+
+        self.__compact()
+        return len(dropped)
+
+    def take_changes(self) -> dict[tuple, float]:
+        """
+        Returns the entries changed since the last call and clears their dirty flags.
+
+        Evicted entries are returned as deleted, so a checkpoint after an eviction only deletes
+        what the eviction dropped and leaves the other entries of a shared storage alone.
+
+        Returns:
+            dict[tuple, float]: The changed Q-values keyed by (state, action key), NaN for deleted entries.
+        """
+        rows, columns = np.nonzero(self.__dirty)
+        values = np.where(self.__seen[rows, columns], self.__values[rows, columns], np.nan)
+        self.__dirty[rows, columns] = False
+
+        changes, self.__evicted_keys = self.__evicted_keys, {}
+        changes.update(((self.__states[sid], self.__actions[aid]), value)
+                       for sid, aid, value in zip(rows.tolist(), columns.tolist(), values.tolist()))
+        return changes
+
+    def stats(self) -> dict:
+        """
+        Returns the size of the table and how its entries are used.
+
+        Returns:
+            dict: The entries, states, actions, bytes held by the arrays, mean visits per entry
+                and entries evicted so far.
+        """
+        arrays = (self.__values, self.__seen, self.__visits, self.__last_visit, self.__dirty, self.__allowed)
+        return {
+            "entries": self.__size,
+            "states": len(self.__states),
+            "actions": len(self.__actions),
+            "bytes": sum(array.nbytes for array in arrays),
+            "mean_visits": float(self.__visits.sum()) / self.__size if self.__size else 0.0,
+            "evicted": self.__evicted,
+        }
+
+    def best_values(self, sids: np.ndarray, heads: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Returns the best value among the actions seen in each state.
+
+        Args:
+            sids (np.ndarray): The state ids.
+            heads (Optional[np.ndarray]): The head of each state, to consider only the actions of its class.
+
+        Returns:
+            np.ndarray: The best values, 0.0 for states without any seen action.
+        """
+        mask = self.__seen[sids]
+        if heads is not None:
+            mask = mask & self.__allowed[heads]
+        values = np.where(mask, self.__values[sids], -np.inf).max(axis=1)
+        values[np.isneginf(values)] = 0.0
+        return values
+
+    def batch_update(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                     next_states: np.ndarray, dones: np.ndarray, alpha: float, gamma: float,
+                     heads: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Applies one Q-learning update per transition of a batch.
+
+        The value of a next state is the best value among the actions seen in it, 0 if none was
+        seen or the transition ended the episode. All targets are computed before any value is
+        changed, and the updates of an entry drawn several times are averaged, so a batch moves
+        an entry by at most alpha towards its mean target however often it was drawn.
+
+        Args:
+            states (np.ndarray): The state ids.
+            actions (np.ndarray): The action ids.
+            rewards (np.ndarray): The rewards.
+            next_states (np.ndarray): The ids of the states reached.
+            dones (np.ndarray): Whether each transition ended the episode.
+            alpha (float): The learning rate.
+            gamma (float): The discount factor.
+            heads (Optional[np.ndarray]): The head of each transition, for tables shared by several classes.
+
+        Returns:
+            np.ndarray: The change applied by each transition, its share of the averaged update.
+        """
+        next_values = self.best_values(next_states, heads)
+        next_values[dones] = 0.0
+
+        deltas = alpha * (rewards + gamma * next_values - self.__values[states, actions])
+        entries = states.astype(np.int64) * self.__values.shape[1] + actions
+        _, index, counts = np.unique(entries, return_inverse=True, return_counts=True)
+        deltas = deltas / counts[index]
+        np.add.at(self.__values, (states, actions), deltas)
+
+        self.__dirty[states, actions] = True
+
+        unseen = ~self.__seen[states, actions]
+        if unseen.any():
+            self.__seen[states[unseen], actions[unseen]] = True
+            self.__size = int(self.__seen.sum())
+        return deltas
+
+    def __grow(self, states: int, actions: int) -> None:
+        """Reallocate the arrays with room for more states or actions."""
+        values = np.zeros((states, actions), dtype=self.__values.dtype)
+        seen = np.zeros((states, actions), dtype=bool)
+        rows, columns = self.__values.shape
+        values[:rows, :columns] = self.__values
+        seen[:rows, :columns] = self.__seen
+        self.__values = values
+        self.__seen = seen
+
+        visits = np.zeros((states, actions), dtype=self.__visits.dtype)
+        last_visit = np.zeros((states, actions), dtype=self.__last_visit.dtype)
+        visits[:rows, :columns] = self.__visits
+        last_visit[:rows, :columns] = self.__last_visit
+        self.__visits = visits
+        self.__last_visit = last_visit
+
+        dirty = np.zeros((states, actions), dtype=bool)
+        dirty[:rows, :columns] = self.__dirty
+        self.__dirty = dirty
+
+        allowed = np.zeros((self.__allowed.shape[0], actions), dtype=bool)
+        allowed[:, :columns] = self.__allowed
+        self.__allowed = allowed
+
+    def __compact(self) -> None:
+        """Drop the states without entries and renumber the others."""
+        # deletions not taken yet would go with their state, so they are kept by key like evictions
+        rows, columns = np.nonzero(self.__dirty & ~self.__seen)
+        for sid, aid in zip(rows.tolist(), columns.tolist()):
+            self.__evicted_keys[(self.__states[sid], self.__actions[aid])] = np.nan
+        self.__dirty[rows, columns] = False
+
+        kept = np.flatnonzero(self.__seen[:len(self.__states)].any(axis=1))
+        capacity = max(64, 2 * len(kept))
+
+        def compacted(array: np.ndarray) -> np.ndarray:
+            rows = np.zeros((capacity, array.shape[1]), dtype=array.dtype)
+            rows[:len(kept)] = array[kept]
+            return rows
+
+        self.__values = compacted(self.__values)
+        self.__seen = compacted(self.__seen)
+        self.__visits = compacted(self.__visits)
+        self.__last_visit = compacted(self.__last_visit)
+        self.__dirty = compacted(self.__dirty)
+
+        self.__states = [self.__states[sid] for sid in kept.tolist()]
+        self.__state_ids = {state: sid for sid, state in enumerate(self.__states)}
+
+    def __getitem__(self, key: tuple) -> float:
+        state, action = key
+        sid = self.state_id(state)
+        aid = self.action_id(action)
+        if not self.__seen[sid, aid]:
+            self.__seen[sid, aid] = True
+            self.__dirty[sid, aid] = True
+            self.__size += 1
+        return float(self.__values[sid, aid])
+
+    def __setitem__(self, key: tuple, value: float) -> None:
+        state, action = key
+        sid = self.state_id(state)
+        aid = self.action_id(action)
+        if not self.__seen[sid, aid]:
+            self.__seen[sid, aid] = True
+            self.__size += 1
+        self.__values[sid, aid] = value
+        self.__dirty[sid, aid] = True
+
+    def __delitem__(self, key: tuple) -> None:
+        state, action = key
+        sid = self.__state_ids.get(state)
+        aid = self.__action_ids.get(action)
+        if sid is None or aid is None or not self.__seen[sid, aid]:
+            raise KeyError(key)
+        self.__seen[sid, aid] = False
+        self.__values[sid, aid] = 0.0
+        self.__visits[sid, aid] = 0
+        self.__last_visit[sid, aid] = 0
+        self.__dirty[sid, aid] = True
+        self.__size -= 1
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            state, action = key
+            sid = self.__state_ids.get(state)
+            aid = self.__action_ids.get(action)
+        except (TypeError, ValueError):
+            return False
+        return sid is not None and aid is not None and bool(self.__seen[sid, aid])
+
+    def __iter__(self) -> Iterator[tuple]:
+        rows, columns = np.nonzero(self.__seen)
+        for sid, aid in zip(rows.tolist(), columns.tolist()):
+            yield self.__states[sid], self.__actions[aid]
+
+    def __len__(self) -> int:
+        return self.__size
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+import re
+
+from collections.abc import Mapping
+from typing import Any, BinaryIO, Callable, Iterator, Optional
+
+import numpy as np
+
+
+FORMAT_VERSION = 1
+
+# a table is stored as <name>.qtable.npy, with its manifest in <name>.qtable.json
+SUFFIX = ".qtable.npy"
+MANIFEST_SUFFIX = ".qtable.json"
+
+# changes written since the table was last rewritten are stored as <name>.qtable.delta-<sequence>.npy
+DELTA_SUFFIX = ".qtable.delta-{:06d}.npy"
+DELTA_PATTERN = re.compile(r"\.qtable\.delta-(\d+)\.npy$")
+
+
+class QTableFileError(Exception):
+    """Raised when a Q-table file is missing, of an unknown version or corrupted."""
+
+
+def table_path(directory: str, name: str) -> str:
+    """
+    Returns the path of the Q-table file of an agent class.
+
+    Args:
+        directory (str): The Q-table directory.
+        name (str): The table name, usually the agent class name.
+
+    Returns:
+        str: The path of the .qtable.npy file.
+    """
+    return os.path.join(directory, f"{name}{SUFFIX}")
+
+
+def manifest_path(path: str) -> str:
+    """Return the path of the manifest of a Q-table file."""
+    return path[:-len(SUFFIX)] + MANIFEST_SUFFIX if path.endswith(SUFFIX) else path + ".json"
+
+
+def delta_path(path: str, sequence: int) -> str:
+    """Return the path of a delta file of a Q-table file."""
+    stem = path[:-len(SUFFIX)] if path.endswith(SUFFIX) else path
+    return stem + DELTA_SUFFIX.format(sequence)
+
+
+def delta_paths(path: str) -> list[tuple[int, str]]:
+    """
+    Lists the delta files of a Q-table file.
+
+    Args:
+        path (str): The path of the .qtable.npy file.
+
+    Returns:
+        list[tuple[int, str]]: The sequence number and path of each delta file, in sequence order.
+    """
+    stem = path[:-len(SUFFIX)] if path.endswith(SUFFIX) else path
+    deltas = []
+    for candidate in glob.glob(glob.escape(stem) + ".qtable.delta-*.npy"):
+        match = DELTA_PATTERN.search(candidate)
+        if match:
+            deltas.append((int(match.group(1)), candidate))
+    return sorted(deltas)
+
+
+def read_sequence(path: str) -> int:
+    """
+    Returns the sequence number of the last delta folded into a Q-table file.
+
+    Args:
+        path (str): The path of the .qtable.npy file.
+
+    Returns:
+        int: The sequence number recorded in the manifest, 0 if there is no manifest.
+    """
+    manifest = _read_manifest(path)
+    try:
+        return int(manifest.get("sequence", 0)) if manifest else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def encode_key(key: tuple) -> bytes:
+    """
+    Encodes a (state, action key) pair as compact JSON, tuples becoming lists.
+
+    Args:
+        key (tuple): The Q-table key.
+
+    Returns:
+        bytes: The UTF-8 encoded key.
+    """
+    return json.dumps(key, separators=(",", ":")).encode()
+
+
+def decode_key(encoded: bytes) -> tuple:
+    """
+    Decodes a key written by encode_key, lists becoming tuples again.
+
+    Args:
+        encoded (bytes): The encoded key.
+
+    Returns:
+        tuple: The Q-table key.
+    """
+    def as_tuple(value: Any) -> Any:
+        return tuple(as_tuple(item) for item in value) if isinstance(value, list) else value
+
+    return as_tuple(json.loads(encoded))
+
+
+def encode_records(entries: Mapping[tuple, float]) -> np.ndarray:
+    """
+    Encodes Q-table entries as records sorted by encoded key.
+
+    Args:
+        entries (Mapping[tuple, float]): The Q-values keyed by (state, action key).
+
+    Returns:
+        np.ndarray: The (key, float32 value) records.
+    """
+    encoded = sorted((encode_key(key), value) for key, value in entries.items())
+    width = max((len(key) for key, _ in encoded), default=1)
+    records = np.zeros(len(encoded), dtype=[("key", f"S{width}"), ("value", "<f4")])
+    if encoded:
+        records["key"] = [key for key, _ in encoded]
+        records["value"] = [value for _, value in encoded]
+    return records
+
+
+def save_q_table(path: str, q_table: Mapping[tuple, float], sequence: Optional[int] = None) -> None:
+    """
+    Writes a Q-table as a sorted array of (encoded key, float32 value) records and a manifest.
+
+    Both files are written to temporary names first and then renamed, so neither is ever seen
+    half-written. The manifest is renamed first, still describing the array it replaces as
+    pending, then the array, then the manifest again without it: a crash between the renames
+    leaves an array that matches one of the two checksums, which tells the reader which one is
+    on disk. The table replaces the delta files up to `sequence`, which are deleted once it is
+    in place.
+
+    Args:
+        path (str): The path of the .qtable.npy file.
+        q_table (Mapping[tuple, float]): The Q-values keyed by (state, action key).
+        sequence (Optional[int]): The last delta the table includes, every delta on disk by default.
+    """
+    deltas = delta_paths(path)
+    if sequence is None:
+        sequence = max([read_sequence(path)] + [number for number, _ in deltas])
+
+    records = encode_records(q_table)
+    manifest = {
+        "format": "qtable",
+        "version": FORMAT_VERSION,
+        "entries": len(records),
+        "key_width": records.dtype["key"].itemsize,
+        "sequence": sequence,
+        "sha256": hashlib.sha256(records.tobytes()).hexdigest(),
+    }
+
+    previous = _read_manifest(path) if os.path.exists(path) else None
+    if previous is not None:
+        previous = {field: previous[field] for field in ("entries", "key_width", "sequence", "sha256") if field in previous}
+    pending = dict(manifest, previous=previous)
+
+    _write_atomically(manifest_path(path), lambda f: f.write(json.dumps(pending).encode()))
+    _write_atomically(path, lambda f: np.save(f, records))
+    _write_atomically(manifest_path(path), lambda f: f.write(json.dumps(manifest).encode()))
+
+    for number, delta in deltas:
+        if number <= sequence:
+            os.remove(delta)
+
+
+def save_delta(path: str, changes: Mapping[tuple, float], sequence: int) -> str:
+    """
+    Writes the entries changed since the last checkpoint as a delta file of a Q-table file.
+
+    Deleted entries are written with a NaN value. Like the table itself, the delta is written
+    to a temporary name and renamed, so it is either complete or absent.
+
+    Args:
+        path (str): The path of the .qtable.npy file.
+        changes (Mapping[tuple, float]): The changed Q-values keyed by (state, action key).
+        sequence (int): The sequence number of the delta, larger than that of every earlier one.
+
+    Returns:
+        str: The path of the delta file.
+    """
+    records = encode_records(changes)
+    target = delta_path(path, sequence)
+    _write_atomically(target, lambda f: np.save(f, records))
+    return target
+
+
+def load_entries(path: str) -> dict[tuple, float]:
+    """
+    Reads a Q-table file and applies its pending delta files in sequence order.
+
+    Args:
+        path (str): The path of the .qtable.npy file.
+
+    Returns:
+        dict[tuple, float]: The Q-values keyed by (state, action key).
+    """
+    if not os.path.exists(path):
+        entries = {}
+        _apply_deltas(entries, path, read_sequence(path))
+        return entries
+
+    records, sequence = _open(path, mmap=False, verify=True)
+    entries = dict(MappedQTable(records).items())
+    _apply_deltas(entries, path, sequence)
+    return entries
+
+
+def load_q_table_file(path: str, mmap: bool = False, verify: bool = True, with_deltas: bool = True) -> MappedQTable:
+    """
+    Opens a Q-table file.
+
+    Pending delta files are applied to the records in memory, so a table is only memory-mapped
+    while it has no deltas, that is right after it has been compacted.
+
+    Args:
+        path (str): The path of the .qtable.npy file.
+        mmap (bool): Map the file read-only instead of reading it, so processes share its pages.
+        verify (bool): Check the records against the checksum of the manifest.
+        with_deltas (bool): Apply the delta files written after the table.
+
+    Returns:
+        MappedQTable: The read-only table.
+
+    Raises:
+        QTableFileError: If the file or its manifest is missing, of another version, or does not match its checksum.
+    """
+    records, sequence = _open(path, mmap, verify)
+    if with_deltas and any(number > sequence for number, _ in delta_paths(path)):
+        entries = dict(MappedQTable(records).items())
+        _apply_deltas(entries, path, sequence)
+        records = encode_records(entries)
+
+    return MappedQTable(records)
+
+
+def _read_manifest(path: str) -> Optional[dict]:
+    """Return the manifest of a Q-table file, None if it is missing or unreadable."""
+    try:
+        with open(manifest_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _open(path: str, mmap: bool, verify: bool) -> tuple[np.ndarray, int]:
+    """Return the checked records of a Q-table file and the sequence number of the last delta they include."""
+    try:
+        with open(manifest_path(path)) as f:
+            manifest = json.load(f)
+        records = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+    except (OSError, ValueError) as error:
+        raise QTableFileError(f"cannot read Q-table {path}: {error}") from error
+
+    if manifest.get("format") != "qtable" or manifest.get("version") != FORMAT_VERSION:
+        raise QTableFileError(f"{path} has unsupported format {manifest.get('format')} v{manifest.get('version')}")
+
+    if "previous" in manifest:
+        # a rewrite was interrupted, or is under way, so the array may still be the one it replaces
+        checksum = hashlib.sha256(records.tobytes()).hexdigest()
+        previous = manifest["previous"] or {}
+        if checksum == previous.get("sha256") and checksum != manifest["sha256"]:
+            return records, previous.get("sequence", 0)
+        if checksum != manifest["sha256"]:
+            raise QTableFileError(f"{path} does not match its checksum")
+        return records, manifest.get("sequence", 0)
+
+    if len(records) != manifest["entries"]:
+        raise QTableFileError(f"{path} holds {len(records)} entries, its manifest {manifest['entries']}")
+    if verify and hashlib.sha256(records.tobytes()).hexdigest() != manifest["sha256"]:
+        raise QTableFileError(f"{path} does not match its checksum")
+    return records, manifest.get("sequence", 0)
+
+
+def _apply_deltas(entries: dict[tuple, float], path: str, sequence: int) -> None:
+    """Apply the delta files of a Q-table file written after a sequence number."""
+    for number, delta in delta_paths(path):
+        if number <= sequence:
+            continue
+        try:
+            records = np.load(delta, allow_pickle=False)
+        except (OSError, ValueError) as error:
+            raise QTableFileError(f"cannot read Q-table delta {delta}: {error}") from error
+        for key, value in zip(records["key"].tolist(), records["value"].tolist()):
+            if np.isnan(value):
+                entries.pop(decode_key(key), None)
+            else:
+                entries[decode_key(key)] = value
+
+
+def _write_atomically(path: str, write: Callable[[BinaryIO], Any]) -> None:
+    """Write a file through a temporary file renamed over it once complete."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+class MappedQTable(Mapping):
+    """
+    Read-only Q-table over the sorted records of a Q-table file.
+
+    A value is found by binary search on the encoded keys, so nothing is decoded or copied up
+    front and a memory-mapped file is only paged in where it is read. Missing keys raise KeyError;
+    use get(key, 0.0) for the defaultdict behaviour of the tables agents learn with.
+    """
+
+    def __init__(self, records: np.ndarray) -> None:
+        """
+        Wrap loaded records.
+
+        Args:
+            records (np.ndarray): The sorted (key, value) records.
+        """
+        self.__keys = records["key"]
+        self.__values = records["value"]
+
+    def __getitem__(self, key: tuple) -> float:
+        encoded = encode_key(key)
+        i = int(np.searchsorted(self.__keys, encoded))
+        if i == len(self.__keys) or self.__keys[i] != encoded:
+            raise KeyError(key)
+        return float(self.__values[i])
+
+    def __iter__(self) -> Iterator[tuple]:
+        for encoded in self.__keys:
+            yield decode_key(encoded)
+
+    def __len__(self) -> int:
+        return len(self.__keys)
+
+    def items(self) -> Iterator[tuple[tuple, float]]:
+        """Return the entries in key order without a search per entry."""
+        return zip(iter(self), self.__values.tolist())
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import pickle
+from collections import defaultdict
+from typing import Any, BinaryIO
+
+
+class LegacyObject:
+    """Stand-in for model objects found in Q-tables pickled before actions had keys."""
+
+    def __init__(self, *args: Any) -> None:
+        """Keep constructor arguments of objects pickled by value, such as enum members."""
+        self.args = args
+
+    def __setstate__(self, state: Any) -> None:
+        """Keep the pickled attributes, whatever the original class was."""
+        if isinstance(state, tuple):
+            state = {k: v for part in state if isinstance(part, dict) for k, v in part.items()}
+        self.__dict__.update(state or {})
+
+
+class LegacyUnpickler(pickle.Unpickler):
+    """Unpickler that loads model classes as LegacyObject instances instead of importing them."""
+
+    __stand_ins: dict[tuple[str, str], type] = {}
+
+    def find_class(self, module: str, name: str) -> Any:
+        if module.startswith("model."):
+            key = (module, name)
+            if key not in self.__stand_ins:
+                self.__stand_ins[key] = type(name, (LegacyObject,), {})
+            return self.__stand_ins[key]
+        return super().find_class(module, name)
+
+
+def legacy_action_key(action: LegacyObject) -> tuple:
+    """
+    Converts a pickled Action object into the agent-relative key used by Action.key().
+
+    Args:
+        action (LegacyObject): The loaded action.
+
+    Returns:
+        tuple: The action key.
+    """
+    name = type(action).__name__
+    if name == "Move" and action.__dict__.get("_Move__move_franklin", False):
+        name = "EscortMove"
+
+    target = action.__dict__.get("_location")
+    agent = action.__dict__.get("_agent")
+    origin = agent.__dict__.get("_location") if agent is not None else None
+    if target is None or origin is None:
+        return (name, 0, 0)
+
+    n = target.__dict__.get("_world_size")
+    dx = (target.__dict__["_Location__x"] - origin.__dict__["_Location__x"]) % n
+    dy = (target.__dict__["_Location__y"] - origin.__dict__["_Location__y"]) % n
+    return (name, dx - n if dx > n // 2 else dx, dy - n if dy > n // 2 else dy)
+
+
+def load_q_table(file: BinaryIO) -> defaultdict:
+    """
+    Loads a pickled Q-table, converting keys that still hold Action objects.
+
+    Entries of old tables were keyed by action identity, so several of them collapse onto
+    the same key; their values are averaged.
+
+    Args:
+        file (BinaryIO): The open pickle file.
+
+    Returns:
+        defaultdict: The Q-table keyed by (state, action key).
+    """
+    table = LegacyUnpickler(file).load()
+
+    if not any(isinstance(key[1], LegacyObject) for key in table):
+        return table
+
+    sums = defaultdict(float)
+    counts = defaultdict(int)
+    for (state, action), value in table.items():
+        key = (state, legacy_action_key(action) if isinstance(action, LegacyObject) else action)
+        sums[key] += value
+        counts[key] += 1
+
+    return defaultdict(float, {key: sums[key] / counts[key] for key in sums})
@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+
+from abc import ABC, abstractmethod
+from typing import Mapping, Optional
+
+from controller.config.config import Config
+from controller.config.learning_config import LearningConfig
+from model.agents.q_table_file import (QTableFileError, decode_key, delta_paths, encode_key, load_entries,
+                                       load_q_table_file, manifest_path, read_sequence, save_delta, save_q_table,
+                                       table_path)
+from model.agents.q_table_legacy import load_q_table
+
+
+logger = logging.getLogger(__name__)
+
+
+STORAGES = ("memory", "directory", "sqlite")
+
+# name of the database of the SQLite storage, in the Q-table directory
+SQLITE_FILE = "q_tables.sqlite3"
+
+
+class QTableStorage(ABC):
+    """
+    Where the Q-tables of the agent classes are kept between runs.
+
+    Tables are identified by name, the table name of the agent class. A table can be replaced
+    as a whole or updated with the entries changed since the last checkpoint, where a NaN value
+    deletes an entry. Storages may be written from a background thread while they are read.
+    """
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        """
+        Checks whether a table has been stored.
+
+        Args:
+            name (str): The table name.
+
+        Returns:
+            bool: True if the table exists.
+        """
+
+    @abstractmethod
+    def load(self, name: str) -> Mapping[tuple, float]:
+        """
+        Reads a table.
+
+        Args:
+            name (str): The table name.
+
+        Returns:
+            Mapping[tuple, float]: The Q-values keyed by (state, action key), empty if the table does not exist.
+        """
+
+    @abstractmethod
+    def save(self, name: str, entries: Mapping[tuple, float]) -> None:
+        """
+        Replaces a table.
+
+        Args:
+            name (str): The table name.
+            entries (Mapping[tuple, float]): The Q-values keyed by (state, action key).
+        """
+
+    @abstractmethod
+    def write_changes(self, name: str, changes: Mapping[tuple, float]) -> None:
+        """
+        Updates the entries of a table changed since the last checkpoint.
+
+        Args:
+            name (str): The table name.
+            changes (Mapping[tuple, float]): The changed Q-values keyed by (state, action key), NaN for deleted entries.
+        """
+
+    def checkpoint(self, name: str, changes: Mapping[tuple, float], full: bool = False) -> None:
+        """
+        Writes a checkpoint taken with QTable.take_changes().
+
+        Args:
+            name (str): The table name.
+            changes (Mapping[tuple, float]): The changed Q-values, NaN for deleted entries.
+            full (bool): Whether the changes are the whole table.
+        """
+        if full:
+            self.save(name, {key: value for key, value in changes.items() if not math.isnan(value)})
+        elif changes:
+            self.write_changes(name, changes)
+
+    def view(self, name: str) -> Mapping[tuple, float]:
+        """
+        Reads a table that will not be changed, such as one compiled into a greedy policy.
+
+        Args:
+            name (str): The table name.
+
+        Returns:
+            Mapping[tuple, float]: The Q-values, empty if the table does not exist.
+        """
+        return self.load(name)
+
+
+class MemoryStorage(QTableStorage):
+    """Keeps the tables in memory for the lifetime of the process, so nothing touches the disk."""
+
+    def __init__(self) -> None:
+        self.__tables: dict[str, dict[tuple, float]] = {}
+        self.__lock = threading.Lock()
+
+    def exists(self, name: str) -> bool:
+        return name in self.__tables
+
+    def load(self, name: str) -> Mapping[tuple, float]:
+        with self.__lock:
+            return dict(self.__tables.get(name, {}))
+
+    def save(self, name: str, entries: Mapping[tuple, float]) -> None:
+        with self.__lock:
+            self.__tables[name] = dict(entries)
+
+    def write_changes(self, name: str, changes: Mapping[tuple, float]) -> None:
+        with self.__lock:
+            table = self.__tables.setdefault(name, {})
+            for key, value in changes.items():
+                if math.isnan(value):
+                    table.pop(key, None)
+                else:
+                    table[key] = value
+
+
+class DirectoryStorage(QTableStorage):
+    """
+    Keeps each table as a Q-table file in a directory.
+
+    Changes are appended as delta files, which are folded back into the table file every
+    `compact_every` deltas. A table pickled by an older version is read when the table has no
+    file yet, and becomes one at its first checkpoint. A table whose files cannot be read is
+    moved aside with a warning and starts again empty, so training can always restart.
+    """
+
+    def __init__(self, directory: str, compact_every: int = 10) -> None:
+        """
+        Use a directory.
+
+        Args:
+            directory (str): The directory of the tables.
+            compact_every (int): The number of delta files of a table before they are folded into it.
+        """
+        self.__directory = directory
+        self.__compact_every = max(1, compact_every)
+        # last delta sequence number and number of deltas since the last rewrite, by table name
+        self.__sequences: dict[str, int] = {}
+        self.__pending: dict[str, int] = {}
+        self.__lock = threading.RLock()
+
+    def path(self, name: str) -> str:
+        """
+        Get the path of the file of a table.
+
+        Args:
+            name (str): The table name.
+
+        Returns:
+            str: The path of the .qtable.npy file.
+        """
+        return table_path(self.__directory, name)
+
+    def legacy_path(self, name: str) -> str:
+        """
+        Get the path of the pickle of a table written by an older version.
+
+        Args:
+            name (str): The table name.
+
+        Returns:
+            str: The path of the .pkl file.
+        """
+        return os.path.join(self.__directory, f"{name}.pkl")
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self.path(name)) or os.path.exists(self.legacy_path(name))
+
+    def load(self, name: str) -> Mapping[tuple, float]:
+        return self.__read(name, set_aside=True)
+
+    def view(self, name: str) -> Mapping[tuple, float]:
+        # a table only viewed, as by an evaluation, is left on disk as it is even when unreadable
+        return self.__read(name, set_aside=False)
+
+    def save(self, name: str, entries: Mapping[tuple, float]) -> None:
+        with self.__lock:
+            save_q_table(self.path(name), entries)
+            self.__sequences.pop(name, None)
+
+    def write_changes(self, name: str, changes: Mapping[tuple, float]) -> None:
+        with self.__lock:
+            path = self.path(name)
+            if not os.path.exists(path):
+                # the first checkpoint of a table holds every entry learned so far
+                entries = dict(self.load(name))
+                entries.update(changes)
+                self.save(name, {key: value for key, value in entries.items() if not math.isnan(value)})
+                return
+
+            if name not in self.__sequences:
+                sequence, deltas = read_sequence(path), [number for number, _ in delta_paths(path)]
+                self.__sequences[name] = max([sequence] + deltas)
+                self.__pending[name] = sum(number > sequence for number in deltas)
+
+            self.__sequences[name] += 1
+            save_delta(path, changes, self.__sequences[name])
+            self.__pending[name] += 1
+
+            if self.__pending[name] >= self.__compact_every:
+                try:
+                    entries = load_entries(path)
+                except QTableFileError as error:
+                    # the deltas stay on disk, the next load sets the table aside
+                    logger.warning("Not compacting the Q-table %s: %s", name, error)
+                    return
+                save_q_table(path, entries, self.__sequences[name])
+                self.__pending[name] = 0
+
+    def __read(self, name: str, set_aside: bool) -> Mapping[tuple, float]:
+        """Read a table from its file, or from the pickle of an older version."""
+        with self.__lock:
+            if os.path.exists(self.path(name)):
+                try:
+                    return load_q_table_file(self.path(name))
+                except QTableFileError as error:
+                    logger.warning("Cannot read the Q-table %s, starting it empty: %s", name, error)
+                    if set_aside:
+                        self.__set_aside(name)
+                    return {}
+            if os.path.exists(self.legacy_path(name)):
+                with open(self.legacy_path(name), "rb") as f:
+                    return load_q_table(f)
+            return {}
+
+    def __set_aside(self, name: str) -> None:
+        """Rename the files of an unreadable table to .corrupt, so its next checkpoint starts a new one."""
+        path = self.path(name)
+        for damaged in [path, manifest_path(path)] + [delta for _, delta in delta_paths(path)]:
+            if os.path.exists(damaged):
+                os.replace(damaged, damaged + ".corrupt")
+        self.__sequences.pop(name, None)
+        self.__pending.pop(name, None)
+
+
+class SQLiteStorage(QTableStorage):
+    """
+    Keeps the tables in one SQLite database, which several processes can read and write at once.
+
+    The database runs in write-ahead-log mode, so readers never block the writer, and writers
+    wait for each other instead of failing. A checkpoint is one transaction of batched upserts,
+    so the other processes see either all of its changes or none. Each process and thread opens
+    its own connection.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0) -> None:
+        """
+        Use a database, creating it if needed.
+
+        Args:
+            path (str): The path of the database file.
+            timeout (float): The most seconds a write waits for another process's write.
+        """
+        self.__path = path
+        self.__timeout = timeout
+        self.__local = threading.local()
+
+        with self.__connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS q_values ("
+                               "q_table TEXT NOT NULL, key TEXT NOT NULL, value REAL NOT NULL, "
+                               "PRIMARY KEY (q_table, key)) WITHOUT ROWID")
+
+    def exists(self, name: str) -> bool:
+        row = self.__connection().execute("SELECT 1 FROM q_values WHERE q_table = ? LIMIT 1", (name,)).fetchone()
+        return row is not None
+
+    def load(self, name: str) -> Mapping[tuple, float]:
+        rows = self.__connection().execute("SELECT key, value FROM q_values WHERE q_table = ?", (name,))
+        return {decode_key(key): value for key, value in rows}
+
+    def save(self, name: str, entries: Mapping[tuple, float]) -> None:
+        with self.__transaction() as connection:
+            connection.execute("DELETE FROM q_values WHERE q_table = ?", (name,))
+            connection.executemany("INSERT INTO q_values (q_table, key, value) VALUES (?, ?, ?)",
+                                   ((name, encode_key(key).decode(), float(value)) for key, value in entries.items()))
+
+    def write_changes(self, name: str, changes: Mapping[tuple, float]) -> None:
+        written = [(name, encode_key(key).decode(), float(value)) for key, value in changes.items() if not math.isnan(value)]
+        deleted = [(name, encode_key(key).decode()) for key, value in changes.items() if math.isnan(value)]
+        with self.__transaction() as connection:
+            connection.executemany("INSERT INTO q_values (q_table, key, value) VALUES (?, ?, ?) "
+                                   "ON CONFLICT (q_table, key) DO UPDATE SET value = excluded.value", written)
+            connection.executemany("DELETE FROM q_values WHERE q_table = ? AND key = ?", deleted)
+
+    def __connection(self) -> sqlite3.Connection:
+        """Return the connection of the calling thread, opening it in a forked process as well."""
+        if getattr(self.__local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(self.__path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.__path, timeout=self.__timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self.__local.connection = connection
+            self.__local.pid = os.getpid()
+        return self.__local.connection
+
+    def __transaction(self) -> _Transaction:
+        """Return a context running its block in one write transaction."""
+        return _Transaction(self.__connection())
+
+
+class _Transaction:
+    """Write transaction taking the database lock up front, so it never fails halfway on a busy database."""
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.__connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.__connection.execute("BEGIN IMMEDIATE")
+        return self.__connection
+
+    def __exit__(self, error_type: Optional[type], *_) -> None:
+        self.__connection.execute("COMMIT" if error_type is None else "ROLLBACK")
+
+
+_storages: dict[tuple[str, str], QTableStorage] = {}
+
+
+def get_storage(kind: Optional[str] = None, directory: Optional[str] = None) -> QTableStorage:
+    """
+    Returns the Q-table storage of the process, one per kind and directory.
+
+    Args:
+        kind (Optional[str]): "memory", "directory" or "sqlite", Config.q_table_storage by default.
+        directory (Optional[str]): The Q-table directory, Config.q_table_dir by default.
+
+    Returns:
+        QTableStorage: The storage.
+    """
+    kind = kind or Config.q_table_storage
+    directory = directory or Config.q_table_dir
+    key = (kind, os.path.abspath(directory))
+    if key not in _storages:
+        if kind == "memory":
+            _storages[key] = MemoryStorage()
+        elif kind == "directory":
+            _storages[key] = DirectoryStorage(directory, LearningConfig.checkpoint_compact_every)
+        elif kind == "sqlite":
+            _storages[key] = SQLiteStorage(os.path.join(directory, SQLITE_FILE))
+        else:
+            raise ValueError(f"unknown Q-table storage {kind!r}, expected one of {', '.join(STORAGES)}")
+    return _storages[key]
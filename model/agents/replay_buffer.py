@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Fixed-size ring buffer of transitions.
+
+    Transitions are stored as state and action ids of a QTable in preallocated arrays, so adding
+    one never allocates and a batch is sampled with a single fancy-indexing operation. Once the
+    buffer is full, each new transition overwrites the oldest one.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Allocate the buffer.
+
+        Args:
+            capacity (int): The number of transitions kept.
+        """
+        self.__states = np.zeros(capacity, dtype=np.int32)
+        self.__actions = np.zeros(capacity, dtype=np.int32)
+        self.__rewards = np.zeros(capacity)
+        self.__next_states = np.zeros(capacity, dtype=np.int32)
+        self.__dones = np.zeros(capacity, dtype=bool)
+        self.__heads = np.zeros(capacity, dtype=np.int16)
+        self.__capacity = capacity
+        self.__cursor = 0
+        self.__size = 0
+        self.__added = 0
+
+    def add(self, state: int, action: int, reward: float, next_state: int, done: bool, head: int = 0) -> None:
+        """
+        Stores a transition.
+
+        Args:
+            state (int): The id of the state the action was taken in.
+            action (int): The id of the action.
+            reward (float): The reward received.
+            next_state (int): The id of the state reached.
+            done (bool): Whether the transition ended the episode.
+            head (int): The QTable head of the acting class.
+        """
+        i = self.__cursor
+        self.__states[i] = state
+        self.__actions[i] = action
+        self.__rewards[i] = reward
+        self.__next_states[i] = next_state
+        self.__dones[i] = done
+        self.__heads[i] = head
+
+        self.__cursor = (i + 1) % self.__capacity
+        self.__size = min(self.__size + 1, self.__capacity)
+        self.__added += 1
+
+    def sample(self, batch_size: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Draws transitions uniformly, with replacement.
+
+        Args:
+            batch_size (int): The number of transitions drawn.
+
+        Returns:
+            tuple: The states, actions, rewards, next states, done flags and heads of the batch.
+        """
+        if self.__size == 0:
+            raise ValueError("cannot sample from an empty replay buffer")
+
+        i = np.random.randint(0, self.__size, batch_size)
+        return (self.__states[i], self.__actions[i], self.__rewards[i], self.__next_states[i], self.__dones[i],
+                self.__heads[i])
+
+    def get_added(self) -> int:
+        """
+        Get the number of transitions added since the buffer was created.
+
+        Returns:
+            int: The number of transitions, including overwritten ones.
+        """
+        return self.__added
+
+    def __len__(self) -> int:
+        """Return the number of transitions held."""
+        return self.__size
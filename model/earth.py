@@ -1,31 +1,95 @@
 from __future__ import annotations
 
+import logging
+import weakref
+
 from collections import Counter
-from typing import Optional, TYPE_CHECKING
+from typing import Optional, Sequence, TYPE_CHECKING
 from enum import Enum
 
+import numpy as np
+
 from controller.config.config import Config
-from controller.config.silver_surfer_config import SilverSurferConfig
 from controller.config.bridge_config import BridgeConfig
 
 from model.actions.move import Move
 from model.actions.attack import Attack
 from model.actions.protect import Protect
+from model.actions.repair import Repair
 
 from model.environment import Environment
 from model.location import Location
+from model.navigation import Navigation
+from model.occupancy import Occupancy
+from model.scheduler import TimerWheel
+from model.state_encoder import StateEncoder
+from model.zobrist import ZobristHash
 from model.agents.agent import Agent, AgentRole
+from model.agents.agent_table import AgentTable
 from model.agents.franklin import Franklin
 
 if TYPE_CHECKING:
     from model.agents.agent import Agent
     from model.actions.action import Action
 
+
+logger = logging.getLogger(__name__)
+
+
 class FightStatus(Enum):
     """Enum representing the status of the Earth environment."""
     WON = 1
     LOST = 0
     RUNNING = -1
+    # ended by the simulator before either side won, at the step cap or when the episode stalled
+    TRUNCATED = 2
+
+class EarthSnapshot:
+    """
+    Compact copy of the state of an Earth, taken by Earth.snapshot() and applied by Earth.restore().
+
+    The grid rows are kept as tuples and the agent columns as arrays, so a snapshot can be
+    restored any number of times and never changes once taken. It refers to the agents
+    themselves, which therefore keep their table rows while the snapshot exists.
+    """
+
+    __slots__ = ("grid", "status", "agents", "rows", "health", "locations", "navigation", "occupancy", "encoder",
+                 "scheduler", "actions", "zobrist")
+
+    def __init__(self, grid: tuple[tuple[Optional[Agent], ...], ...], status: FightStatus, agents: tuple[Agent, ...],
+                 rows: np.ndarray, health: np.ndarray, locations: tuple[Optional[tuple[int, int, int]], ...],
+                 navigation: tuple, occupancy: tuple, encoder: tuple, scheduler: tuple, actions: tuple = (),
+                 zobrist: tuple = (0, {})) -> None:
+        """
+        Initialise a snapshot.
+
+        Args:
+            grid (tuple): The occupant of every cell, by row.
+            status (FightStatus): The status of the fight.
+            agents (tuple[Agent, ...]): The agents placed on the grid or waiting to respawn.
+            rows (np.ndarray): The table row of each agent.
+            health (np.ndarray): The health of each agent.
+            locations (tuple): The (x, y, range) of each agent, None for agents off the grid.
+            navigation (tuple): The snapshot of the navigation service.
+            occupancy (tuple): The snapshot of the occupancy index.
+            encoder (tuple): The snapshot of the state encoder.
+            scheduler (tuple): The snapshot of the scheduler.
+            actions (tuple): The actions registered for the step in progress.
+            zobrist (tuple): The snapshot of the state hash.
+        """
+        self.grid = grid
+        self.status = status
+        self.agents = agents
+        self.rows = rows
+        self.health = health
+        self.locations = locations
+        self.navigation = navigation
+        self.occupancy = occupancy
+        self.encoder = encoder
+        self.scheduler = scheduler
+        self.actions = actions
+        self.zobrist = zobrist
+
 
 class Earth(Environment):
     """Concrete implementation of the Environment class representing the Earth."""
@@ -43,11 +107,19 @@ class Earth(Environment):
 
         self.__action_buffer = []
         self.__status = FightStatus.RUNNING
+        self.__navigation = Navigation(self.get_width(), self.get_height())
+        self.__occupancy = Occupancy(self.get_width(), self.get_height())
+        self.__encoder = StateEncoder()
 
-        # for silver surfer respawn
-        self.__ss_timer = 0
-        self.__ss_flag = True
-        self.__ss_agent = None
+        # delayed spawns, respawns and timed effects, advanced once per step
+        self.__scheduler = TimerWheel()
+
+        # hash of the occupants and their health, kept up to date by set_agent and the health watchers
+        self.__zobrist = ZobristHash(self.get_width(), self.get_height())
+        self.__watched_tables: weakref.WeakSet[AgentTable] = weakref.WeakSet()
+
+        # every agent placed since the last restore, by id, so restore() can take the newcomers off the table
+        self.__entered: weakref.WeakValueDictionary[int, Agent] = weakref.WeakValueDictionary()
 
 
     def __str__(self):
@@ -74,15 +146,193 @@ class Earth(Environment):
 
         self.__action_buffer = []
         self.__status = FightStatus.RUNNING
+        self.__navigation.clear()
+        self.__occupancy.clear()
+        self.__encoder.clear()
+        self.__scheduler.clear()
+        self.__zobrist.clear()
+
+    def snapshot(self) -> EarthSnapshot:
+        """
+        Captures the grid, the health and positions of the agents, the pending events, the
+        actions registered so far and the status, so that restore() can later put them back
+        without rebuilding any agent.
 
-        # for silver surfer respawn
-        self.__ss_timer = 0
-        self.__ss_flag = True
-        self.__ss_agent = None
+        Returns:
+            EarthSnapshot: The snapshot.
+        """
+        # agents placed on the grid, including those whose cell another agent has since stepped onto
+        known = dict(self.__entered.items())
+        known.update((id(agent), agent) for row in self.__grid for agent in row if agent is not None)
+        scheduler = self.__scheduler.snapshot()
+        for _, _, args in scheduler[1]:
+            known.update((id(arg), arg) for arg in args if isinstance(arg, Agent))
+        agents = tuple(known.values())
+
+        rows = np.fromiter((agent.get_row() for agent in agents), dtype=np.intp, count=len(agents))
+        health = agents[0].get_table().health[rows] if agents else np.empty(0)
+        locations = tuple(None if agent.get_location() is None else
+                          (agent.get_location().get_x(), agent.get_location().get_y(), agent.get_location().get_range())
+                          for agent in agents)
+
+        return EarthSnapshot(tuple(tuple(row) for row in self.__grid), self.__status, agents, rows, health, locations,
+                             self.__navigation.snapshot(), self.__occupancy.snapshot(), self.__encoder.snapshot(),
+                             scheduler, tuple(self.__action_buffer), self.__zobrist.snapshot())
+
+    def restore(self, snapshot: EarthSnapshot) -> None:
+        """
+        Puts the Earth and the agents of a snapshot back in the state it captured.
+
+        Agents that entered the grid after the snapshot are dropped from it and marked as off the
+        grid in their table, and the actions buffered since are replaced by those registered when
+        it was taken.
+
+        Args:
+            snapshot (EarthSnapshot): A snapshot taken by snapshot() on this Earth.
+        """
+        self.__grid = [list(row) for row in snapshot.grid]
+        self.__status = snapshot.status
+        self.__action_buffer = list(snapshot.actions)
+
+        kept = {id(agent) for agent in snapshot.agents}
+        for key, agent in list(self.__entered.items()):
+            if key not in kept:
+                agent.set_location(None)
+        self.__entered = weakref.WeakValueDictionary((id(agent), agent) for agent in snapshot.agents)
+
+        for agent, location in zip(snapshot.agents, snapshot.locations):
+            agent.set_location(None if location is None else Location(*location))
+        if snapshot.agents:
+            snapshot.agents[0].get_table().health[snapshot.rows] = snapshot.health
+
+        self.__navigation.restore(snapshot.navigation)
+        self.__occupancy.restore(snapshot.occupancy)
+        self.__encoder.restore(snapshot.encoder)
+        self.__scheduler.restore(snapshot.scheduler)
+        self.__zobrist.restore(snapshot.zobrist)
 
     def get_status(self) -> FightStatus: 
         return self.__status
 
+    def truncate(self) -> None:
+        """Ends a running fight without a winner."""
+        if self.__status is FightStatus.RUNNING:
+            self.__status = FightStatus.TRUNCATED
+
+    def get_bridge_health(self) -> tuple[float, ...]:
+        """
+        Returns the health of the bridges on the grid, which only changes when one is attacked,
+        repaired or destroyed.
+
+        Returns:
+            tuple[float, ...]: The health of each bridge, in grid order.
+        """
+        return tuple(agent._health for row in self.__grid for agent in row
+                     if agent is not None and agent.get_agent_role() == AgentRole.BRIDGE)
+
+    def state_hash(self) -> int:
+        """
+        Returns the Zobrist hash of the state of the Earth: the class of the occupant of every
+        cell and its health, bucketed into HEALTH_BUCKETS levels. It is kept up to date as agents
+        move and their health changes, so reading it is O(1), and equal states hash equally in
+        every process.
+
+        Returns:
+            int: The unsigned 64-bit hash.
+        """
+        return self.__zobrist.value()
+
+    def get_navigation(self) -> Navigation:
+        """
+        Returns the navigation service holding the cached flow fields of this environment.
+
+        Returns:
+            Navigation: The navigation service kept in sync with the grid.
+        """
+        return self.__navigation
+
+    def get_scheduler(self) -> TimerWheel:
+        """
+        Returns the scheduler of timed events, which ticks once at the end of every step.
+
+        Returns:
+            TimerWheel: The event scheduler of this environment.
+        """
+        return self.__scheduler
+
+    def is_free(self, location: Location) -> bool:
+        """
+        Returns whether no agent stands at a location.
+
+        Args:
+            location (Location): The location to check, wrapped around the grid edges.
+
+        Returns:
+            bool: True if the cell is empty.
+        """
+        return self.__occupancy.is_free(location.get_x(), location.get_y())
+
+    def is_free_cell(self, x: int, y: int) -> bool:
+        """
+        Returns whether no agent stands at a cell, answered from the occupancy index.
+
+        Args:
+            x (int): The x-coordinate of the cell, wrapped around the grid edges.
+            y (int): The y-coordinate of the cell, wrapped around the grid edges.
+
+        Returns:
+            bool: True if the cell is empty.
+        """
+        return self.__occupancy.is_free(x, y)
+
+    def random_free_location(self) -> Optional[Location]:
+        """
+        Returns a uniformly chosen empty location.
+
+        Returns:
+            Optional[Location]: An empty location, or None if the grid is full.
+        """
+        cell = self.__occupancy.random_free_cell()
+        return Location(*cell) if cell is not None else None
+
+    def find_empty_region(self, r: int = 0, randomise: bool = False) -> Optional[Location]:
+        """
+        Finds an empty (2r+1)x(2r+1) region using the summed-area table of the occupancy.
+
+        Args:
+            r (int): Radius of the region around its centre.
+            randomise (bool): Pick a random empty region instead of the first one in row-major order.
+
+        Returns:
+            Optional[Location]: The centre of the region with range r, or None if there is no space.
+        """
+        centre = self.__occupancy.find_empty_region(r, randomise)
+        return Location(centre[0], centre[1], r) if centre is not None else None
+
+    def get_states(self, agents: Sequence[Agent]) -> list[tuple]:
+        """
+        Returns the discrete states of several agents, encoded together in one pass.
+
+        Args:
+            agents (Sequence[Agent]): The agents, all declaring a state_target_role.
+
+        Returns:
+            list[tuple]: The (region, bridge distance, bridge health, target distance) state of each agent.
+        """
+        return [tuple(state) for state in self.encode_states(agents).tolist()]
+
+    def encode_states(self, agents: Sequence[Agent]) -> np.ndarray:
+        """
+        Returns the discrete states of several agents as an integer array.
+
+        Args:
+            agents (Sequence[Agent]): The agents, all declaring a state_target_role.
+
+        Returns:
+            np.ndarray: A (len(agents), 4) array, one state per row.
+        """
+        return self.__encoder.encode(agents)
+
     def get_agent(self, location: Location) -> Optional[Agent]:
         """
         Returns the agent at a given location, or None if location is None.
@@ -137,26 +387,45 @@ class Earth(Environment):
             agent (Agent): The agent to be placed.
             location (Location): The location where the agent should be placed.
         """
+        if agent is not None:
+            self.__entered[id(agent)] = agent
+            if agent.get_table() not in self.__watched_tables:
+                agent.get_table().watch_health(self.__on_health_changed)
+                self.__watched_tables.add(agent.get_table())
+
         if location and location.get_range() == 0:
             wrapped_x = location.get_x() % Config.world_size
             wrapped_y = location.get_y() % Config.world_size
+            self.__zobrist.update_cell(wrapped_y * self.get_width() + wrapped_x, self.__grid[wrapped_y][wrapped_x], agent)
+            self.__encoder.update_cell(self.__grid[wrapped_y][wrapped_x], agent)
             self.__grid[wrapped_y][wrapped_x] = agent
+            self.__navigation.update_cell(wrapped_x, wrapped_y, agent)
+            self.__occupancy.set_occupied(wrapped_x, wrapped_y, agent is not None)
         
         elif location and location.get_range() > 0:
             points = location.get_points()
             for point in points:
+                self.__zobrist.update_cell(point.get_y() * self.get_width() + point.get_x(),
+                                           self.__grid[point.get_y()][point.get_x()], agent)
+                self.__encoder.update_cell(self.__grid[point.get_y()][point.get_x()], agent)
                 self.__grid[point.get_y()][point.get_x()] = agent
+                self.__navigation.update_cell(point.get_x(), point.get_y(), agent)
+                self.__occupancy.set_occupied(point.get_x(), point.get_y(), agent is not None)
 
     
-    def set_ss_flag(self, flag: bool, location: Location) -> None:
+    def __on_health_changed(self, table: AgentTable, rows) -> None:
+        """Rehash the cells of the agents whose health changed."""
+        self.__zobrist.update_health(table, rows)
+
+    def schedule_respawn(self, agent: Agent, steps: int) -> None:
         """
-        Sets the flag indicating whether the Silver Surfer is currently in the environment.
+        Schedules an agent that left the grid to come back at a random empty location.
 
         Args:
-            flag (bool): True if Silver Surfer is present, False otherwise.
+            agent (Agent): The agent to respawn.
+            steps (int): Number of steps the agent sits out after the current one.
         """
-        self.__ss_flag = flag
-        self.__ss_agent = self.get_agent(location)
+        self.__scheduler.schedule(steps + 1, self.__respawn, agent)
 
 
     def register_action(self, action: Action) -> None:
@@ -167,33 +436,87 @@ class Earth(Environment):
             self.__action_buffer.append(action)
 
     
-    def __silver_surfer_respawn(self) -> None:
-
-        import random
-
-        # Silver Surfer respawn logic
-        if self.__ss_flag == False :
-            if self.__ss_timer == SilverSurferConfig.ss_respawn_time :
-                self.__ss_flag = True
-                self.__ss_timer = 0
-
-                # respawn silver surfer
-                while True:
-                    x = random.randint(0, Config.world_size - 1)
-                    y = random.randint(0, Config.world_size - 1)
-                    location = Location(x, y)
-
-                    if self.get_agent(location) is None:
-                        self.__ss_agent.set_location(location)
-                        self.set_agent(self.__ss_agent, location)
-                        break
-            
-            else:
-                self.__ss_timer += 1
+    def __respawn(self, agent: Agent) -> None:
+        """Places a respawning agent at a random empty location, or retries on the next step if the grid is full."""
+        location = self.random_free_location()
+
+        if location is None:
+            self.__scheduler.schedule(1, self.__respawn, agent)
+            return
+
+        agent.set_location(location)
+        self.set_agent(agent, location)
     
-    def execute_actions(self) -> None:
+    def __resolve_health_actions(self, actions: list[Action]) -> tuple[float, float]:
+        """
+        Applies the health changes of attacks and repairs in one scatter-add over the agent table.
+
+        Every change is computed from the grid as it stands after the moves and from the attack
+        profiles of the agent classes, then added to the health column and clipped to [0, 1]. An
+        agent both attacked and repaired has its changes applied in buffer order, each clipped, so
+        a repair up to full health is not undone by a later hit.
+
+        Args:
+            actions (list[Action]): The attacks not blocked by a protect action and the repairs, in buffer order.
+
+        Returns:
+            tuple[float, float]: The hero and villain rewards earned by these actions.
+        """
+        if not actions:
+            return 0, 0
+
+        table = actions[0].get_agent().get_table()
+        attacks = [action for action in actions if type(action) == Attack]
+        repairs = [action for action in actions if type(action) == Repair]
+        attack_order = np.array([i for i, action in enumerate(actions) if type(action) == Attack], dtype=np.intp)
+        repair_order = np.array([i for i, action in enumerate(actions) if type(action) == Repair], dtype=np.intp)
+
+        # attacks: damage to the target, health spent by the attacker
+        attackers = np.array([action.get_agent().get_row() for action in attacks], dtype=np.intp)
+        targets = [self.get_agent(action.get_location()) for action in attacks]
+        target_rows = np.array([-1 if target is None else target.get_row() for target in targets], dtype=np.intp)
+        ranged = np.array([action.is_ranged() for action in attacks], dtype=bool)
+
+        attacker_classes = table.class_id[attackers]
+        hit = target_rows >= 0
+        damage = table.attack_power[attacker_classes[hit]] * table.damage_taken[table.class_id[target_rows[hit]]]
+        cost = table.attack_cost[attacker_classes] + np.where(ranged, table.ranged_cost[attacker_classes], 0.0)
+
+        # repairs: health restored to the target
+        repaired = [self.get_agent(action.get_location()) for action in repairs]
+        repairers = np.array([action.get_agent().get_row() for action, target in zip(repairs, repaired) if target is not None], dtype=np.intp)
+        repaired_rows = np.array([target.get_row() for target in repaired if target is not None], dtype=np.intp)
+        restored = np.nan_to_num(table.param_column("repair_rate", repairers))
+        repair_order = repair_order[[target is not None for target in repaired]]
+
+        # a stable sort on the position of each change's action keeps the buffer order
+        order = np.argsort(np.concatenate([attack_order, attack_order[hit], repair_order]), kind="stable")
+        table.apply_health(
+            np.concatenate([attackers, target_rows[hit], repaired_rows])[order],
+            np.concatenate([-cost, -damage, restored])[order],
+        )
+
+        h_reward = 0
+        v_reward = 0
+        for target in targets:
+            if target is None:
+                continue
+            if target.get_agent_role() is AgentRole.VILLAIN: h_reward += 3
+            else: v_reward += 3
+        h_reward += 10 * len(repaired_rows)
+
+        return h_reward, v_reward
+
+    def execute_actions(self, advance_events: bool = True) -> tuple[float, float]:
         """
         Executes all actions in the action buffer, ensuring that each move action is executed only once.
+
+        Args:
+            advance_events (bool): Advance the scheduler, firing the events due. Planners simulating
+                steps on a snapshot turn it off, since event callbacks reach outside the Earth.
+
+        Returns:
+            tuple[float, float]: The hero and villain rewards of the step.
         """
        
 
@@ -227,53 +550,69 @@ class Earth(Environment):
         # step2: execute an attack only if there is no protect action on the same location
         # step3: the protect action may contain location with range > 0
         # step4: if there are multiple protect actions on the same location, one is enough
-        # step5: execute all other actions (except move) as they are
+        # step5: resolve runs of consecutive surviving attacks and repairs together in one batch
+        # step6: execute all other actions (except move) as they are, in buffer order with the batches
+
+        protected = {(point.get_x(), point.get_y()) for protect in self.__action_buffer if type(protect) == Protect
+                     for point in protect.get_location().get_points()}
 
+        batch = []
         for action in self.__action_buffer:
-            if action is not None and type(action) == Attack:
-                if any(action.get_location() in protect.get_location().get_points() for protect in self.__action_buffer if type(protect) == Protect):
-                    continue
-                else:
-                    reward = action.execute(self)
-                    if reward > 0: h_reward += reward
-                    else: v_reward += reward * -1
-            
-
-            elif action is not None and type(action) != Move:
-                reward = action.execute(self)
-                if reward > 0: h_reward += reward
-                else: v_reward += reward * -1
+            if action is None or type(action) == Move:
+                continue
+            if type(action) == Attack:
+                if (action.get_location().get_x(), action.get_location().get_y()) not in protected:
+                    batch.append(action)
+                continue
+            if type(action) == Repair:
+                batch.append(action)
+                continue
+
+            # any other action sees the health changes of the attacks and repairs registered before it
+            reward = self.__resolve_health_actions(batch)
+            h_reward += reward[0]
+            v_reward += reward[1]
+            batch.clear()
+
+            reward = action.execute(self)
+            if reward > 0: h_reward += reward
+            else: v_reward += reward * -1
+
+        reward = self.__resolve_health_actions(batch)
+        h_reward += reward[0]
+        v_reward += reward[1]
         
 
 
         self.__action_buffer.clear()
     
-        self.__silver_surfer_respawn()
+        if advance_events:
+            self.__scheduler.advance()
         
         # Game win or lose logic
         # if all bridges have full health, the game is won
         bridge_agents = [agent for row in self.__grid for agent in row if agent is not None and agent.get_agent_role() == AgentRole.BRIDGE]
         if all(bridge._health >= 1.0 for bridge in bridge_agents) and len(bridge_agents) == BridgeConfig.num_of_bridges:
             self.__status = FightStatus.WON
-            print("Game Won! Completion of bridges")
+            logger.debug("Game Won! Completion of bridges")
             return (100 + h_reward, v_reward - 100)
         
         if len(bridge_agents) < BridgeConfig.num_of_bridges or any(bridge._health <= 0.0 for bridge in bridge_agents):
             self.__status = FightStatus.LOST
-            print("Game Lost! Due to lack of all bridges")
+            logger.debug("Game Lost! Due to lack of all bridges")
             return (h_reward - 100, v_reward + 100)
         
         hero_agents = [agent for row in self.__grid for agent in row if agent is not None and agent.get_agent_role() == AgentRole.HERO]
         if len(hero_agents) == 0:
             self.__status = FightStatus.LOST
-            print("Game Lost! All heroes are dead")
+            logger.debug("Game Lost! All heroes are dead")
             return (h_reward - 100, v_reward + 100)
     
 
         franklin_agents = [agent for row in self.__grid for agent in row if agent is not None and agent.__class__ == Franklin]
         if len(franklin_agents) == 0:
             self.__status = FightStatus.LOST
-            print("Game Lost! Galactus has found Franklin")
+            logger.debug("Game Lost! Galactus has found Franklin")
             return (h_reward - 100, v_reward + 100)
 
         return (h_reward, v_reward)
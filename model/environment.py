@@ -1,13 +1,13 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Optional, TYPE_CHECKING
+from typing import Optional, Sequence, TYPE_CHECKING
 
 from controller.config.config import Config
+from model.location import Location
 
 if TYPE_CHECKING:
     from model.agents.agent import Agent
-    from model.location import Location
 
 
 class Environment(ABC):
@@ -61,6 +61,42 @@ class Environment(ABC):
         """
         pass
 
+    def is_free_cell(self, x: int, y: int) -> bool:
+        """
+        Returns whether no agent stands at a cell.
+
+        Args:
+            x (int): The x-coordinate of the cell, wrapped around the grid edges.
+            y (int): The y-coordinate of the cell, wrapped around the grid edges.
+
+        Returns:
+            bool: True if the cell is empty.
+        """
+        return self.get_agent(Location(x % self.__width, y % self.__height)) is None
+
+    @abstractmethod
+    def get_states(self, agents: Sequence[Agent]) -> list[tuple]:
+        """
+        Returns the discrete states of several agents.
+
+        Args:
+            agents (Sequence[Agent]): The agents, all declaring a state_target_role.
+
+        Returns:
+            list[tuple]: The state of each agent.
+        """
+        pass
+
+    @abstractmethod
+    def state_hash(self) -> int:
+        """
+        Returns a hash of the state of the environment, equal for equal states.
+
+        Returns:
+            int: The hash.
+        """
+        pass
+
     def get_height(self) -> int:
         """
         Get the height of the environment.
@@ -3,6 +3,12 @@ import math
 from controller.config.config import Config
 
 
+# offsets of the eight cells around a location, in row-major order (indexed by FlowField.step)
+NEIGHBOUR_DELTAS = ((-1, -1), (0, -1), (1, -1),
+                    (-1, 0), (1, 0),
+                    (-1, 1), (0, 1), (1, 1))
+
+
 class Location:
     """Represents a location with integer x and y coordinates."""
 
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from model.agents.agent import AgentRole
+from model.location import Location, NEIGHBOUR_DELTAS
+
+if TYPE_CHECKING:
+    from model.agents.agent import Agent
+
+
+# roles whose cells can not be walked through (unless they are the target)
+BLOCKING_ROLES = frozenset({AgentRole.BRIDGE, AgentRole.HEADQUARTERS})
+
+EMPTY_CELL = -1
+UNREACHABLE = -1
+
+
+def shift(mask: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    """
+    Returns an array whose cell (y, x) holds the value of cell (y + dy, x + dx), wrapping around the edges.
+
+    Args:
+        mask (np.ndarray): The array to shift.
+        dx (int): Offset along the x axis.
+        dy (int): Offset along the y axis.
+
+    Returns:
+        np.ndarray: The shifted array.
+    """
+    return np.roll(mask, (-dy, -dx), axis=(0, 1))
+
+
+def dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Grows a boolean mask by a Chebyshev radius on the torus.
+
+    Args:
+        mask (np.ndarray): The mask to grow.
+        radius (int): The number of cells to grow by.
+
+    Returns:
+        np.ndarray: A mask that is True wherever a True cell of the input lies within the radius.
+    """
+    grown = mask.copy()
+    for d in range(1, radius + 1):
+        grown |= shift(mask, d, 0) | shift(mask, -d, 0)
+    mask = grown.copy()
+    for d in range(1, radius + 1):
+        grown |= shift(mask, 0, d) | shift(mask, 0, -d)
+    return grown
+
+
+class FlowField:
+    """Multi-source BFS distances and next steps toward a set of target roles."""
+
+    def __init__(self, targets: frozenset[AgentRole], radius: int, shape: tuple[int, int]) -> None:
+        """
+        Initialise an empty flow field.
+
+        Args:
+            targets (frozenset[AgentRole]): The roles the field leads to.
+            radius (int): Footprint radius of the agents using the field.
+            shape (tuple[int, int]): Grid shape as (height, width).
+        """
+        self.targets = targets
+        self.radius = radius
+        self.distance = np.full(shape, UNREACHABLE, dtype=np.int32)
+        self.step = np.full(shape, -1, dtype=np.int8)
+        self.sources = np.zeros(shape, dtype=bool)
+        self.passable = np.zeros(shape, dtype=bool)
+        self.built = False
+        self.stale = True
+
+    def is_relevant(self, role_value: int) -> bool:
+        """Return true if a cell holding the given role affects this field."""
+        if role_value == EMPTY_CELL:
+            return False
+        role = AgentRole(role_value)
+        return role in self.targets or role in BLOCKING_ROLES
+
+
+class Navigation:
+    """
+    Navigation service for an environment on a toroidal grid.
+
+    Keeps one cached flow field per (target roles, footprint radius) pair. Only structures
+    (bridges and headquarters) block movement; moving agents are left to the move conflict
+    resolution of the environment. Fields are refreshed lazily on the next query after a
+    relevant cell changed: new targets and freed cells are relaxed incrementally, while lost
+    targets and new obstacles trigger a full rebuild.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        """
+        Initialise the navigation service for a grid of the given size.
+
+        Args:
+            width (int): Width of the grid.
+            height (int): Height of the grid.
+        """
+        self.__width = width
+        self.__height = height
+        self.__roles = np.full((height, width), EMPTY_CELL, dtype=np.int8)
+        self.__fields: dict[tuple[frozenset[AgentRole], int], FlowField] = {}
+
+    def clear(self) -> None:
+        """Forgets all occupancy information and cached fields."""
+        self.__roles.fill(EMPTY_CELL)
+        self.__fields.clear()
+
+    def snapshot(self) -> tuple[np.ndarray, dict]:
+        """
+        Returns a copy of the occupancy and of the cached fields, for restore().
+
+        The masks and next steps of a field are replaced rather than changed when it is refreshed,
+        so the snapshot shares them with the field; only the distances are copied.
+
+        Returns:
+            tuple: The role of every cell and the state of every cached field by key.
+        """
+        fields = {key: (field.distance.copy(), field.step, field.sources, field.passable, field.built, field.stale)
+                  for key, field in self.__fields.items()}
+        return self.__roles.copy(), fields
+
+    def restore(self, snapshot: tuple[np.ndarray, dict]) -> None:
+        """
+        Puts the service back in the state of a snapshot.
+
+        Args:
+            snapshot (tuple): A value returned by snapshot().
+        """
+        roles, fields = snapshot
+        np.copyto(self.__roles, roles)
+        self.__fields = {}
+        for (targets, radius), (distance, step, sources, passable, built, stale) in fields.items():
+            field = FlowField(targets, radius, roles.shape)
+            field.distance = distance.copy()
+            field.step, field.sources, field.passable = step, sources, passable
+            field.built, field.stale = built, stale
+            self.__fields[(targets, radius)] = field
+
+    def update_cell(self, x: int, y: int, agent: Optional[Agent]) -> None:
+        """
+        Records the agent now occupying a cell and marks the affected fields as stale.
+
+        Args:
+            x (int): Wrapped x-coordinate of the cell.
+            y (int): Wrapped y-coordinate of the cell.
+            agent (Optional[Agent]): The new occupant, or None if the cell was emptied.
+        """
+        old_value = int(self.__roles[y, x])
+        new_value = EMPTY_CELL if agent is None else agent.get_agent_role().value
+        if old_value == new_value:
+            return
+
+        self.__roles[y, x] = new_value
+        for field in self.__fields.values():
+            if field.is_relevant(old_value) or field.is_relevant(new_value):
+                field.stale = True
+
+    def get_field(self, targets: Iterable[AgentRole], radius: int = 0) -> FlowField:
+        """
+        Returns the up-to-date flow field toward the given target roles.
+
+        Args:
+            targets (Iterable[AgentRole]): The roles to navigate toward.
+            radius (int): Footprint radius of the navigating agent.
+
+        Returns:
+            FlowField: The cached flow field.
+        """
+        key = (frozenset(targets), radius)
+        field = self.__fields.get(key)
+        if field is None:
+            field = FlowField(key[0], radius, self.__roles.shape)
+            self.__fields[key] = field
+
+        if field.stale:
+            self.__refresh(field)
+        return field
+
+    def distance(self, location: Location, targets: Iterable[AgentRole], radius: int = 0) -> int:
+        """
+        Returns the number of steps from a location to the nearest target.
+
+        Args:
+            location (Location): The starting location.
+            targets (Iterable[AgentRole]): The roles to navigate toward.
+            radius (int): Footprint radius of the navigating agent.
+
+        Returns:
+            int: The step count, or -1 if no target can be reached.
+        """
+        field = self.get_field(targets, radius)
+        return int(field.distance[location.get_y() % self.__height, location.get_x() % self.__width])
+
+    def next_step(self, location: Location, targets: Iterable[AgentRole], radius: int = 0) -> Optional[Location]:
+        """
+        Returns the neighbouring location on a shortest path toward the nearest target.
+
+        Args:
+            location (Location): The current location of the agent.
+            targets (Iterable[AgentRole]): The roles to navigate toward.
+            radius (int): Footprint radius of the navigating agent.
+
+        Returns:
+            Optional[Location]: The next location, or None if the agent is already at a target or none is reachable.
+        """
+        field = self.get_field(targets, radius)
+        x = location.get_x() % self.__width
+        y = location.get_y() % self.__height
+        direction = field.step[y, x]
+        if direction < 0:
+            return None
+
+        dx, dy = NEIGHBOUR_DELTAS[direction]
+        return Location((x + dx) % self.__width, (y + dy) % self.__height)
+
+    def __masks(self, field: FlowField) -> tuple[np.ndarray, np.ndarray]:
+        """Computes the source and passable masks of a field from the current occupancy."""
+        target_cells = np.isin(self.__roles, [role.value for role in field.targets])
+        blocking_cells = np.isin(self.__roles, [role.value for role in BLOCKING_ROLES - field.targets])
+
+        sources = dilate(target_cells, field.radius)
+        passable = ~dilate(blocking_cells, field.radius) & ~sources
+        return sources, passable
+
+    def __refresh(self, field: FlowField) -> None:
+        """Brings a stale field up to date, incrementally where distances can only shrink."""
+        sources, passable = self.__masks(field)
+
+        lost = (field.sources & ~sources) | (field.passable & ~passable & ~sources)
+        if not field.built or lost.any():
+            field.sources, field.passable = sources, passable
+            self.__rebuild(field)
+        else:
+            gained = (sources & ~field.sources) | (passable & ~field.passable)
+            field.sources, field.passable = sources, passable
+            ys, xs = np.nonzero(gained)
+            self.__relax(field, zip(xs.tolist(), ys.tolist()))
+
+        self.__update_steps(field)
+        field.built = True
+        field.stale = False
+
+    def __rebuild(self, field: FlowField) -> None:
+        """Recomputes all distances of a field with a frontier-at-a-time BFS."""
+        distance = np.full(self.__roles.shape, UNREACHABLE, dtype=np.int32)
+        distance[field.sources] = 0
+
+        frontier = field.sources
+        depth = 0
+        while frontier.any():
+            depth += 1
+            frontier = dilate(frontier, 1) & field.passable & (distance == UNREACHABLE)
+            distance[frontier] = depth
+
+        field.distance = distance
+
+    def __relax(self, field: FlowField, seeds: Iterable[tuple[int, int]]) -> None:
+        """Propagates distance decreases outward from the given cells."""
+        distance = field.distance
+        queue = deque(seeds)
+
+        while queue:
+            x, y = queue.popleft()
+
+            if field.sources[y, x]:
+                best = 0
+            elif field.passable[y, x]:
+                reached = [distance[(y + dy) % self.__height, (x + dx) % self.__width] for dx, dy in NEIGHBOUR_DELTAS]
+                reached = [d for d in reached if d != UNREACHABLE]
+                if not reached:
+                    continue
+                best = min(reached) + 1
+            else:
+                continue
+
+            if distance[y, x] == UNREACHABLE or best < distance[y, x]:
+                distance[y, x] = best
+                queue.extend(((x + dx) % self.__width, (y + dy) % self.__height) for dx, dy in NEIGHBOUR_DELTAS)
+
+    def __update_steps(self, field: FlowField) -> None:
+        """Points every cell at its neighbour with the smallest distance, if that brings it closer."""
+        unreachable = np.iinfo(np.int32).max
+        distance = np.where(field.distance == UNREACHABLE, unreachable, field.distance)
+
+        neighbours = np.stack([shift(distance, dx, dy) for dx, dy in NEIGHBOUR_DELTAS])
+        best = neighbours.argmin(axis=0)
+        closest = neighbours.min(axis=0)
+
+        field.step = np.where(closest < distance, best, -1).astype(np.int8)
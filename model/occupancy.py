@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import random
+from typing import Optional
+
+import numpy as np
+
+
+class Occupancy:
+    """
+    Occupancy index of a toroidal grid.
+
+    Keeps an O(1) sampleable list of free cells next to a boolean occupancy array, and a
+    summed-area table of the wrapped occupancy that is rebuilt lazily when a region query
+    follows a change. Cells are addressed by their flat index y * width + x.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        """
+        Initialise an index with every cell free.
+
+        Args:
+            width (int): Width of the grid.
+            height (int): Height of the grid.
+        """
+        self.__width = width
+        self.__height = height
+        self.__occupied = np.zeros((height, width), dtype=bool)
+
+        # free cells, and the position of each cell inside that list (-1 when occupied)
+        self.__free = list(range(width * height))
+        self.__position = list(range(width * height))
+
+        self.__version = 0
+        self.__table_version = -1
+        self.__table: Optional[np.ndarray] = None
+        self.__table_pad = 0
+
+    def clear(self) -> None:
+        """Marks every cell as free."""
+        self.__occupied.fill(False)
+        self.__free = list(range(self.__width * self.__height))
+        self.__position = list(range(self.__width * self.__height))
+        self.__version += 1
+
+    def snapshot(self) -> tuple[np.ndarray, list[int], list[int]]:
+        """
+        Returns a copy of the occupancy, for restore().
+
+        Returns:
+            tuple: The occupancy array, the free cells and the position of each cell in that list.
+        """
+        return self.__occupied.copy(), self.__free.copy(), self.__position.copy()
+
+    def restore(self, snapshot: tuple[np.ndarray, list[int], list[int]]) -> None:
+        """
+        Puts the index back in the state of a snapshot.
+
+        Args:
+            snapshot (tuple): A value returned by snapshot().
+        """
+        occupied, free, position = snapshot
+        np.copyto(self.__occupied, occupied)
+        self.__free = free.copy()
+        self.__position = position.copy()
+        self.__version += 1
+
+    def is_free(self, x: int, y: int) -> bool:
+        """Return true if the wrapped cell holds no agent."""
+        return not self.__occupied[y % self.__height, x % self.__width]
+
+    def free_count(self) -> int:
+        """Return the number of free cells."""
+        return len(self.__free)
+
+    def set_occupied(self, x: int, y: int, occupied: bool) -> None:
+        """
+        Marks a cell as occupied or free.
+
+        Args:
+            x (int): Wrapped x-coordinate of the cell.
+            y (int): Wrapped y-coordinate of the cell.
+            occupied (bool): True if an agent now stands on the cell.
+        """
+        if self.__occupied[y, x] == occupied:
+            return
+
+        self.__occupied[y, x] = occupied
+        self.__version += 1
+        cell = y * self.__width + x
+
+        if occupied:
+            # swap the cell with the last free cell and drop it
+            index = self.__position[cell]
+            last = self.__free.pop()
+            if last != cell:
+                self.__free[index] = last
+                self.__position[last] = index
+            self.__position[cell] = -1
+        else:
+            self.__position[cell] = len(self.__free)
+            self.__free.append(cell)
+
+    def random_free_cell(self) -> Optional[tuple[int, int]]:
+        """
+        Returns a uniformly chosen free cell.
+
+        Returns:
+            Optional[tuple[int, int]]: The (x, y) coordinates of the cell, or None if the grid is full.
+        """
+        if not self.__free:
+            return None
+
+        cell = random.choice(self.__free)
+        return cell % self.__width, cell // self.__width
+
+    def empty_regions(self, r: int) -> np.ndarray:
+        """
+        Returns a mask of the (2r+1)x(2r+1) windows that hold no agent, wrapping around the edges.
+
+        Args:
+            r (int): Radius of the window around its centre cell.
+
+        Returns:
+            np.ndarray: A (height, width) boolean mask indexed by the top-left cell of each window.
+        """
+        size = 2 * r + 1
+        table = self.__summed_area_table(size - 1)
+
+        counts = table[size:size + self.__height, size:size + self.__width] \
+            - table[:self.__height, size:size + self.__width] \
+            - table[size:size + self.__height, :self.__width] \
+            + table[:self.__height, :self.__width]
+        return counts == 0
+
+    def find_empty_region(self, r: int, randomise: bool = False) -> Optional[tuple[int, int]]:
+        """
+        Finds the centre of an empty (2r+1)x(2r+1) region.
+
+        Args:
+            r (int): Radius of the region around its centre cell.
+            randomise (bool): Pick a random empty region instead of the first one in row-major order.
+
+        Returns:
+            Optional[tuple[int, int]]: The (x, y) coordinates of the centre, or None if there is no space.
+        """
+        if r == 0:
+            if randomise:
+                return self.random_free_cell()
+            if not self.__free:
+                return None
+
+        candidates = np.flatnonzero(self.empty_regions(r))
+        if candidates.size == 0:
+            return None
+
+        corner = int(random.choice(candidates)) if randomise else int(candidates[0])
+        x, y = corner % self.__width, corner // self.__width
+        return (x + r) % self.__width, (y + r) % self.__height
+
+    def __summed_area_table(self, pad: int) -> np.ndarray:
+        """Returns the summed-area table of the occupancy wrapped by `pad` extra cells, rebuilding it if stale."""
+        if self.__table_version != self.__version or self.__table_pad < pad:
+            wrapped = np.pad(self.__occupied, ((0, pad), (0, pad)), mode='wrap').astype(np.int32)
+            table = np.zeros((wrapped.shape[0] + 1, wrapped.shape[1] + 1), dtype=np.int32)
+            table[1:, 1:] = wrapped.cumsum(axis=0).cumsum(axis=1)
+
+            self.__table = table
+            self.__table_pad = pad
+            self.__table_version = self.__version
+
+        return self.__table
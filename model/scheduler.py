@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+
+class Timer:
+    """A pending event of a TimerWheel."""
+
+    __slots__ = ("due", "callback", "args", "cancelled")
+
+    def __init__(self, due: int, callback: Callable[..., Any], args: tuple) -> None:
+        """
+        Initialise the timer.
+
+        Args:
+            due (int): The tick at which the callback fires.
+            callback (Callable): The function to call.
+            args (tuple): Positional arguments for the callback.
+        """
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __repr__(self) -> str:
+        """Return a string representation of the timer."""
+        return f"Timer(due={self.due}, callback={getattr(self.callback, '__name__', self.callback)})"
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel driving delayed simulation events.
+
+    Each tick only visits the slot of the current tick, so firing pending events costs O(1)
+    amortised per step no matter how many events are scheduled further ahead. Events that are
+    more than one revolution away simply stay in their slot until their tick comes round.
+    """
+
+    def __init__(self, slots: int = 64) -> None:
+        """
+        Initialise an empty wheel.
+
+        Args:
+            slots (int): Number of slots in the wheel.
+        """
+        self.__slots = [[] for _ in range(slots)]
+        self.__now = 0
+        self.__pending = 0
+
+    def __len__(self) -> int:
+        """Return the number of pending events."""
+        return self.__pending
+
+    def now(self) -> int:
+        """Return the number of ticks advanced so far."""
+        return self.__now
+
+    def clear(self) -> None:
+        """Drops all pending events and resets the clock."""
+        for bucket in self.__slots:
+            bucket.clear()
+        self.__now = 0
+        self.__pending = 0
+
+    def snapshot(self) -> tuple[int, list[tuple[int, Callable[..., Any], tuple]]]:
+        """
+        Returns the clock and the pending events, for restore().
+
+        Returns:
+            tuple: The current tick and the (due tick, callback, args) of every pending event.
+        """
+        events = [(timer.due, timer.callback, timer.args) for bucket in self.__slots for timer in bucket
+                  if not timer.cancelled and timer.due > self.__now]
+        events.sort(key=lambda event: event[0])
+        return self.__now, events
+
+    def restore(self, snapshot: tuple[int, list[tuple[int, Callable[..., Any], tuple]]]) -> None:
+        """
+        Puts the wheel back in the state of a snapshot. Handles of the replaced events are no longer valid.
+
+        Args:
+            snapshot (tuple): A value returned by snapshot().
+        """
+        self.clear()
+        self.__now, events = snapshot
+        for due, callback, args in events:
+            self.__slots[due % len(self.__slots)].append(Timer(due, callback, args))
+        self.__pending = len(events)
+
+    def schedule(self, delay: int, callback: Callable[..., Any], *args: Any) -> Timer:
+        """
+        Schedules a callback to fire after a number of ticks.
+
+        Args:
+            delay (int): Number of ticks from now, at least 1.
+            callback (Callable): The function to call.
+            *args: Positional arguments for the callback.
+
+        Returns:
+            Timer: A handle that can be passed to cancel().
+        """
+        timer = Timer(self.__now + max(1, delay), callback, args)
+        self.__slots[timer.due % len(self.__slots)].append(timer)
+        self.__pending += 1
+        return timer
+
+    def cancel(self, timer: Timer) -> None:
+        """
+        Cancels a pending event. Cancelled events are dropped when their slot is next visited.
+
+        Args:
+            timer (Timer): The handle returned by schedule().
+        """
+        if not timer.cancelled and timer.due > self.__now:
+            timer.cancelled = True
+            self.__pending -= 1
+
+    def advance(self) -> int:
+        """
+        Moves the clock one tick forward and fires the events due at the new tick, in scheduling order.
+
+        Returns:
+            int: The number of events fired.
+        """
+        self.__now += 1
+        bucket = self.__slots[self.__now % len(self.__slots)]
+
+        due = [timer for timer in bucket if timer.due == self.__now]
+        if not due:
+            return 0
+
+        bucket[:] = [timer for timer in bucket if timer.due != self.__now]
+
+        fired = 0
+        for timer in due:
+            if timer.cancelled:
+                continue
+            self.__pending -= 1
+            timer.callback(*timer.args)
+            fired += 1
+
+        return fired
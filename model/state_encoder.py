@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence, TYPE_CHECKING
+
+import numpy as np
+
+from controller.config.config import Config
+
+if TYPE_CHECKING:
+    from model.agents.agent import Agent
+    from model.agents.agent_table import AgentTable
+
+
+REGION_SIZE = 5
+
+# upper bounds of the distance and health bins
+DISTANCE_BINS = np.array([2, 6])
+HEALTH_BINS = np.array([0.2, 0.6])
+
+
+class StateEncoder:
+    """
+    Encodes the discrete states of many agents in one pass.
+
+    A state is (region id, nearest bridge distance bin, nearest bridge health bin, nearest target
+    distance bin), where the target role is declared by the agent class in `state_target_role`.
+    The encoder keeps the table rows of the agents standing on the grid in sync with the grid, so
+    encoding costs one toroidal distance matrix between the encoded agents and the agents on the
+    grid, instead of a grid scan per agent. Ties between equally near bridges go to the first
+    bridge in row-major grid order.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an encoder with no agent on the grid."""
+        self.__table: Optional[AgentTable] = None
+        # number of cells covered by each agent on the grid, by table row
+        self.__cells: dict[int, int] = {}
+
+    def clear(self) -> None:
+        """Forgets every agent on the grid."""
+        self.__cells.clear()
+
+    def snapshot(self) -> tuple[Optional[AgentTable], dict[int, int]]:
+        """
+        Returns a copy of the rows known to be on the grid, for restore().
+
+        Returns:
+            tuple: The table of the agents and the number of cells covered by each row.
+        """
+        return self.__table, dict(self.__cells)
+
+    def restore(self, snapshot: tuple[Optional[AgentTable], dict[int, int]]) -> None:
+        """
+        Puts the encoder back in the state of a snapshot.
+
+        Args:
+            snapshot (tuple): A value returned by snapshot().
+        """
+        self.__table, cells = snapshot
+        self.__cells = dict(cells)
+
+    def update_cell(self, previous: Optional[Agent], agent: Optional[Agent]) -> None:
+        """
+        Records that a cell now holds another agent.
+
+        Args:
+            previous (Optional[Agent]): The agent the cell held.
+            agent (Optional[Agent]): The agent the cell holds now.
+        """
+        if previous is agent:
+            return
+
+        if previous is not None:
+            row = previous.get_row()
+            remaining = self.__cells.get(row, 0) - 1
+            if remaining > 0:
+                self.__cells[row] = remaining
+            else:
+                self.__cells.pop(row, None)
+
+        if agent is not None:
+            self.__table = agent.get_table()
+            row = agent.get_row()
+            self.__cells[row] = self.__cells.get(row, 0) + 1
+
+    def encode(self, agents: Sequence[Agent]) -> np.ndarray:
+        """
+        Encodes the states of agents.
+
+        Args:
+            agents (Sequence[Agent]): The agents, all declaring a state_target_role.
+
+        Returns:
+            np.ndarray: A (len(agents), 4) integer array, one state per row.
+        """
+        from model.agents.agent import AgentRole
+
+        states = np.zeros((len(agents), 4), dtype=np.int64)
+        if not agents:
+            return states
+
+        table = agents[0].get_table()
+        rows = np.fromiter((agent.get_row() for agent in agents), dtype=np.intp, count=len(agents))
+        targets = np.fromiter((agent.state_target_role.value for agent in agents), dtype=np.int8, count=len(agents))
+
+        n = Config.world_size
+        states[:, 0] = (table.y[rows] // REGION_SIZE) * (n // REGION_SIZE) + table.x[rows] // REGION_SIZE
+
+        placed = np.fromiter(self.__cells, dtype=np.intp, count=len(self.__cells)) if table is self.__table \
+            else np.empty(0, dtype=np.intp)
+        # row-major grid order, for the tie-break between bridges
+        placed = placed[np.lexsort((table.x[placed], table.y[placed]))]
+        roles = table.role[placed]
+        distances = table.pairwise_distances(rows, placed)
+
+        bridges = roles == AgentRole.BRIDGE.value
+        if bridges.any():
+            bridge_distances = distances[:, bridges]
+            nearest = bridge_distances.argmin(axis=1)
+            states[:, 1] = np.searchsorted(DISTANCE_BINS, bridge_distances[np.arange(len(agents)), nearest])
+            states[:, 2] = np.searchsorted(HEALTH_BINS, table.health[placed[bridges][nearest]])
+        else:
+            states[:, 1] = len(DISTANCE_BINS)
+
+        is_target = roles[None, :] == targets[:, None]
+        nearest_target = np.where(is_target, distances, n).min(axis=1, initial=n)
+        nearest_target[~is_target.any(axis=1)] = 0
+        states[:, 3] = np.searchsorted(DISTANCE_BINS, nearest_target)
+        return states
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import zlib
+
+from functools import lru_cache
+from typing import Optional, Sequence, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from model.agents.agent import Agent
+    from model.agents.agent_table import AgentTable
+
+
+# number of health levels told apart by the hash, full health having a level of its own
+HEALTH_BUCKETS = 10
+
+# seed of the random keys, fixed so a state hashes the same in every process and every run
+ZOBRIST_SEED = 0x2F0B
+
+
+def health_bucket(health: float) -> int:
+    """
+    Returns the level of a health value among HEALTH_BUCKETS, full health having a level of its own.
+
+    Args:
+        health (float): The health, between 0 and 1.
+
+    Returns:
+        int: The level, from 0 to HEALTH_BUCKETS.
+    """
+    return min(HEALTH_BUCKETS, max(0, int(health * HEALTH_BUCKETS)))
+
+
+@lru_cache(maxsize=None)
+def class_keys(name: str, cells: int, seed: int = ZOBRIST_SEED) -> tuple[int, ...]:
+    """
+    Returns the keys of an agent class, one per (cell, health bucket), at index cell * (HEALTH_BUCKETS + 1) + bucket.
+
+    The keys are drawn from a generator seeded by the seed and the class name, so they do not
+    depend on the order classes are met in.
+
+    Args:
+        name (str): The agent class name.
+        cells (int): The number of cells of the grid.
+        seed (int): The seed of the keys.
+
+    Returns:
+        tuple[int, ...]: The 64-bit keys.
+    """
+    generator = np.random.default_rng([seed, zlib.crc32(name.encode())])
+    size = cells * (HEALTH_BUCKETS + 1)
+    return tuple(np.frombuffer(generator.bytes(8 * size), dtype="<u8").tolist())
+
+
+class ZobristHash:
+    """
+    64-bit Zobrist hash of the occupants of a grid.
+
+    The hash is the XOR of the keys of the (cell, agent class, health bucket) of every occupied
+    cell. It is updated as a cell changes occupant and as an occupant changes health bucket,
+    in constant time per cell, so hashing a state costs nothing once it is reached. Each
+    occupant remembers the bucket it was hashed with, so a key is always XORed out exactly as
+    it was XORed in. Cells are addressed by their flat index y * width + x.
+    """
+
+    def __init__(self, width: int, height: int, seed: int = ZOBRIST_SEED) -> None:
+        """
+        Initialise the hash of an empty grid.
+
+        Args:
+            width (int): Width of the grid.
+            height (int): Height of the grid.
+            seed (int): The seed of the keys.
+        """
+        self.__cells = width * height
+        self.__seed = seed
+        self.__value = 0
+        # occupants by (id of their table, row): [keys of the class, hashed bucket, occupied cells]
+        self.__occupants: dict[tuple[int, int], list] = {}
+
+    def value(self) -> int:
+        """
+        Get the hash of the grid.
+
+        Returns:
+            int: The unsigned 64-bit hash, 0 for an empty grid.
+        """
+        return self.__value
+
+    def clear(self) -> None:
+        """Empties the grid."""
+        self.__value = 0
+        self.__occupants.clear()
+
+    def snapshot(self) -> tuple[int, dict]:
+        """
+        Returns a copy of the hash and its occupants, for restore().
+
+        Returns:
+            tuple: The hash and the occupants.
+        """
+        return self.__value, {key: (keys, bucket, tuple(cells)) for key, (keys, bucket, cells) in self.__occupants.items()}
+
+    def restore(self, snapshot: tuple[int, dict]) -> None:
+        """
+        Puts the hash back in the state of a snapshot.
+
+        Args:
+            snapshot (tuple): A value returned by snapshot().
+        """
+        self.__value = snapshot[0]
+        self.__occupants = {key: [keys, bucket, list(cells)] for key, (keys, bucket, cells) in snapshot[1].items()}
+
+    def update_cell(self, cell: int, old: Optional[Agent], new: Optional[Agent]) -> None:
+        """
+        Replaces the occupant of a cell.
+
+        Args:
+            cell (int): The flat index of the cell.
+            old (Optional[Agent]): The agent leaving the cell, None if it was empty.
+            new (Optional[Agent]): The agent entering the cell, None if it becomes empty.
+        """
+        stride = HEALTH_BUCKETS + 1
+        if old is not None:
+            key = (id(old.get_table()), old.get_row())
+            keys, bucket, cells = self.__occupants[key]
+            self.__value ^= keys[cell * stride + bucket]
+            cells.remove(cell)
+            if not cells:
+                del self.__occupants[key]
+
+        if new is not None:
+            key = (id(new.get_table()), new.get_row())
+            occupant = self.__occupants.get(key)
+            if occupant is None:
+                occupant = self.__occupants[key] = [class_keys(new.__class__.__name__, self.__cells, self.__seed),
+                                                    health_bucket(new.get_health()), []]
+            self.__value ^= occupant[0][cell * stride + occupant[1]]
+            occupant[2].append(cell)
+
+    def update_health(self, table: AgentTable, rows: Sequence[int]) -> None:
+        """
+        Rehashes the cells of agents whose health changed, where it crossed a bucket boundary.
+
+        Args:
+            table (AgentTable): The table holding the agents.
+            rows (Sequence[int]): The rows of the agents.
+        """
+        stride = HEALTH_BUCKETS + 1
+        for row in rows:
+            occupant = self.__occupants.get((id(table), int(row)))
+            if occupant is None:
+                continue
+            keys, old, cells = occupant
+            new = health_bucket(table.health[row])
+            if new != old:
+                for cell in cells:
+                    self.__value ^= keys[cell * stride + old] ^ keys[cell * stride + new]
+                occupant[1] = new
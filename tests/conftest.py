@@ -0,0 +1,18 @@
+import pytest
+
+from model.earth import Earth
+
+
+@pytest.fixture
+def earth():
+    return Earth()
+
+
+@pytest.fixture
+def place():
+    """Return a function putting an agent on an Earth at its own location."""
+    def place(earth, agent):
+        earth.set_agent(agent, agent.get_location())
+        return agent
+
+    return place
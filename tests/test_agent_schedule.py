@@ -0,0 +1,54 @@
+from unittest.mock import Mock
+
+from controller.agent_schedule import AgentSchedule
+from model.agents.agent import Agent
+from model.agents.bridge import Bridge
+from model.agents.franklin import Franklin
+from model.agents.reed_richards import ReedRichards
+from model.location import Location
+
+
+def make_actor(interval):
+    agent = Mock(spec=Agent)
+    agent.passive = False
+    agent.decision_interval = interval
+    return agent
+
+
+def test_passive_entities_never_act():
+    schedule = AgentSchedule()
+    bridge = Bridge(Location(5, 5), health=0.8)
+    franklin = Franklin(Location(6, 6))
+    reed = ReedRichards(Location(0, 0))
+
+    for agent in [bridge, franklin, reed]:
+        schedule.add(agent)
+
+    assert schedule.actors() == [reed]
+    assert schedule.entities() == [bridge, franklin]
+    assert all(schedule.due(step) == [reed] for step in range(5))
+
+
+def test_slow_agents_are_staggered():
+    schedule = AgentSchedule()
+    fast = make_actor(1)
+    slow = [make_actor(3) for _ in range(3)]
+
+    schedule.add(fast)
+    for agent in slow:
+        schedule.add(agent)
+
+    for step in range(6):
+        due = schedule.due(step)
+        assert fast in due
+        # exactly one of the slow agents acts each step
+        assert [agent for agent in slow if agent in due] == [slow[step % 3]]
+
+
+def test_clear():
+    schedule = AgentSchedule()
+    schedule.add(make_actor(2))
+    schedule.clear()
+
+    assert schedule.actors() == []
+    assert schedule.due(0) == []
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from model.agents.agent_table import AgentTable
+from model.agents.agent import AgentRole
+from model.agents.the_thing import TheThing
+from model.agents.reed_richards import ReedRichards
+from model.agents.bridge import Bridge
+from model.location import Location
+from controller.config.hero_config import TheThingConfig
+
+
+@pytest.fixture
+def table():
+    return AgentTable(capacity=2)
+
+
+def test_agents_are_slotted_views():
+    thing = TheThing(Location(3, 4))
+    assert not hasattr(thing, "__dict__")
+
+    table, row = thing.get_table(), thing.get_row()
+    assert table.x[row] == 3 and table.y[row] == 4
+
+    thing.reduce_health(0.25)
+    assert table.health[row] == 0.75
+
+    thing.set_location(Location(7, 8))
+    assert table.x[row] == 7 and table.y[row] == 8
+
+
+def test_class_parameters_are_shared():
+    thing = TheThing(Location(0, 0))
+    reed = ReedRichards(Location(1, 1))
+
+    assert thing.close_attack_rate == TheThingConfig.close_attack_rate
+    assert thing.repair_rate == TheThingConfig.bridge_repair_rate
+    assert reed.attack_rate is None
+    assert reed.scan_range == 3
+
+
+def test_table_grows_and_reuses_rows(table):
+    rows = [table.allocate(0, AgentRole.HERO, 1.0) for _ in range(5)]
+    assert len(set(rows)) == 5
+    assert len(table) == 5
+
+    table.release(rows[0])
+    assert len(table) == 4
+    assert table.allocate(0, AgentRole.HERO, 1.0) == rows[0]
+
+
+def test_role_filtering(table):
+    hero = table.allocate(0, AgentRole.HERO, 1.0)
+    villain = table.allocate(0, AgentRole.VILLAIN, 1.0)
+    table.set_position(hero, 1, 1)
+    table.set_position(villain, 2, 2)
+
+    assert list(table.rows(AgentRole.HERO)) == [hero]
+
+    # agents off the grid are left out
+    table.set_position(villain, None, None)
+    assert list(table.rows(AgentRole.VILLAIN)) == []
+
+
+def test_apply_health_accumulates_and_clips(table):
+    a = table.allocate(0, AgentRole.BRIDGE, 0.5)
+    b = table.allocate(0, AgentRole.BRIDGE, 0.5)
+
+    table.apply_health([a, a, b], [0.3, 0.4, -0.8])
+    assert table.health[a] == 1.0
+    assert table.health[b] == 0.0
+
+
+def test_apply_health_clips_mixed_changes_one_by_one(table):
+    a = table.allocate(0, AgentRole.BRIDGE, 0.9)
+    b = table.allocate(0, AgentRole.BRIDGE, 0.9)
+
+    table.apply_health([a, b, a, b], [0.4, -0.3, -0.1, 0.4])
+    assert table.health[a] == pytest.approx(0.9)
+    assert table.health[b] == 1.0
+
+
+def test_toroidal_distances(table):
+    rows = [table.allocate(0, AgentRole.HERO, 1.0) for _ in range(3)]
+    for row, (x, y) in zip(rows, [(0, 0), (29, 29), (10, 3)]):
+        table.set_position(row, x, y)
+
+    assert list(table.distances(0, 0, rows)) == [0, 1, 10]
+    matrix = table.pairwise_distances(rows, rows)
+    assert matrix.shape == (3, 3)
+    assert (matrix == matrix.T).all()
+    assert matrix[1, 2] == 11
+
+
+def test_released_rows_follow_garbage_collection():
+    bridge = Bridge(Location(5, 5), health=0.8)
+    table, row = bridge.get_table(), bridge.get_row()
+    assert table.in_use[row]
+
+    del bridge
+    assert not table.in_use[row]
@@ -0,0 +1,37 @@
+import math
+
+from controller.checkpoint_writer import CheckpointWriter
+from model.agents.q_table_file import delta_paths, load_q_table_file, read_sequence
+from model.agents.q_table_storage import DirectoryStorage, MemoryStorage
+
+
+def test_deltas_are_applied_on_load_and_compacted(tmp_path):
+    storage = DirectoryStorage(str(tmp_path), compact_every=3)
+    path = storage.path("Galactus")
+    writer = CheckpointWriter(storage)
+
+    writer.submit("Galactus", {("s", ("Move", 1, 0)): 1.0, ("s", ("Move", 0, 1)): 2.0})
+    writer.submit("Galactus", {("s", ("Move", 1, 0)): 1.5})
+    writer.submit("Galactus", {("s", ("Move", 0, 1)): math.nan, ("t", ("Move", 0, 0)): 3.0})
+    writer.flush()
+
+    assert len(delta_paths(path)) == 2
+    assert dict(storage.load("Galactus").items()) == {("s", ("Move", 1, 0)): 1.5, ("t", ("Move", 0, 0)): 3.0}
+
+    writer.submit("Galactus", {("t", ("Move", 0, 0)): 4.0})
+    writer.close()
+
+    assert delta_paths(path) == [] and read_sequence(path) == 3
+    assert dict(load_q_table_file(path, mmap=True).items()) == {("s", ("Move", 1, 0)): 1.5, ("t", ("Move", 0, 0)): 4.0}
+
+
+def test_full_checkpoint_replaces_the_table():
+    storage = MemoryStorage()
+    writer = CheckpointWriter(storage)
+
+    writer.submit("Galactus", {("s", "a"): 1.0, ("s", "b"): 2.0})
+    writer.submit("Galactus", {("s", "b"): 5.0})
+    writer.submit("Galactus", {("s", "a"): 1.0}, full=True)
+    writer.close()
+
+    assert storage.load("Galactus") == {("s", "a"): 1.0}
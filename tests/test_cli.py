@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+from controller.cli import parse_args, worker_path
+from controller.progress import ProgressReporter
+
+
+def test_defaults():
+    args = parse_args([])
+    assert args.episodes == 100
+    assert args.workers == 1
+    assert args.checkpoint_every == 1
+    assert not args.gui
+    assert args.progress
+
+
+@pytest.mark.parametrize("argv", [["--workers", "0"], ["--world-size", "10"], ["--gui", "-w", "2"], ["--checkpoint-every", "0"]])
+def test_invalid_arguments(argv):
+    with pytest.raises(SystemExit):
+        parse_args(argv)
+
+
+def test_worker_path():
+    assert worker_path("trace.json", 1, 1) == "trace.json"
+    assert worker_path("out/trace.json", 1, 3) == "out/trace-1.json"
+    assert worker_path(None, 1, 3) is None
+
+
+def test_progress_is_throttled():
+    stream = io.StringIO()
+    progress = ProgressReporter(total=50, stream=stream, interval=60.0)
+
+    for episode in range(50):
+        progress.on_episode({"episode": episode + 1, "win_status": episode % 2, "length": 10})
+    progress.close()
+
+    lines = stream.getvalue().splitlines()
+    # the first episode and the last one, nothing in between
+    assert len(lines) == 2
+    assert lines[-1].startswith("episode 50/50 | won 50.0% | avg length 10.0")
@@ -0,0 +1,53 @@
+from controller.convergence import ConvergenceMonitor
+
+
+def test_end_episode_reports_per_class_deltas():
+    monitor = ConvergenceMonitor(window=2, patience=1)
+    monitor.record("Galactus", 0.5)
+    monitor.record("Galactus", 1.5)
+    monitor.record("SilverSurfer", 0.2)
+
+    signals = monitor.end_episode(1)
+
+    assert signals["max_dq"] == 1.5
+    assert abs(signals["mean_dq"] - 2.2 / 3) < 1e-12
+    assert signals["per_class"]["Galactus"] == {"mean_dq": 1.0, "max_dq": 1.5}
+    assert signals["win_rate"] == 1.0
+    assert not signals["converged"]
+
+
+def test_converges_after_patience_stable_episodes():
+    monitor = ConvergenceMonitor(window=3, patience=4, q_tolerance=1e-3)
+    for _ in range(3):
+        monitor.record("Galactus", 1e-4)
+        signals = monitor.end_episode(0)
+        assert not signals["converged"]
+
+    monitor.record("Galactus", 1e-4)
+    signals = monitor.end_episode(0)
+
+    assert signals["stable_episodes"] == 4
+    assert signals["converged"]
+    assert monitor.converged_at() == 4
+
+
+def test_large_update_resets_stability():
+    monitor = ConvergenceMonitor(window=1, patience=3)
+    monitor.end_episode(0)
+    monitor.end_episode(0)
+    monitor.record("Galactus", 0.5)
+
+    assert monitor.end_episode(0)["stable_episodes"] == 0
+    assert monitor.converged_at() is None
+
+
+def test_win_rate_drift_resets_stability():
+    monitor = ConvergenceMonitor(window=2, patience=10, win_rate_tolerance=0.1)
+    monitor.end_episode(0)
+    monitor.end_episode(0)
+    assert monitor.end_episode(0)["stable_episodes"] == 3
+
+    signals = monitor.end_episode(1)
+
+    assert signals["win_rate"] == 0.5
+    assert signals["stable_episodes"] == 1
@@ -0,0 +1,192 @@
+import pytest
+
+from model.location import Location
+from model.actions.attack import Attack
+from model.actions.repair import Repair
+from model.actions.protect import Protect
+from model.actions.heal import Heal
+from model.actions.move import Move
+from model.agents.bridge import Bridge
+from model.agents.galactus import Galactus
+from model.agents.the_thing import TheThing
+from model.agents.human_torch import HumanTorch
+from model.agents.silver_surfer import SilverSurfer
+from controller.config.hero_config import TheThingConfig, HumanTorchConfig
+from controller.config.silver_surfer_config import SilverSurferConfig
+from controller.config.bridge_config import BridgeConfig
+
+
+def test_attacks_and_repairs_are_batched(earth, place):
+    thing = place(earth, TheThing(Location(10, 10)))
+    surfer = place(earth, SilverSurfer(Location(11, 10)))
+    bridge = place(earth, Bridge(Location(9, 10), health=0.5))
+
+    earth.register_action(Attack(Location(11, 10), thing))
+    earth.register_action(Repair(Location(9, 10), thing))
+    earth.register_action(Attack(Location(9, 10), surfer))
+    h_reward, v_reward = earth.execute_actions()
+
+    # silver surfer takes the hit and pays for its own attack
+    damage = TheThingConfig.attack_rate * SilverSurferConfig.ss_damage_rate
+    assert surfer.get_health() == pytest.approx(1.0 - damage - SilverSurferConfig.attack_health_reduce)
+
+    expected_bridge = 0.5 + TheThingConfig.bridge_repair_rate - SilverSurferConfig.ss_attack_rate * BridgeConfig.damage_rate
+    assert bridge.get_health() == pytest.approx(expected_bridge)
+
+    # hit on a villain and a repair for the heroes, hit on a bridge for the villains,
+    # plus the end-of-game reward since only one bridge is on the grid
+    assert (h_reward, v_reward) == (3 + 10 - 100, 3 + 100)
+
+
+def test_health_is_clipped(earth, place):
+    thing = place(earth, TheThing(Location(10, 10)))
+    bridge = place(earth, Bridge(Location(11, 10), health=0.9))
+
+    earth.register_action(Repair(Location(11, 10), thing))
+    earth.execute_actions()
+
+    assert bridge.get_health() == 1.0
+
+
+def test_repair_to_full_health_is_not_undone_by_a_later_hit(earth, place):
+    thing = place(earth, TheThing(Location(10, 10)))
+    surfer = place(earth, SilverSurfer(Location(12, 10)))
+    bridge = place(earth, Bridge(Location(11, 10), health=0.9))
+
+    earth.register_action(Repair(Location(11, 10), thing))
+    earth.register_action(Attack(Location(11, 10), surfer))
+    earth.execute_actions()
+
+    # the repair is clipped at full health before the hit lands, as when each action ran on its own
+    assert bridge.get_health() == pytest.approx(1.0 - SilverSurferConfig.ss_attack_rate * BridgeConfig.damage_rate)
+
+
+def test_protected_cells_block_attacks(earth, place):
+    torch = place(earth, HumanTorch(Location(10, 10)))
+    bridge = place(earth, Bridge(Location(13, 10), health=0.8))
+
+    earth.register_action(Attack(Location(13, 10), torch))
+    earth.register_action(Protect(Location(13, 10, 1), torch))
+    earth.execute_actions()
+
+    assert bridge.get_health() == 0.8
+    assert torch.get_health() == 1.0
+
+
+def test_ranged_attack_costs_health(earth, place):
+    torch = place(earth, HumanTorch(Location(10, 10)))
+    surfer = place(earth, SilverSurfer(Location(13, 10)))
+
+    earth.register_action(Attack(Location(13, 10), torch))
+    earth.execute_actions()
+
+    assert torch.get_health() == pytest.approx(1.0 - HumanTorchConfig.ranged_attack_health_reduce)
+    assert surfer.get_health() == pytest.approx(1.0 - HumanTorchConfig.attack_rate * SilverSurferConfig.ss_damage_rate)
+
+
+def test_restore_puts_back_the_snapshot_state(earth, place):
+    thing = place(earth, TheThing(Location(10, 10)))
+    bridge = place(earth, Bridge(Location(9, 10), health=0.5))
+    distance = earth.get_navigation().distance(Location(0, 0), [bridge.get_agent_role()])
+    states = earth.get_states([thing])
+    snapshot = earth.snapshot()
+
+    surfer = place(earth, SilverSurfer(Location(11, 10)))
+    earth.register_action(Attack(Location(11, 10), thing))
+    earth.register_action(Attack(Location(9, 10), surfer))
+    earth.execute_actions()
+    earth.set_agent(None, thing.get_location())
+    thing.set_location(Location(3, 3))
+    earth.set_agent(thing, thing.get_location())
+
+    earth.restore(snapshot)
+
+    assert earth.get_agent(Location(10, 10)) is thing and thing.get_location() == Location(10, 10)
+    assert earth.get_agent(Location(11, 10)) is None and earth.is_free(Location(3, 3))
+    assert thing.get_health() == 1.0 and bridge.get_health() == 0.5
+    assert earth.get_status().name == "RUNNING"
+    assert earth.get_navigation().distance(Location(0, 0), [bridge.get_agent_role()]) == distance
+    assert earth.get_states([thing]) == states
+
+
+def test_restore_keeps_agents_whose_cell_was_overwritten(earth, place):
+    galactus = place(earth, Galactus(Location(10, 10, 1)))
+    torch = place(earth, HumanTorch(Location(12, 10)))
+    place(earth, Bridge(Location(3, 3), health=0.5))
+
+    # galactus's footprint steps onto the cell of the human torch, which keeps its location
+    earth.register_action(Move(Location(11, 10, 1), galactus))
+    earth.execute_actions()
+    assert earth.get_agent(Location(12, 10)) is galactus and torch.get_location() == Location(12, 10)
+    health = torch.get_health()
+
+    earth.restore(earth.snapshot())
+
+    assert torch.get_location() == Location(12, 10) and torch.get_health() == health
+    assert torch.get_row() in torch.get_table().rows()
+
+
+def test_state_hash_follows_occupants_and_health_buckets(earth, place):
+    thing = place(earth, TheThing(Location(10, 10)))
+    bridge = place(earth, Bridge(Location(9, 10), health=0.5))
+    initial = earth.state_hash()
+
+    bridge._health = 0.52
+    assert earth.state_hash() == initial and earth.get_bridge_health() == (0.52,)
+    bridge._health = 0.65
+    assert earth.state_hash() != initial
+
+    bridge._health = 0.5
+    earth.set_agent(None, thing.get_location())
+    thing.set_location(Location(10, 11))
+    earth.set_agent(thing, thing.get_location())
+    assert earth.state_hash() != initial
+
+
+def test_truncated_fights_are_put_back_by_restore(earth):
+    snapshot = earth.snapshot()
+
+    earth.truncate()
+    assert earth.get_status().name == "TRUNCATED"
+
+    earth.restore(snapshot)
+    assert earth.get_status().name == "RUNNING"
+
+
+def test_restore_takes_agents_introduced_since_off_the_table(earth, place):
+    import gc
+
+    thing = place(earth, TheThing(Location(10, 10)))
+    place(earth, Bridge(Location(9, 10), health=0.5))
+    earth.get_scheduler().schedule(1, lambda: place(earth, SilverSurfer(Location(11, 10))))
+    snapshot = earth.snapshot()
+    table = thing.get_table()
+
+    for _ in range(2):
+        earth.execute_actions()
+        surfer = earth.get_agent(Location(11, 10))
+        assert surfer is not None and surfer.get_row() in table.rows()
+
+        earth.restore(snapshot)
+        gc.collect()
+
+        on_grid = {agent.get_row() for row in earth.get_grid() for agent in row if agent is not None}
+        assert set(table.rows().tolist()) == on_grid
+        assert surfer.get_location() is None
+
+
+@pytest.mark.parametrize("heal_first", [True, False])
+def test_other_actions_resolve_in_buffer_order_with_attacks(earth, place, heal_first):
+    thing = place(earth, TheThing(Location(10, 10)))
+    surfer = place(earth, SilverSurfer(Location(11, 10)))
+    place(earth, Bridge(Location(9, 10), health=0.5))
+
+    actions = [Heal(Location(10, 10), thing), Attack(Location(10, 10), surfer)]
+    for action in actions if heal_first else reversed(actions):
+        earth.register_action(action)
+    earth.execute_actions()
+
+    # a heal at full health does nothing, one after the hit restores part of it
+    damage = SilverSurferConfig.ss_attack_rate * TheThingConfig.damage_rate
+    expected = 1.0 - damage if heal_first else 1.0 - damage + TheThingConfig.heal_rate
+    assert thing.get_health() == pytest.approx(expected)
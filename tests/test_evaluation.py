@@ -0,0 +1,83 @@
+from unittest.mock import Mock
+
+import pytest
+
+from controller.config.learning_config import LearningConfig
+from controller.evaluation import evaluate, load_policies, wilson_interval
+from model.agents.greedy_policy import GreedyPolicy, LinearGreedyPolicy
+from model.agents.linear_q import LinearQ, feature_count
+
+
+def make_action(key):
+    action = Mock()
+    action.key.return_value = key
+    return action
+
+
+def make_agent(state, keys):
+    agent = Mock()
+    agent.get_state.return_value = state
+    agent.actions.return_value = [make_action(key) for key in keys]
+    return agent
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(50, 100)
+    assert low == pytest.approx(0.4038, abs=1e-3)
+    assert high == pytest.approx(0.5962, abs=1e-3)
+
+    # never outside [0, 1], and not degenerate when nothing was won
+    low, high = wilson_interval(0, 20)
+    assert low == pytest.approx(0.0, abs=1e-12) and 0.0 < high < 0.2
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+
+def test_greedy_policy_matches_q_values():
+    policy = GreedyPolicy({
+        ("s", ("Move", 1, 0)): 2.0,
+        ("s", ("Move", -1, 0)): 1.0,
+        ("t", ("Move", 1, 0)): -1.0,
+    })
+    assert len(policy) == 2
+    assert policy.best_key("s") == ("Move", 1, 0)
+    assert policy.best_key("t") is None
+
+    agent = make_agent("s", [("Move", -1, 0), ("Move", 1, 0)])
+    assert policy.choose(agent, None).key() == ("Move", 1, 0)
+
+    # the best action is not available
+    agent = make_agent("s", [("Move", 0, 1), ("Move", -1, 0)])
+    assert policy.choose(agent, None).key() == ("Move", -1, 0)
+
+    # an unseen action (worth 0) beats a known bad one
+    agent = make_agent("t", [("Move", 1, 0), ("Protect", 0, 0)])
+    assert policy.choose(agent, None).key() == ("Protect", 0, 0)
+
+    # unknown state: first action
+    agent = make_agent("u", [("Protect", 0, 0), ("Move", 1, 0)])
+    assert policy.choose(agent, None).key() == ("Protect", 0, 0)
+
+
+def test_linear_value_functions_are_evaluated_with_their_weights(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(LearningConfig, "value_function", "linear")
+    q_function = LinearQ(feature_count())
+    q_function.action_id(("Move", 1, 0))
+    q_function.save(str(tmp_path / "ReedRichards.npy"))
+
+    policies = load_policies(str(tmp_path))
+
+    assert isinstance(policies["ReedRichards"], LinearGreedyPolicy)
+    assert isinstance(policies["Galactus"], GreedyPolicy) and not isinstance(policies["Galactus"], LinearGreedyPolicy)
+    assert "No linear Q-function for SueStorm" in caplog.text
+
+
+def test_evaluation_stops_and_writes_nothing(tmp_path):
+    policies = load_policies(str(tmp_path))
+    assert "ReedRichards" in policies and "Bridge" not in policies
+
+    result = evaluate(policies, ci_width=0.6, min_episodes=4, max_episodes=40, batch_size=4, workers=1, seed=0)
+
+    assert 4 <= result["episodes"] < 40
+    assert result["converged"]
+    assert result["low"] <= result["win_rate"] <= result["high"]
+    assert list(tmp_path.iterdir()) == []
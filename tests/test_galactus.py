@@ -20,6 +20,23 @@ class TestGalactus:
         env.get_grid.return_value = [[None] * 20 for _ in range(20)]
         return env
     
+    @pytest.fixture
+    def earth(self, monkeypatch):
+        """Create an Earth with Galactus next to a bridge, The Thing, Franklin and three more bridges."""
+        from controller.config.config import Config
+        from model.agents.bridge import Bridge
+        from model.agents.franklin import Franklin
+        from model.agents.the_thing import TheThing
+        from model.earth import Earth
+
+        monkeypatch.setattr(Config, "q_table_storage", "memory")
+        earth = Earth()
+        agents = [Galactus(Location(10, 10, 1)), TheThing(Location(4, 4)), Franklin(Location(2, 16))]
+        agents += [Bridge(Location(x, y), health=0.5) for x, y in [(13, 10), (5, 5), (15, 16), (3, 12)]]
+        for agent in agents:
+            earth.set_agent(agent, agent.get_location())
+        return earth
+    
     def test_initialization(self, galactus):
         """Test that Galactus initializes correctly."""
         assert galactus._location.get_x() == 10
@@ -84,4 +101,84 @@ class TestGalactus:
         
         # Should return a Move action
         assert len(actions) == 1
-        assert isinstance(actions[0], Move)
\ No newline at end of file
+        assert isinstance(actions[0], Move)
+
+    def test_tree_search_plans_a_move_and_restores_the_earth(self, earth):
+        import random
+        from model.agents.mcts import MonteCarloTreeSearch
+
+        random.seed(0)
+        galactus = earth.get_agent(Location(10, 10))
+        thing = earth.get_agent(Location(4, 4))
+        earth.register_action(Move(Location(4, 5), thing))
+        grid = [list(row) for row in earth.get_grid()]
+
+        search = MonteCarloTreeSearch(budget_ms=50.0, depth=3)
+        action = search.search(galactus, earth)
+
+        # the bridge two cells to the right is eaten within the simulated steps
+        assert isinstance(action, Move) and action.get_location().get_x() == 11
+        assert action.get_location().get_range() == 1
+        assert search.iterations > 0 and search.get_root().visits > 0
+
+        assert [list(row) for row in earth.get_grid()] == grid
+        assert galactus.get_location() == Location(10, 10) and earth.get_status().name == "RUNNING"
+        earth.execute_actions()
+        assert thing.get_location() == Location(4, 5)
+
+    def test_tree_search_without_budget_leaves_the_choice_to_the_flow_field(self, earth):
+        from model.agents.mcts import MonteCarloTreeSearch
+
+        search = MonteCarloTreeSearch(budget_ms=0.0)
+
+        assert search.search(earth.get_agent(Location(10, 10)), earth) is None
+        assert search.iterations == 0 and not search.get_root().children
+
+    def test_decisions_spanning_several_steps_bootstrap_with_the_discount_of_their_length(self, earth, monkeypatch):
+        monkeypatch.setattr(Galactus, "decision_interval", 2)
+        galactus = earth.get_agent(Location(10, 10))
+        next_actions = galactus.actions(earth)
+        galactus.q_table[("after two steps", next_actions[0].key())] = 1.0
+
+        delta = galactus.update_q("decided", next_actions[0], 0.5, "after two steps", earth)
+
+        assert delta == pytest.approx(galactus.alpha * (0.5 + galactus.gamma ** 2))
+
+    def test_heads_for_franklin_only_when_strictly_closer_than_the_bridges(self, monkeypatch):
+        from controller.config.config import Config
+        from model.agents.bridge import Bridge
+        from model.agents.franklin import Franklin
+        from model.earth import Earth
+
+        monkeypatch.setattr(Config, "q_table_storage", "memory")
+        for franklin_x, expected_x in [(6, 11), (7, 9)]:
+            earth = Earth()
+            agents = [Galactus(Location(10, 10)), Bridge(Location(14, 10), health=0.5), Franklin(Location(franklin_x, 10))]
+            for agent in agents:
+                earth.set_agent(agent, agent.get_location())
+
+            move = agents[0].actions(earth)[0]
+
+            assert move.get_location().get_x() == expected_x
+    
+    def test_tree_search_replays_the_attack_of_a_hero_under_galactus(self, earth):
+        import random
+        from model.actions.attack import Attack
+        from model.agents.human_torch import HumanTorch
+        from model.agents.mcts import MonteCarloTreeSearch
+
+        random.seed(0)
+        galactus = earth.get_agent(Location(10, 10))
+        torch = HumanTorch(Location(12, 10))
+        earth.set_agent(torch, torch.get_location())
+
+        # galactus's footprint steps onto the human torch, which keeps its location
+        earth.register_action(Move(Location(11, 10, 1), galactus))
+        earth.execute_actions()
+        earth.register_action(Attack(Location(13, 10), torch))
+
+        search = MonteCarloTreeSearch(budget_ms=20.0, depth=2)
+        search.search(galactus, earth)
+
+        assert search.iterations > 1
+        assert torch.get_location() == Location(12, 10) and torch.get_row() in torch.get_table().rows()
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from controller.config.config import Config
+from model.agents.agent import AgentRole
+from model.agents.agent_table import AgentTable
+from model.agents.linear_q import FEATURE_NAMES, LinearQ, feature_count, state_features
+
+
+class Dummy:
+    parameters = {}
+
+
+def place(table, role, x, y, health=1.0):
+    row = table.allocate(table.class_id_of(Dummy), role, health)
+    table.set_position(row, x, y)
+    return row
+
+
+def test_state_features_reduce_distances_per_role():
+    table = AgentTable()
+    hero = place(table, AgentRole.HERO, 0, 0, health=0.5)
+    place(table, AgentRole.BRIDGE, 3, 0, health=0.4)
+    place(table, AgentRole.BRIDGE, 0, 9, health=0.8)
+    place(table, AgentRole.VILLAIN, 29, 29)
+
+    features = state_features(table, hero)
+    far = Config.world_size // 2
+
+    assert features.shape == (feature_count(),)
+    assert features[1] == 0.5
+    assert features[2] == pytest.approx(3 / far)
+    assert features[3] == 0.4
+    assert features[4] == pytest.approx(0.6)
+    assert features[5] == pytest.approx(1 / far)
+    # no other hero on the grid
+    assert features[6] == 1.0
+    assert features[len(FEATURE_NAMES):].sum() == 1.0
+
+
+def test_batched_updates_move_values_towards_rewards():
+    q = LinearQ(features=2, batch_size=4)
+    phi = np.array([1.0, 0.0])
+
+    for _ in range(40):
+        q.add(phi, ("Attack", 1, 0), 1.0, phi, [], True, alpha=0.5, gamma=0.9)
+        q.add(phi, ("Move", 0, 1), -1.0, phi, [], True, alpha=0.5, gamma=0.9)
+
+    values = q.values(phi, [("Attack", 1, 0), ("Move", 0, 1)])
+    assert values[0] > 0.9
+    assert values[1] < -0.9
+
+
+
+def test_next_states_bootstrap_only_from_their_available_actions():
+    q = LinearQ(features=1, batch_size=1)
+    phi = np.ones(1)
+    for _ in range(20):
+        q.add(phi, ("Attack", 1, 0), 1.0, phi, [], True, alpha=0.5, gamma=0.9)
+
+    # the attack learned a value close to 1 but cannot be taken in the next state
+    q.add(phi, ("Move", 0, 1), 0.0, phi, [("Move", 0, 1)], False, alpha=1.0, gamma=0.9)
+
+    assert q.values(phi, [("Move", 0, 1)])[0] == pytest.approx(0.0)
+
+def test_weights_round_trip(tmp_path):
+    q = LinearQ(features=3, batch_size=1)
+    q.add(np.ones(3), ("Move", 1, 0), 1.0, np.ones(3), [], True, alpha=0.1, gamma=0.9)
+    path = str(tmp_path / "SueStorm.npy")
+    q.save(path)
+
+    loaded = LinearQ.load(path, features=3)
+
+    assert np.allclose(loaded.values(np.ones(3), [("Move", 1, 0)]), q.values(np.ones(3), [("Move", 1, 0)]))
+    assert LinearQ.load(path, features=4) is None
+
+
+def test_a_crash_while_saving_keeps_the_previous_weights(tmp_path, monkeypatch):
+    q = LinearQ(features=3, batch_size=1)
+    q.add(np.ones(3), ("Move", 1, 0), 1.0, np.ones(3), [], True, alpha=0.1, gamma=0.9)
+    path = str(tmp_path / "SueStorm.npy")
+    q.save(path)
+    saved = q.values(np.ones(3), [("Move", 1, 0)])
+
+    def crash(f, array):
+        f.write(b"\x93NUMPY")
+        raise OSError("disk full")
+
+    q.add(np.ones(3), ("Attack", 1, 0), 1.0, np.ones(3), [], True, alpha=0.1, gamma=0.9)
+    monkeypatch.setattr(np, "save", crash)
+    with pytest.raises(OSError):
+        q.save(path)
+    monkeypatch.undo()
+
+    loaded = LinearQ.load(path, features=3)
+    assert np.allclose(loaded.values(np.ones(3), [("Move", 1, 0)]), saved)
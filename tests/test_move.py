@@ -86,4 +86,40 @@ class TestMove:
         mock_agent.set_location.assert_called_with(target_location)
         
         # Should return 0 reward
-        assert result == 0
\ No newline at end of file
+        assert result == 0
+
+    def test_key_is_relative_to_agent(self, mock_agent):
+        """Test that the key holds the wrapped offset from the agent."""
+        assert Move(Location(6, 4), mock_agent).key() == ("Move", 1, -1)
+        assert Move(Location(4, 5), mock_agent, move_franklin=True).key() == ("EscortMove", -1, 0)
+
+        # the key does not change once the agent has moved
+        move_action = Move(Location(6, 5), mock_agent)
+        key = move_action.key()
+        mock_agent.get_location.return_value = Location(6, 5)
+        assert move_action.key() == key
+
+    def test_escort_moves_use_free_cells(self):
+        """Test that escorting moves need free cells for both agents and leave Franklin in place."""
+        from model.earth import Earth
+        from model.agents.franklin import Franklin
+        from model.agents.bridge import Bridge
+        from model.agents.sue_storm import SueStorm
+
+        earth = Earth()
+        sue = SueStorm(Location(0, 0))
+        franklin = Franklin(Location(0, 1))
+        for agent in [sue, franklin, Bridge(Location(29, 2), health=1.0)]:
+            earth.set_agent(agent, agent.get_location())
+
+        moves = Move.escort_moves(sue, franklin, earth)
+        # neither can step onto the other, and Franklin can not step onto the bridge
+        assert sorted(move.key()[1:] for move in moves) == [(-1, -1), (-1, 0), (1, -1), (1, 0), (1, 1)]
+        assert franklin.get_location() == Location(0, 1)
+
+        move = next(move for move in moves if move.key() == ("EscortMove", -1, -1))
+        move.execute(earth)
+        assert earth.get_agent(Location(29, 29)) is sue
+        assert earth.get_agent(Location(29, 0)) is franklin
+        assert franklin.get_location() == Location(29, 0)
+        assert earth.get_agent(Location(0, 1)) is None
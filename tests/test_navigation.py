@@ -0,0 +1,89 @@
+import pytest
+from unittest.mock import Mock
+
+from model.navigation import Navigation, UNREACHABLE
+from model.location import Location
+from model.agents.agent import Agent, AgentRole
+
+
+def make_agent(role):
+    agent = Mock(spec=Agent)
+    agent.get_agent_role.return_value = role
+    return agent
+
+
+@pytest.fixture
+def navigation():
+    return Navigation(10, 10)
+
+
+def test_distance_is_chebyshev_on_empty_torus(navigation):
+    navigation.update_cell(2, 2, make_agent(AgentRole.BRIDGE))
+
+    assert navigation.distance(Location(2, 2), [AgentRole.BRIDGE]) == 0
+    assert navigation.distance(Location(5, 4), [AgentRole.BRIDGE]) == 3
+    # wraps around the edges
+    assert navigation.distance(Location(9, 9), [AgentRole.BRIDGE]) == 3
+
+
+def test_next_step_moves_closer(navigation):
+    navigation.update_cell(2, 2, make_agent(AgentRole.FRANKLIN))
+
+    location = Location(7, 5)
+    step = navigation.next_step(location, [AgentRole.FRANKLIN])
+
+    assert step.dist(location) == 1
+    assert navigation.distance(step, [AgentRole.FRANKLIN]) == navigation.distance(location, [AgentRole.FRANKLIN]) - 1
+
+
+def test_next_step_at_target_is_none(navigation):
+    navigation.update_cell(2, 2, make_agent(AgentRole.FRANKLIN))
+    assert navigation.next_step(Location(2, 2), [AgentRole.FRANKLIN]) is None
+
+
+def test_no_target_is_unreachable(navigation):
+    assert navigation.distance(Location(1, 1), [AgentRole.BRIDGE]) == UNREACHABLE
+    assert navigation.next_step(Location(1, 1), [AgentRole.BRIDGE]) is None
+
+
+def test_structures_block_paths(navigation):
+    navigation.update_cell(0, 0, make_agent(AgentRole.FRANKLIN))
+    # wall of headquarters around Franklin except one gap at (1, 1)
+    for x, y in [(9, 9), (0, 9), (1, 9), (9, 0), (1, 0), (9, 1), (0, 1)]:
+        navigation.update_cell(x, y, make_agent(AgentRole.HEADQUARTERS))
+
+    assert navigation.distance(Location(2, 0), [AgentRole.FRANKLIN]) == 2
+    assert navigation.distance(Location(1, 1), [AgentRole.FRANKLIN]) == 1
+
+
+def test_incremental_update_matches_rebuild(navigation):
+    navigation.update_cell(2, 2, make_agent(AgentRole.BRIDGE))
+    navigation.distance(Location(0, 0), [AgentRole.BRIDGE])
+
+    # a new bridge only shrinks distances, so the field is relaxed in place
+    navigation.update_cell(7, 7, make_agent(AgentRole.BRIDGE))
+    incremental = navigation.get_field([AgentRole.BRIDGE]).distance.copy()
+
+    fresh = Navigation(10, 10)
+    fresh.update_cell(2, 2, make_agent(AgentRole.BRIDGE))
+    fresh.update_cell(7, 7, make_agent(AgentRole.BRIDGE))
+
+    assert (incremental == fresh.get_field([AgentRole.BRIDGE]).distance).all()
+
+
+def test_moved_target_rebuilds_field(navigation):
+    franklin = make_agent(AgentRole.FRANKLIN)
+    navigation.update_cell(2, 2, franklin)
+    assert navigation.distance(Location(8, 2), [AgentRole.FRANKLIN]) == 4
+
+    navigation.update_cell(2, 2, None)
+    navigation.update_cell(8, 2, franklin)
+    assert navigation.distance(Location(8, 2), [AgentRole.FRANKLIN]) == 0
+
+
+def test_footprint_reaches_target_with_its_edge(navigation):
+    navigation.update_cell(5, 5, make_agent(AgentRole.BRIDGE))
+
+    # a 3x3 footprint centred one cell away already covers the bridge
+    assert navigation.distance(Location(6, 6), [AgentRole.BRIDGE], radius=1) == 0
+    assert navigation.distance(Location(8, 5), [AgentRole.BRIDGE], radius=1) == 2
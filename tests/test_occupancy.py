@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from model.occupancy import Occupancy
+
+
+def brute_force_first_region(occupied, n, r):
+    """The original window scan used by the simulator."""
+    size = 2 * r + 1
+    for y in range(n):
+        for x in range(n):
+            if all((((x + dx) % n, (y + dy) % n) not in occupied) for dy in range(size) for dx in range(size)):
+                return (x + r) % n, (y + r) % n
+    return None
+
+
+@pytest.fixture
+def occupancy():
+    return Occupancy(8, 8)
+
+
+def test_initially_free(occupancy):
+    assert occupancy.free_count() == 64
+    assert occupancy.is_free(3, 3)
+    assert occupancy.find_empty_region(1) == (1, 1)
+
+
+def test_set_occupied_updates_free_list(occupancy):
+    occupancy.set_occupied(2, 3, True)
+    assert not occupancy.is_free(2, 3)
+    assert occupancy.free_count() == 63
+
+    # setting the same state twice does nothing
+    occupancy.set_occupied(2, 3, True)
+    assert occupancy.free_count() == 63
+
+    occupancy.set_occupied(2, 3, False)
+    assert occupancy.is_free(2, 3)
+    assert occupancy.free_count() == 64
+
+
+def test_random_free_cell_never_returns_occupied(occupancy):
+    for x in range(8):
+        for y in range(8):
+            if (x, y) != (5, 6):
+                occupancy.set_occupied(x, y, True)
+
+    for _ in range(20):
+        assert occupancy.random_free_cell() == (5, 6)
+
+
+def test_full_grid_reports_no_space(occupancy):
+    for x in range(8):
+        for y in range(8):
+            occupancy.set_occupied(x, y, True)
+
+    assert occupancy.random_free_cell() is None
+    assert occupancy.find_empty_region(0) is None
+    assert occupancy.find_empty_region(1, randomise=True) is None
+
+
+@pytest.mark.parametrize("r", [0, 1, 2])
+def test_first_region_matches_window_scan(occupancy, r):
+    rng = random.Random(r)
+    occupied = set()
+    for _ in range(12):
+        cell = (rng.randrange(8), rng.randrange(8))
+        occupied.add(cell)
+        occupancy.set_occupied(*cell, True)
+
+    assert occupancy.find_empty_region(r) == brute_force_first_region(occupied, 8, r)
+
+
+def test_random_region_is_empty(occupancy):
+    occupancy.set_occupied(0, 0, True)
+    occupancy.set_occupied(4, 4, True)
+
+    for _ in range(20):
+        cx, cy = occupancy.find_empty_region(1, randomise=True)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                assert occupancy.is_free(cx + dx, cy + dy)
@@ -0,0 +1,43 @@
+import pytest
+
+from model.agents.prioritised_sweeping import PrioritisedSweeping
+from model.agents.q_table import QTable
+
+
+def chain(length):
+    """A Q-table and a planner that has seen one walk along a chain ending with a reward of 1."""
+    table = QTable()
+    planner = PrioritisedSweeping(table)
+    go = table.action_id("go")
+    states = [table.state_id(i) for i in range(length + 1)]
+    for i in range(length):
+        done = i == length - 1
+        planner.observe(states[i], go, 1.0 if done else 0.0, states[i + 1], done, gamma=0.9)
+    return table, planner, states, go
+
+
+def test_observe_queues_only_surprising_entries():
+    table, planner, states, go = chain(3)
+
+    assert len(planner) == 1
+    assert table.get_value(states[0], go) == 0.0
+
+
+def test_planning_propagates_the_reward_backwards():
+    table, planner, states, go = chain(3)
+
+    updates = planner.plan(alpha=1.0, gamma=0.9, max_updates=10)
+
+    assert updates == 3
+    assert table.get_value(states[2], go) == 1.0
+    assert table.get_value(states[1], go) == pytest.approx(0.9)
+    assert table.get_value(states[0], go) == pytest.approx(0.81)
+    assert len(planner) == 0
+
+
+def test_planning_respects_the_update_budget():
+    table, planner, states, go = chain(3)
+
+    assert planner.plan(alpha=1.0, gamma=0.9, max_updates=1) == 1
+    assert table.get_value(states[1], go) == 0.0
+    assert len(planner) == 1
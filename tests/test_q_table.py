@@ -0,0 +1,149 @@
+import numpy as np
+
+from controller.config.learning_config import LearningConfig
+from model.agents.q_table import QTable
+from model.agents.silver_surfer import SilverSurfer
+from model.agents.sue_storm import SueStorm
+from model.agents.the_thing import TheThing
+
+
+def test_missing_entries_read_as_zero_and_are_added():
+    table = QTable()
+
+    assert table[("s", ("Move", 1, 0))] == 0.0
+    assert len(table) == 1
+    assert ("s", ("Move", 1, 0)) in table
+
+
+def test_peek_reads_without_adding_entries():
+    table = QTable({("s", ("Move", 1, 0)): 2.5})
+
+    assert table.peek(("s", ("Move", 1, 0))) == 2.5
+    assert table.peek(("t", ("Move", 0, 1))) == 0.0
+    assert len(table) == 1 and table.take_changes().keys() == {("s", ("Move", 1, 0))}
+
+
+def test_table_grows_past_its_initial_size():
+    table = QTable({(i, ("Move", j, 0)): float(i * j) for i in range(10) for j in range(5)}, states=2, actions=2)
+
+    assert len(table) == 50
+    assert table[(9, ("Move", 4, 0))] == 36.0
+    assert dict(table.items())[(3, ("Move", 2, 0))] == 6.0
+
+
+def test_batch_update_bootstraps_from_seen_actions_only():
+    table = QTable({("b", "left"): -2.0, ("b", "right"): -1.0})
+    a, b = table.state_id("a"), table.state_id("b")
+    go = table.action_id("go")
+
+    deltas = table.batch_update(np.array([a, a]), np.array([go, go]), np.array([1.0, 1.0]),
+                                np.array([b, b]), np.array([False, True]), alpha=0.5, gamma=0.5)
+
+    # -1 is the best seen value of b, nothing is bootstrapped after the episode ended,
+    # and the two updates of the same entry are averaged
+    assert np.allclose(deltas, [0.125, 0.25])
+    assert table[("a", "go")] == 0.375
+    assert len(table) == 3
+
+
+def test_batch_update_averages_duplicate_samples():
+    table = QTable()
+    a, go = table.state_id("a"), table.action_id("go")
+
+    table.batch_update(np.array([a] * 4), np.array([go] * 4), np.ones(4), np.array([a] * 4), np.ones(4, dtype=bool),
+                       alpha=0.5, gamma=0.9)
+
+    assert table[("a", "go")] == 0.5
+
+
+def test_heads_restrict_bootstrapping_to_the_class_actions():
+    table = QTable({("b", "heal"): 5.0, ("b", "move"): 1.0})
+    healer, other = table.head_id("SueStorm"), table.head_id("TheThing")
+    table.allow(healer, table.action_id("heal"))
+    table.allow(healer, table.action_id("move"))
+    table.allow(other, table.action_id("move"))
+    b = table.state_id("b")
+
+    assert table.best_values(np.array([b, b]), np.array([healer, other])).tolist() == [5.0, 1.0]
+    assert table.best_values(np.array([b])).tolist() == [5.0]
+
+
+def visited_table():
+    table = QTable({(state, "go"): float(state) for state in range(5)})
+    for state, visits in enumerate([3, 1, 1, 2, 5]):
+        for _ in range(visits):
+            table.visit(table.state_id(state), table.action_id("go"))
+    return table
+
+
+def test_heroes_share_a_table_name_when_enabled(monkeypatch):
+    assert SueStorm.table_name() == "SueStorm"
+
+    monkeypatch.setattr(LearningConfig, "share_hero_q", True)
+
+    assert SueStorm.table_name() == TheThing.table_name() == "Hero"
+    assert SilverSurfer.table_name() == "SilverSurfer"
+
+
+def test_lfu_eviction_drops_the_least_visited_entries():
+    table = visited_table()
+
+    assert table.evict(capacity=4, policy="lfu", slack=0.25) == 2
+
+    assert sorted(state for state, _ in table) == [0, 3, 4]
+    assert table[(4, "go")] == 4.0
+    assert table.get_visits(table.state_id(4), table.action_id("go")) == 5
+    assert table.stats()["states"] == 3
+    assert table.stats()["evicted"] == 2
+
+
+def test_age_eviction_drops_the_least_recently_visited_entries():
+    table = visited_table()
+
+    table.evict(capacity=4, policy="age", slack=0.25)
+
+    assert sorted(state for state, _ in table) == [2, 3, 4]
+
+
+def test_tables_under_their_capacity_are_untouched():
+    table = visited_table()
+
+    assert table.evict(capacity=5) == 0
+    assert len(table) == 5
+    assert table.stats()["entries"] == 5
+
+
+def test_changes_are_taken_once_and_deletions_are_nan():
+    table = QTable({("a", "go"): 1.0, ("b", "go"): 2.0})
+    assert table.take_changes() == {("a", "go"): 1.0, ("b", "go"): 2.0}
+
+    table.add_value(table.state_id("a"), table.action_id("go"), 0.5)
+    del table[("b", "go")]
+    changes = table.take_changes()
+
+    assert changes[("a", "go")] == 1.5 and np.isnan(changes[("b", "go")])
+    assert table.take_changes() == {}
+
+
+def test_eviction_deletes_only_the_evicted_entries():
+    table = QTable({(i, "go"): float(i) for i in range(10)})
+    table.take_changes()
+
+    table.evict(5, slack=0.0)
+    table[(9, "go")] = 10.0
+    changes = table.take_changes()
+
+    assert changes.keys() == {(i, "go") for i in range(5)} | {(9, "go")}
+    assert all(np.isnan(changes[(i, "go")]) for i in range(5)) and changes[(9, "go")] == 10.0
+
+
+def test_deletions_survive_the_compaction_of_an_eviction():
+    table = QTable({(i, "go"): float(i) for i in range(10)})
+    table.take_changes()
+
+    del table[(9, "go")]
+    table.evict(5, slack=0.0)
+    changes = table.take_changes()
+
+    assert changes.keys() == {(i, "go") for i in range(4)} | {(9, "go")}
+    assert all(np.isnan(value) for value in changes.values())
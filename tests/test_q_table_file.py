@@ -0,0 +1,102 @@
+import json
+import os
+import pickle
+
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from controller.migrate_q_tables import migrate_q_table
+from model.agents.q_table import QTable
+from model.agents.q_table_file import (QTableFileError, load_entries, load_q_table_file, manifest_path, save_delta,
+                                       save_q_table, table_path)
+
+
+ENTRIES = {
+    ((0, 1, 2, 0), ("Move", 1, -1)): 0.5,
+    ((0, 1, 2, 0), ("Attack", 0, 0)): -1.25,
+    ((3, 0, 0, 2), ("Heal", 1, 0)): 2.0,
+    (None, ("Move", -1, -11)): 0.125,
+}
+
+
+def test_round_trip_keeps_keys_and_values(tmp_path):
+    path = table_path(str(tmp_path), "Galactus")
+    save_q_table(path, QTable(ENTRIES))
+
+    table = load_q_table_file(path)
+
+    assert len(table) == len(ENTRIES)
+    assert dict(table.items()) == ENTRIES
+    assert QTable(table)[((3, 0, 0, 2), ("Heal", 1, 0))] == 2.0
+
+
+def test_memory_mapped_lookup_finds_entries_by_binary_search(tmp_path):
+    path = table_path(str(tmp_path), "Galactus")
+    save_q_table(path, ENTRIES)
+
+    table = load_q_table_file(path, mmap=True)
+
+    assert isinstance(np.load(path, mmap_mode="r"), np.memmap)
+    assert table[((0, 1, 2, 0), ("Attack", 0, 0))] == -1.25
+    assert table.get(((9, 9, 9, 9), ("Move", 0, 0)), 0.0) == 0.0
+    with pytest.raises(KeyError):
+        table[((0, 1, 2, 0), ("Move", 0, 0))]
+
+
+def test_corrupted_or_unknown_files_are_rejected(tmp_path):
+    path = table_path(str(tmp_path), "Galactus")
+    save_q_table(path, ENTRIES)
+
+    records = np.load(path)
+    records["value"][0] += 1.0
+    np.save(path, records)
+    with pytest.raises(QTableFileError, match="checksum"):
+        load_q_table_file(path)
+    assert len(load_q_table_file(path, verify=False)) == len(ENTRIES)
+
+    with open(manifest_path(path)) as f:
+        manifest = json.load(f)
+    manifest["version"] += 1
+    with open(manifest_path(path), "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(QTableFileError, match="unsupported"):
+        load_q_table_file(path)
+
+
+@pytest.mark.parametrize("renames", [1, 2])
+def test_a_rewrite_interrupted_between_renames_leaves_a_readable_table(tmp_path, monkeypatch, renames):
+    path = table_path(str(tmp_path), "Galactus")
+    save_q_table(path, ENTRIES)
+    save_delta(path, {(None, ("Move", -1, -11)): 1.0}, 1)
+    expected = {**ENTRIES, (None, ("Move", -1, -11)): 1.0}
+
+    replace, calls = os.replace, []
+
+    def crash_after(source, target):
+        if len(calls) == renames:
+            raise OSError("crashed")
+        calls.append(target)
+        replace(source, target)
+
+    monkeypatch.setattr(os, "replace", crash_after)
+    with pytest.raises(OSError):
+        save_q_table(path, expected)
+    monkeypatch.undo()
+
+    assert dict(load_q_table_file(path).items()) == expected
+    assert dict(load_q_table_file(path, mmap=True, verify=False).items()) == expected
+    assert load_entries(path) == expected
+
+
+def test_migration_converts_pickled_tables(tmp_path):
+    legacy = tmp_path / "ReedRichards.pkl"
+    with open(legacy, "wb") as f:
+        pickle.dump(defaultdict(float, ENTRIES), f)
+
+    path = migrate_q_table(str(legacy), remove=True)
+
+    assert path == table_path(str(tmp_path), "ReedRichards")
+    assert dict(load_q_table_file(path).items()) == ENTRIES
+    assert not legacy.exists()
@@ -0,0 +1,120 @@
+import math
+import os
+import pickle
+import sqlite3
+
+from collections import defaultdict
+
+import pytest
+
+from model.agents.q_table import QTable
+from model.agents.q_table_storage import DirectoryStorage, MemoryStorage, SQLiteStorage, SQLITE_FILE, get_storage
+
+
+ENTRIES = {
+    ((0, 1, 2, 0), ("Move", 1, -1)): 0.5,
+    ((0, 1, 2, 0), ("Attack", 0, 0)): -1.25,
+    (None, ("Move", -1, -11)): 0.125,
+}
+
+
+@pytest.fixture(params=["memory", "directory", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStorage()
+    if request.param == "directory":
+        return DirectoryStorage(str(tmp_path), compact_every=2)
+    return SQLiteStorage(str(tmp_path / SQLITE_FILE))
+
+
+def test_tables_are_saved_and_updated(storage):
+    assert not storage.exists("Galactus") and dict(storage.load("Galactus")) == {}
+
+    storage.save("Galactus", ENTRIES)
+    storage.checkpoint("Galactus", {((0, 1, 2, 0), ("Attack", 0, 0)): math.nan, ((5, 0, 0, 1), ("Move", 0, 0)): 2.0})
+    storage.checkpoint("Galactus", {(None, ("Move", -1, -11)): 0.25})
+
+    assert storage.exists("Galactus") and not storage.exists("ReedRichards")
+    assert dict(storage.view("Galactus").items()) == {((0, 1, 2, 0), ("Move", 1, -1)): 0.5,
+                                                      ((5, 0, 0, 1), ("Move", 0, 0)): 2.0,
+                                                      (None, ("Move", -1, -11)): 0.25}
+
+    storage.checkpoint("Galactus", {(None, ("Move", 0, 0)): 1.0}, full=True)
+    assert dict(storage.load("Galactus").items()) == {(None, ("Move", 0, 0)): 1.0}
+
+
+def test_directory_storage_reads_legacy_pickles_until_the_first_checkpoint(tmp_path):
+    with open(tmp_path / "Galactus.pkl", "wb") as f:
+        pickle.dump(defaultdict(float, ENTRIES), f)
+    storage = DirectoryStorage(str(tmp_path))
+
+    assert storage.exists("Galactus") and dict(storage.load("Galactus").items()) == ENTRIES
+
+    storage.write_changes("Galactus", {(None, ("Move", -1, -11)): 1.0})
+    assert dict(storage.load("Galactus").items()) == {**ENTRIES, (None, ("Move", -1, -11)): 1.0}
+
+
+def test_sqlite_connections_share_one_database_in_wal_mode(tmp_path):
+    path = str(tmp_path / SQLITE_FILE)
+    writer, reader = SQLiteStorage(path), SQLiteStorage(path)
+
+    writer.save("Galactus", ENTRIES)
+
+    assert reader.load("Galactus") == ENTRIES
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_storages_are_chosen_by_kind_and_directory(tmp_path):
+    assert isinstance(get_storage("memory", str(tmp_path)), MemoryStorage)
+    assert get_storage("memory", str(tmp_path)) is get_storage("memory", str(tmp_path))
+    assert isinstance(get_storage("sqlite", str(tmp_path)), SQLiteStorage)
+    with pytest.raises(ValueError):
+        get_storage("redis", str(tmp_path))
+
+
+def test_sqlite_checkpoints_after_an_eviction_keep_other_workers_entries(tmp_path):
+    path = str(tmp_path / SQLITE_FILE)
+    first, second = SQLiteStorage(path), SQLiteStorage(path)
+    table = QTable({(i, "go"): float(i) for i in range(10)})
+    first.checkpoint("Galactus", table.take_changes())
+    second.checkpoint("Galactus", {("other", "go"): 1.0})
+
+    table.evict(5, slack=0.0)
+    first.checkpoint("Galactus", table.take_changes())
+
+    assert second.load("Galactus") == {**{(i, "go"): float(i) for i in range(5, 10)}, ("other", "go"): 1.0}
+
+
+def test_directory_checkpoints_survive_a_crash_between_the_two_renames(tmp_path, monkeypatch):
+    storage = DirectoryStorage(str(tmp_path), compact_every=2)
+    storage.save("Galactus", ENTRIES)
+    storage.write_changes("Galactus", {(None, ("Move", -1, -11)): 1.0})
+
+    replace = os.replace
+
+    def crash_on_the_array(source, target):
+        if target == storage.path("Galactus"):
+            raise OSError("crashed")
+        replace(source, target)
+
+    monkeypatch.setattr(os, "replace", crash_on_the_array)
+    with pytest.raises(OSError):
+        storage.write_changes("Galactus", {((5, 0, 0, 1), ("Move", 0, 0)): 2.0})
+    monkeypatch.undo()
+
+    assert DirectoryStorage(str(tmp_path)).load("Galactus") == {**ENTRIES, (None, ("Move", -1, -11)): 1.0,
+                                                               ((5, 0, 0, 1), ("Move", 0, 0)): 2.0}
+
+
+def test_unreadable_directory_tables_start_again_empty(tmp_path, caplog):
+    storage = DirectoryStorage(str(tmp_path))
+    storage.save("Galactus", ENTRIES)
+    with open(storage.path("Galactus"), "r+b") as f:
+        f.seek(-4, os.SEEK_END)
+        f.write(b"\xff\xff\xff\xff")
+
+    assert dict(storage.load("Galactus")) == {} and "starting it empty" in caplog.text
+    assert os.path.exists(storage.path("Galactus") + ".corrupt")
+
+    storage.write_changes("Galactus", {(None, ("Move", 0, 0)): 1.0})
+    assert dict(DirectoryStorage(str(tmp_path)).load("Galactus").items()) == {(None, ("Move", 0, 0)): 1.0}
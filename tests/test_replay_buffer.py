@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from model.agents.replay_buffer import ReplayBuffer
+
+
+def test_buffer_overwrites_oldest_transitions():
+    buffer = ReplayBuffer(3)
+    for i in range(5):
+        buffer.add(i, 0, float(i), i + 1, False)
+
+    assert len(buffer) == 3
+    assert buffer.get_added() == 5
+
+    np.random.seed(0)
+    states, _, rewards, next_states, _, _ = buffer.sample(50)
+    assert set(states.tolist()) == {2, 3, 4}
+    assert np.array_equal(rewards, states.astype(float))
+    assert np.array_equal(next_states, states + 1)
+
+
+def test_sampling_an_empty_buffer_fails():
+    with pytest.raises(ValueError):
+        ReplayBuffer(4).sample(1)
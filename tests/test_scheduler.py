@@ -0,0 +1,98 @@
+import pytest
+from unittest.mock import Mock
+
+from model.scheduler import TimerWheel
+
+
+@pytest.fixture
+def wheel():
+    return TimerWheel(slots=4)
+
+
+def test_event_fires_after_delay(wheel):
+    callback = Mock()
+    wheel.schedule(3, callback, "surfer")
+
+    wheel.advance()
+    wheel.advance()
+    callback.assert_not_called()
+
+    assert wheel.advance() == 1
+    callback.assert_called_once_with("surfer")
+    assert len(wheel) == 0
+
+
+def test_events_beyond_one_revolution(wheel):
+    fired = []
+    wheel.schedule(2, fired.append, "near")
+    wheel.schedule(6, fired.append, "far")
+
+    for _ in range(5):
+        wheel.advance()
+    assert fired == ["near"]
+
+    wheel.advance()
+    assert fired == ["near", "far"]
+
+
+def test_same_tick_fires_in_scheduling_order(wheel):
+    fired = []
+    for name in ["a", "b", "c"]:
+        wheel.schedule(1, fired.append, name)
+
+    wheel.advance()
+    assert fired == ["a", "b", "c"]
+
+
+def test_cancel(wheel):
+    callback = Mock()
+    timer = wheel.schedule(2, callback)
+    wheel.cancel(timer)
+    assert len(wheel) == 0
+
+    wheel.advance()
+    wheel.advance()
+    callback.assert_not_called()
+
+
+def test_callback_can_reschedule(wheel):
+    fired = []
+
+    def retry():
+        fired.append(wheel.now())
+        if len(fired) < 3:
+            wheel.schedule(1, retry)
+
+    wheel.schedule(1, retry)
+    for _ in range(5):
+        wheel.advance()
+
+    assert fired == [1, 2, 3]
+
+
+def test_clear(wheel):
+    callback = Mock()
+    wheel.schedule(1, callback)
+    wheel.advance()
+    wheel.schedule(1, callback)
+    wheel.clear()
+
+    assert wheel.now() == 0
+    assert len(wheel) == 0
+    wheel.advance()
+    callback.assert_called_once()
+
+
+def test_snapshot_restores_clock_and_pending_events(wheel):
+    callback = Mock()
+    wheel.schedule(2, callback, "intro")
+    wheel.advance()
+    snapshot = wheel.snapshot()
+
+    wheel.advance()
+    callback.assert_called_once_with("intro")
+
+    wheel.restore(snapshot)
+    assert wheel.now() == 1 and len(wheel) == 1
+    wheel.advance()
+    assert callback.call_count == 2
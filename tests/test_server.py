@@ -0,0 +1,107 @@
+import asyncio
+import json
+import threading
+
+import numpy as np
+
+from controller.server import FrameEncoder, SimulationServer, EMPTY
+from controller.simulation_listener import SimulationListener
+from model.earth import Earth
+from model.location import Location
+from model.agents.bridge import Bridge
+from model.agents.sue_storm import SueStorm
+from view.remote_viewer import RemoteGrid
+
+
+COLOURS = {SueStorm: "green", Bridge: "magenta", None: "white"}
+
+
+class FakeSimulator:
+    """Plays a few moves of Sue Storm once a viewer is watching."""
+
+    def __init__(self, earth):
+        self.earth = earth
+        self.listeners: list[SimulationListener] = []
+        self.watching = threading.Event()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def stop(self):
+        pass
+
+    def run(self):
+        self.watching.wait(timeout=5)
+        sue = self.earth.get_agent(Location(1, 1))
+        for step in range(1, 6):
+            self.earth.set_agent(None, sue.get_location())
+            sue.set_location(Location(1 + step, 1))
+            self.earth.set_agent(sue, sue.get_location())
+            for listener in self.listeners:
+                listener.on_step(self.earth, 1, step)
+        for listener in self.listeners:
+            listener.on_episode({"episode": 1, "win_status": 1, "length": 5, "reward": 1.0})
+
+
+def make_earth():
+    earth = Earth()
+    for agent in [SueStorm(Location(1, 1)), Bridge(Location(5, 5), health=1.0)]:
+        earth.set_agent(agent, agent.get_location())
+    return earth
+
+
+def test_frame_diff():
+    earth = make_earth()
+    encoder = FrameEncoder([SueStorm, Bridge])
+    frame = encoder.encode(earth)
+
+    assert frame.shape == (30, 30)
+    assert frame[1, 1] == 0 and frame[5, 5] == 1
+    assert (frame == EMPTY).sum() == 30 * 30 - 2
+
+    empty = np.full_like(frame, EMPTY)
+    assert sorted(FrameEncoder.diff(empty, frame)) == [[1, 1, 0], [5, 5, 1]]
+    assert FrameEncoder.diff(frame, frame) == []
+
+
+def test_viewer_receives_the_final_grid(tmp_path):
+    earth = make_earth()
+    simulator = FakeSimulator(earth)
+    server = SimulationServer(simulator, COLOURS, 30, 30, unix_path=str(tmp_path / "sim.sock"), max_fps=None)
+
+    async def watch():
+        messages = []
+        reader, writer = await asyncio.open_unix_connection(server.get_address())
+        while True:
+            message = json.loads(await reader.readline())
+            messages.append(message)
+            if message["type"] == "hello":
+                simulator.watching.set()
+            if message["type"] == "bye":
+                break
+        writer.close()
+        return messages
+
+    async def scenario():
+        await server.start()
+        viewer = asyncio.create_task(watch())
+        await asyncio.to_thread(simulator.run)
+        await server.close()
+        return await viewer
+
+    messages = asyncio.run(scenario())
+
+    hello = messages[0]
+    assert hello["classes"] == ["SueStorm", "Bridge"]
+    assert hello["colours"] == {"SueStorm": "green", "Bridge": "magenta"}
+    assert [m["type"] for m in messages[-2:]] == ["episode", "bye"]
+
+    # frames may be merged, but applying them in order rebuilds the grid
+    grid = RemoteGrid(hello["width"], hello["height"], hello["classes"])
+    for message in messages:
+        if message["type"] == "frame":
+            grid.apply(message["cells"])
+
+    assert type(grid.get_agent(Location(6, 1))).__name__ == "SueStorm"
+    assert type(grid.get_agent(Location(5, 5))).__name__ == "Bridge"
+    assert grid.get_agent(Location(1, 1)) is None
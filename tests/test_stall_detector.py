@@ -0,0 +1,33 @@
+from controller.stall_detector import StallDetector
+
+
+def test_oscillation_without_progress_stalls_after_the_window():
+    detector = StallDetector(window=4)
+    bridges = (0.5, 0.5)
+
+    stalled = [detector.record(bridges, step % 2) for step in range(6)]
+
+    assert stalled == [False, False, False, False, True, True]
+    assert detector.steps_without_progress() == 5
+
+
+def test_new_states_or_bridge_changes_are_not_a_stall():
+    detector = StallDetector(window=3)
+
+    # an Earth that keeps reaching new states is still going somewhere
+    assert not any(detector.record((0.5,), step) for step in range(10))
+
+    detector.reset()
+    health = 0.5
+    for step in range(10):
+        health += 0.01 if step % 3 == 0 else 0.0
+        assert not detector.record((health,), step % 2)
+
+
+def test_states_older_than_the_window_are_forgotten():
+    detector = StallDetector(window=2)
+    for state in (1, 2, 3, 4):
+        detector.record((1.0,), state)
+
+    assert not detector.record((1.0,), 1)
+    assert detector.record((1.0,), 4)
@@ -0,0 +1,31 @@
+from model.agents.bridge import Bridge
+from model.agents.reed_richards import ReedRichards
+from model.agents.silver_surfer import SilverSurfer
+from model.location import Location
+
+
+def test_states_of_several_agents_are_encoded_together(earth, place):
+    place(earth, Bridge(Location(2, 0), 0.5))
+    place(earth, Bridge(Location(20, 20), 1.0))
+    reed = place(earth, ReedRichards(Location(0, 0)))
+    surfer = place(earth, SilverSurfer(Location(5, 11)))
+
+    states = earth.get_states([reed, surfer])
+
+    # Reed: region 0, bridge 2 cells away at half health, Silver Surfer 11 cells away
+    assert states[0] == (0, 0, 1, 2)
+    # Silver Surfer: region 13, nearest bridge 9 cells away at half health, Reed 11 cells away
+    assert states[1] == (13, 2, 1, 2)
+    assert reed.get_state(earth) == states[0]
+
+
+def test_agents_leaving_the_grid_are_no_longer_seen(earth, place):
+    near = place(earth, Bridge(Location(0, 3), 0.1))
+    place(earth, Bridge(Location(0, 5), 1.0))
+    reed = place(earth, ReedRichards(Location(0, 0)))
+    assert reed.get_state(earth)[1:3] == (1, 0)
+
+    earth.set_agent(None, near.get_location())
+
+    assert reed.get_state(earth)[1:3] == (1, 2)
+    assert earth.encode_states([reed]).shape == (1, 4)
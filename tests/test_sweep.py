@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from controller.config.learning_config import LearningConfig
+from controller.config.galactus_config import GalactusConfig
+from controller.sweep import (Sweep, apply_overrides, config_id, episodes_to_convergence, grid_configurations,
+                              parse_parameter, random_configurations, RESULT_FILE)
+
+
+def test_parse_parameter():
+    assert parse_parameter("LearningConfig.alpha=0.1,0.2") == ("LearningConfig.alpha", [0.1, 0.2])
+    assert parse_parameter("GalactusConfig.gal_intro_step=5,10") == ("GalactusConfig.gal_intro_step", [5, 10])
+    assert parse_parameter("LearningConfig.gamma=0.5:0.99") == ("LearningConfig.gamma", (0.5, 0.99))
+
+    with pytest.raises(ValueError):
+        parse_parameter("alpha=0.1")
+
+
+def test_apply_overrides(monkeypatch):
+    monkeypatch.setattr(LearningConfig, "alpha", LearningConfig.alpha)
+    monkeypatch.setattr(GalactusConfig, "gal_intro_step", GalactusConfig.gal_intro_step)
+
+    apply_overrides({"LearningConfig.alpha": 0.3, "GalactusConfig.gal_intro_step": 7.0})
+    assert LearningConfig.alpha == 0.3
+    assert GalactusConfig.gal_intro_step == 7 and isinstance(GalactusConfig.gal_intro_step, int)
+
+    with pytest.raises(ValueError):
+        apply_overrides({"LearningConfig.beta": 1.0})
+    with pytest.raises(ValueError):
+        apply_overrides({"NoSuchConfig.alpha": 1.0})
+
+
+def test_configurations():
+    grid = grid_configurations({"B.x": [1, 2], "A.y": [0.1, 0.2, 0.3]})
+    assert len(grid) == 6
+    assert grid[0] == {"A.y": 0.1, "B.x": 1}
+
+    drawn = random_configurations({"A.y": (0.0, 1.0), "B.x": [1, 2]}, 5, seed=3)
+    assert drawn == random_configurations({"A.y": (0.0, 1.0), "B.x": [1, 2]}, 5, seed=3)
+    assert all(0.0 <= configuration["A.y"] <= 1.0 and configuration["B.x"] in (1, 2) for configuration in drawn)
+
+    # ids do not depend on key order
+    assert config_id({"a": 1, "b": 2}) == config_id({"b": 2, "a": 1})
+
+
+def test_episodes_to_convergence():
+    assert episodes_to_convergence([], 5) == 0
+    assert episodes_to_convergence([0] * 20, 5) == 1
+    # the windowed win rate settles at 1 from the tenth episode on
+    assert episodes_to_convergence([0] * 5 + [1] * 15, 5) == 10
+
+
+def test_sweep_resumes(tmp_path):
+    configurations = grid_configurations({"LearningConfig.alpha": [0.1, 0.2]})
+    sweep = Sweep(configurations, str(tmp_path), episodes=1)
+    assert len(sweep.pending()) == 2
+
+    # pretend the first configuration finished before an interruption
+    done = config_id(configurations[0])
+    os.makedirs(sweep.get_run_dir(done))
+    result = {"config_id": done, "configuration": configurations[0], "episodes": 1, "win_rate": 1.0,
+              "mean_length": 10.0, "mean_hero_reward": 1.0, "mean_villain_reward": 0.0,
+              "convergence_episode": 1, "steps_per_sec": 100.0, "wall_time": 0.1}
+    with open(os.path.join(sweep.get_run_dir(done), RESULT_FILE), "w") as f:
+        json.dump(result, f)
+
+    sweep.save()
+    resumed = Sweep.load(str(tmp_path))
+    assert resumed.pending() == [config_id(configurations[1])]
+
+    resumed.write_summary()
+    with open(tmp_path / "summary.csv") as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("config_id,LearningConfig.alpha,episodes,win_rate")
+    assert lines[1].startswith(f"{done},0.1,1,1.0")
@@ -0,0 +1,52 @@
+from model.actions.attack import Attack
+from model.actions.move import Move
+from model.actions.repair import Repair
+from model.agents.bridge import Bridge
+from model.agents.galactus import Galactus
+from model.agents.silver_surfer import SilverSurfer
+from model.agents.the_thing import TheThing
+from model.location import Location
+from model.zobrist import ZobristHash, class_keys
+
+
+def rehash(earth):
+    """Hash the grid of an Earth from scratch."""
+    fresh = ZobristHash(earth.get_width(), earth.get_height())
+    for y, row in enumerate(earth.get_grid()):
+        for x, agent in enumerate(row):
+            if agent is not None:
+                fresh.update_cell(y * earth.get_width() + x, None, agent)
+    return fresh.value()
+
+
+def test_keys_depend_only_on_the_class_name():
+    assert class_keys("Bridge", 4) == class_keys("Bridge", 4)
+    assert class_keys("Bridge", 4) != class_keys("TheThing", 4)
+    assert all(0 <= key < 2 ** 64 for key in class_keys("Bridge", 4))
+
+
+def test_incremental_hash_matches_a_rehash(earth, place):
+    thing = place(earth, TheThing(Location(10, 10)))
+    surfer = place(earth, SilverSurfer(Location(11, 10)))
+    bridge = place(earth, Bridge(Location(9, 10), health=0.5))
+    assert earth.state_hash() == rehash(earth) != 0
+    snapshot = earth.snapshot()
+    before = earth.state_hash()
+
+    earth.register_action(Attack(Location(11, 10), thing))
+    earth.register_action(Repair(Location(9, 10), thing))
+    earth.register_action(Move(Location(12, 11), surfer))
+    earth.execute_actions()
+    assert earth.state_hash() == rehash(earth) != before
+
+    # Galactus's footprint overwrites the bridge and The Thing
+    galactus = place(earth, Galactus(Location(10, 11, 1)))
+    bridge._health = 0.1
+    assert earth.state_hash() == rehash(earth)
+
+    earth.restore(snapshot)
+    assert earth.state_hash() == rehash(earth) == before
+
+    for agent in (thing, surfer, bridge, galactus):
+        earth.set_agent(None, agent.get_location())
+    assert earth.state_hash() == 0
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import queue
+import socket
+import threading
+
+from typing import Optional
+
+from model.location import Location
+from view.gui import Gui
+
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteGrid:
+    """
+    Mirror of a remote simulation grid, rebuilt from the frames sent by a SimulationServer.
+
+    Cells hold one stand-in object per agent class named by the server, so the grid can be
+    drawn by the Gui exactly like a local environment.
+    """
+
+    def __init__(self, width: int, height: int, classes: list[str]) -> None:
+        """
+        Initialise an empty mirror.
+
+        Args:
+            width (int): The grid width.
+            height (int): The grid height.
+            classes (list[str]): The agent class names, in code order.
+        """
+        self.__width = width
+        self.__height = height
+        self.__stand_ins = [type(name, (), {})() for name in classes]
+        self.__grid: list[list[Optional[object]]] = [[None] * width for _ in range(height)]
+
+    def get_stand_in_classes(self) -> list[type]:
+        """
+        Returns the stand-in class of every agent class, in code order.
+
+        Returns:
+            list[type]: The stand-in classes.
+        """
+        return [type(stand_in) for stand_in in self.__stand_ins]
+
+    def apply(self, cells: list[list[int]]) -> None:
+        """
+        Applies a frame diff.
+
+        Args:
+            cells (list[list[int]]): [x, y, code] triples, a negative code for an empty cell.
+        """
+        for x, y, code in cells:
+            self.__grid[y][x] = self.__stand_ins[code] if code >= 0 else None
+
+    def get_agent(self, location: Location) -> Optional[object]:
+        """
+        Returns the stand-in at a location.
+
+        Args:
+            location (Location): The location to look up.
+
+        Returns:
+            Optional[object]: The stand-in of the agent class at the location, or None.
+        """
+        return self.__grid[location.get_y()][location.get_x()]
+
+    def get_height(self) -> int:
+        """Return the grid height."""
+        return self.__height
+
+    def get_width(self) -> int:
+        """Return the grid width."""
+        return self.__width
+
+
+class RemoteViewer:
+    """
+    Thin client drawing a simulation served by a SimulationServer with the Gui.
+
+    A reader thread parses the stream into a queue, and the Tk loop applies the queued frames
+    and redraws at a fixed interval, so a slow redraw only delays this viewer.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None,
+                 refresh_ms: int = 50) -> None:
+        """
+        Connect to a server and read its hello message.
+
+        Args:
+            host (str): The TCP host of the server.
+            port (int): The TCP port of the server.
+            unix_path (Optional[str]): Connect to this Unix socket instead of TCP.
+            refresh_ms (int): Milliseconds between redraws.
+        """
+        if unix_path:
+            self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.__socket.connect(unix_path)
+        else:
+            self.__socket = socket.create_connection((host, port))
+        self.__stream = self.__socket.makefile("r", encoding="utf-8")
+
+        hello = json.loads(self.__stream.readline())
+        self.__grid = RemoteGrid(hello["width"], hello["height"], hello["classes"])
+
+        self.__colours = {stand_in: hello["colours"][stand_in.__name__]
+                          for stand_in in self.__grid.get_stand_in_classes()}
+        self.__colours[None] = hello["empty"]
+
+        self.__refresh_ms = refresh_ms
+        self.__messages: queue.Queue = queue.Queue()
+        self.__gui: Optional[Gui] = None
+        self.__finished = False
+
+    def run(self) -> None:
+        """Open the window and draw the simulation until it ends or the window is closed."""
+        threading.Thread(target=self.__read, daemon=True).start()
+
+        self.__gui = Gui(self.__grid, self.__colours)
+        self.__gui.after(self.__refresh_ms, self.__refresh)
+        self.__gui.mainloop()
+        self.__socket.close()
+
+    def __read(self) -> None:
+        """Queue every message sent by the server until the connection ends."""
+        try:
+            for line in self.__stream:
+                self.__messages.put(json.loads(line))
+        except (OSError, ValueError):
+            pass
+        self.__messages.put({"type": "bye"})
+
+    def __refresh(self) -> None:
+        """Apply the queued messages and redraw."""
+        if self.__gui.is_closed():
+            return
+
+        changed = False
+        while not self.__messages.empty():
+            message = self.__messages.get_nowait()
+
+            if message["type"] == "frame":
+                self.__grid.apply(message["cells"])
+                self.__gui.title(f"Episode {message['episode']} - step {message['step']}")
+                changed = True
+
+            elif message["type"] == "episode":
+                logger.info("Episode %d: %s in %d steps, Reward: %.2f", message["episode"],
+                            message.get("outcome", "WON" if message["win_status"] else "LOST"), message["length"],
+                            message["reward"])
+
+            elif message["type"] == "bye" and not self.__finished:
+                self.__finished = True
+                self.__gui.title("Simulation finished")
+
+        if changed:
+            self.__gui.render()
+
+        self.__gui.after(self.__refresh_ms, self.__refresh)
+
+
+def main() -> None:
+    """Watch a simulation served by a SimulationServer."""
+    parser = argparse.ArgumentParser(description="Watch a simulation served over a local socket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", dest="unix_path", default=None, help="connect to a Unix socket instead of TCP")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format="%(levelname)s %(name)s: %(message)s")
+
+    RemoteViewer(args.host, args.port, args.unix_path).run()
+
+
+if __name__ == "__main__":
+    main()